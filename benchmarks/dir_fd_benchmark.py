@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+
+###
+# MIT License
+#
+# Copyright (c) 2020 André Lousa Marques <andre.lousa.marques at gmail.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+###
+
+"""
+Benchmark of the link operations of a bulk run on a deep home directory
+tree, issued on full paths and relative to the opened parent directories.
+
+Usage, from the repository root:
+
+    PYTHONPATH=. python benchmarks/dir_fd_benchmark.py [depth] [dirs] [files]
+"""
+
+from lecfg.path_cache import PathStatusCache
+import tempfile
+import shutil
+import time
+import sys
+import os
+
+
+def build_tree(root: str, depth: int, dir_count: int) -> list:
+    """
+    Build the destination directories: dir_count directories, each one depth
+    levels below the home directory
+    """
+    dirs = []
+
+    for i in range(dir_count):
+        path = os.path.join(root, "home", "user", ".config",
+                            *["level%d" % level for level in range(depth)],
+                            "app%d" % i)
+        os.makedirs(path)
+        dirs.append(path)
+
+    return dirs
+
+
+def deploy(src_path: str, dest_dirs: list, file_count: int,
+           use_dir_fd: bool) -> float:
+    """
+    Check, back up and link file_count configurations in every destination
+    directory, in the same order as a bulk run
+    """
+    path_cache = PathStatusCache(use_dir_fd=use_dir_fd)
+    start = time.perf_counter()
+
+    for dest_dir in dest_dirs:
+        for i in range(file_count):
+            dest_path = os.path.join(dest_dir, "conf%d" % i)
+
+            if path_cache.lstat(dest_path) is not None:
+                path_cache.rename(dest_path, dest_path + ".lecfg.bak")
+
+            path_cache.symlink(src_path, dest_path)
+            path_cache.readlink(dest_path)
+
+    elapsed = time.perf_counter() - start
+    path_cache.close()
+
+    return elapsed
+
+
+def check(src_path: str, dest_dirs: list, file_count: int,
+          use_dir_fd: bool) -> float:
+    """
+    Check that every configuration is deployed, as a run on an already
+    deployed system does
+    """
+    path_cache = PathStatusCache(use_dir_fd=use_dir_fd)
+    start = time.perf_counter()
+
+    for dest_dir in dest_dirs:
+        for i in range(file_count):
+            assert path_cache.links_to(os.path.join(dest_dir, "conf%d" % i),
+                                       src_path)
+
+    elapsed = time.perf_counter() - start
+    path_cache.close()
+
+    return elapsed
+
+
+def run(depth: int, dir_count: int, file_count: int,
+        use_dir_fd: bool) -> tuple:
+    """
+    Deploy into a fresh tree, check it, and return the elapsed times
+    """
+    root = tempfile.mkdtemp()
+
+    try:
+        src_path = os.path.join(root, "conf")
+        open(src_path, "w").close()
+
+        dest_dirs = build_tree(root, depth, dir_count)
+
+        # existing files at half of the destinations are backed up
+        for dest_dir in dest_dirs:
+            for i in range(0, file_count, 2):
+                open(os.path.join(dest_dir, "conf%d" % i), "w").close()
+
+        return (deploy(src_path, dest_dirs, file_count, use_dir_fd),
+                check(src_path, dest_dirs, file_count, use_dir_fd))
+    finally:
+        shutil.rmtree(root)
+
+
+def main() -> None:
+    depth = int(sys.argv[1]) if len(sys.argv) > 1 else 12
+    dir_count = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    file_count = int(sys.argv[3]) if len(sys.argv) > 3 else 50
+    repeat = 5
+
+    print("%d directories %d levels deep, %d configurations each "
+          "(best of %d)" % (dir_count, depth, file_count, repeat))
+
+    timings = {False: [], True: []}
+
+    # interleave the runs so that both are equally affected by noise
+    for _ in range(repeat):
+        for use_dir_fd in (False, True):
+            timings[use_dir_fd].append(run(depth, dir_count, file_count,
+                                           use_dir_fd))
+
+    print("%-10s %10s %10s" % ("", "deploy", "check"))
+
+    for use_dir_fd in (False, True):
+        print("%-10s %8.3f s %8.3f s" % (
+            "dir_fd:" if use_dir_fd else "paths:",
+            min(t[0] for t in timings[use_dir_fd]),
+            min(t[1] for t in timings[use_dir_fd])))
+
+
+if __name__ == "__main__":
+    main()
@@ -25,32 +25,131 @@
 ###
 
 from lecfg.lecfg import Lecfg
+from lecfg.target import Target
+from lecfg.conf.conf import LINK_DEPLOY_MODE, COPY_DEPLOY_MODE
+from lecfg.conf.conf import FARM_DEPLOY_MODE
 import argparse
 
 
 if __name__ == '__main__':
     arg_parser = argparse.ArgumentParser()
-    arg_parser.add_argument("-y, --replace-all", help="Assume \"Replace\" as"
-                            " the answer for all questions regarding existing"
-                            " configuration in the current system"
-                            " configuration with a symbolic link",
-                            action="store_true")
-    arg_parser.add_argument("-n, --dry-run", help="Do a dry-run to ensure that"
-                            " all the README.lc files are valid. Despite this"
-                            " option, whenever the tool finds an error it"
-                            " saves the current state while you correct the"
-                            " detected problem and resumes where it left off"
-                            " next time you load it.", action="store_true")
+    mode_group = arg_parser.add_mutually_exclusive_group()
+    mode_group.add_argument("-y", "--replace-all", help="Assume \"Replace\""
+                            " as the answer for all questions regarding"
+                            " existing configuration in the current system"
+                            " configuration with a symbolic link. All the"
+                            " configurations are planned up front and"
+                            " deployed without asking any question",
+                            action="store_true")
+    arg_parser.add_argument("-n", "--dry-run", help="Do a dry-run to ensure"
+                            " that all the README.lc files are valid. All the"
+                            " packages are validated concurrently and every"
+                            " error found is reported at once, without"
+                            " deploying any configuration",
+                            action="store_true")
+    arg_parser.add_argument("-s", "--status", help="Report the deployment"
+                            " status of every configuration that applies to"
+                            " the current system (linked, missing,"
+                            " missing-parent, conflict, type-mismatch or"
+                            " dangling-link) without changing anything",
+                            action="store_true")
+    arg_parser.add_argument("--ndjson", help="Report the status as one JSON"
+                            " object per line instead of a table",
+                            action="store_true")
+    arg_parser.add_argument("--all-systems", help="Report the status of the"
+                            " configurations of every system at once, along"
+                            " with a summary per system, instead of the ones"
+                            " of the current system. Implies --status",
+                            action="store_true")
+    arg_parser.add_argument("--changed-only", help="Only process the"
+                            " packages whose README.lc file, or the sources"
+                            " or destinations of its configurations, changed"
+                            " since they were last applied",
+                            action="store_true")
+    arg_parser.add_argument("--compile", help="Compile the README.lc files"
+                            " of the work directory into a manifest that is"
+                            " used instead of parsing them on the following"
+                            " runs. Only the README.lc files that changed"
+                            " since are parsed again", action="store_true")
+    mode_group.add_argument("--record", help="Record every decision into"
+                            " the given answer file, keyed by package,"
+                            " source and destination, so that it can be"
+                            " replayed on other systems", metavar="FILE",
+                            type=str)
+    mode_group.add_argument("--replay", help="Take the decisions from the"
+                            " given answer file instead of asking the user."
+                            " Configurations without a recorded decision are"
+                            " skipped", metavar="FILE", type=str)
+    arg_parser.add_argument("--target", help="Deploy the configurations into"
+                            " the given target instead of the current"
+                            " system, without asking any question. Format:"
+                            " ROOT[,NAME=VALUE...], where the destination"
+                            " paths are deployed relative to ROOT and each"
+                            " NAME=VALUE pair sets an environment variable"
+                            " used to expand them, such as HOME. May be given"
+                            " many times, in which case the README.lc files"
+                            " are parsed once and the targets are deployed"
+                            " concurrently", metavar="SPEC", type=Target.parse,
+                            action="append")
+    deploy_mode = arg_parser.add_mutually_exclusive_group()
+    deploy_mode.add_argument("--copy", help="Deploy the configurations by"
+                             " copying them to the destination instead of"
+                             " creating symbolic links, unless their"
+                             " README.lc line sets another deploy mode."
+                             " Files that already have the same contents at"
+                             " the destination are not copied again",
+                             action="store_const", dest="deploy_mode",
+                             const=COPY_DEPLOY_MODE)
+    deploy_mode.add_argument("--link-farm", help="Deploy the directories as"
+                             " link farms, in the style of GNU Stow, unless"
+                             " their README.lc line sets another deploy"
+                             " mode: each file gets its own symbolic link,"
+                             " whole subdirectories are linked when nothing"
+                             " conflicts, and only the conflicting entries"
+                             " of an existing destination directory are"
+                             " moved aside", action="store_const",
+                             dest="deploy_mode", const=FARM_DEPLOY_MODE)
+    arg_parser.add_argument("--dir-fd", help="Issue the file system calls"
+                            " on the destinations relative to their opened"
+                            " parent directories, keeping a bounded number"
+                            " of them open. Faster when checking trees that"
+                            " are already deployed under deep directories,"
+                            " but not when deploying them",
+                            action="store_true")
+    arg_parser.add_argument("--rollback", help="Roll back the most recent"
+                            " run: remove the symbolic links it created,"
+                            " restore the configurations it replaced and"
+                            " remove the directories it created",
+                            action="store_true")
     arg_parser.add_argument("work_dir", help="Working directory from"
                             " which the script operates (defaults to the"
                             " current directory)", type=str)
-    arg_parser.add_argument("-c, --checksum", help="Calculate SHA-512 hash of"
-                            " the provided work directory and request"
+    arg_parser.add_argument("-c", "--checksum", help="Calculate SHA-512 hash"
+                            " of the provided work directory and request"
                             " the user to confirm if the calculated hash is"
-                            " the expected", action="store_true")
+                            " the expected. File digests are cached in the"
+                            " work directory and only recalculated for the"
+                            " files that changed since the last run",
+                            action="store_true")
 
     args = arg_parser.parse_args()
 
-    lecfg = Lecfg(args.work_dir)
+    lecfg = Lecfg(args.work_dir, replace_all=args.replace_all,
+                  changed_only=args.changed_only, record_file=args.record,
+                  replay_file=args.replay, targets=args.target,
+                  deploy_mode=args.deploy_mode or LINK_DEPLOY_MODE,
+                  use_dir_fd=args.dir_fd)
+
+    if args.checksum:
+        lecfg.checksum()
 
-    lecfg.process()
+    if args.rollback:
+        lecfg.rollback()
+    elif args.status or args.all_systems:
+        lecfg.status(ndjson=args.ndjson, all_systems=args.all_systems)
+    elif args.compile:
+        lecfg.compile()
+    elif args.dry_run:
+        lecfg.dry_run()
+    else:
+        lecfg.process()
@@ -27,6 +27,8 @@
 
 from lecfg.action.action_result import ActionResult
 from lecfg.conf.conf import Conf
+from lecfg.path_cache import PathStatusCache
+from lecfg.checksum import DigestCache
 from abc import ABC
 
 
@@ -45,6 +47,30 @@ class Action(ABC):
             name of the action
         """
         self._name = name
+        self._path_cache = PathStatusCache()
+        self._digest_cache = DigestCache()
+
+    @property
+    def path_cache(self) -> PathStatusCache:
+        """
+        Cache of the status of the paths handled by the action
+        """
+        return self._path_cache
+
+    @path_cache.setter
+    def path_cache(self, value: PathStatusCache) -> None:
+        self._path_cache = value
+
+    @property
+    def digest_cache(self) -> DigestCache:
+        """
+        Cache of the digests of the files handled by the action
+        """
+        return self._digest_cache
+
+    @digest_cache.setter
+    def digest_cache(self, value: DigestCache) -> None:
+        self._digest_cache = value
 
     def __str__(self) -> str:
         return "%s" % (self._name)
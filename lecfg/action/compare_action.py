@@ -30,13 +30,15 @@ from lecfg.conf.conf import Conf
 from lecfg.action.action import Action
 from lecfg.action.action_cmd import ActionCmd
 from lecfg.action.action_exception import ActionException
+from lecfg.file_compare import compare_files
+from lecfg.dir_compare import compare_dirs
 import subprocess
-import os
 
 
 class CompareAction(Action):
     """
-    Action to call diff utility to compare the src and dest configuration files
+    Action to compare the src and dest configuration files, either in-process
+    or by calling a diff utility
     """
 
     def __init__(self, name: str, cmp_file_cmd: ActionCmd,
@@ -50,19 +52,31 @@ class CompareAction(Action):
             name of the action
         cmp_file_cmd: ActionCmd
             system command to compare file contents when this action is run
-            against two files
+            against two files, or None to compare them in-process
         cmp_dir_cmd: ActionCmd
-            system command to compare directory contents when this action isi
-            run against two directories
+            system command to compare directory contents when this action is
+            run against two directories, or None to compare them in-process
         """
         super().__init__(name)
         self._cmp_file_cmd = cmp_file_cmd
         self._cmp_dir_cmd = cmp_dir_cmd
 
     def run(self, conf: Conf) -> ActionResult:
-        if os.path.isfile(conf.src_path) and os.path.isfile(conf.dest_path):
+        if (self.path_cache.is_file(conf.src_path)
+           and self.path_cache.is_file(conf.dest_path)):
+            if self._cmp_file_cmd is None:
+                compare_files(conf.dest_path, conf.src_path,
+                              self._digest_cache)
+                return ActionResult.REPEAT
+
             cmd = self._cmp_file_cmd
-        elif os.path.isdir(conf.src_path) and os.path.isdir(conf.dest_path):
+        elif (self.path_cache.is_dir(conf.src_path)
+              and self.path_cache.is_dir(conf.dest_path)):
+            if self._cmp_dir_cmd is None:
+                compare_dirs(conf.dest_path, conf.src_path,
+                             self._digest_cache)
+                return ActionResult.REPEAT
+
             cmd = self._cmp_dir_cmd
 
         try:
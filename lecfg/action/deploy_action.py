@@ -27,13 +27,26 @@
 
 from lecfg.action.action_result import ActionResult
 from lecfg.conf.conf import Conf
+from lecfg.conf.conf import LINK_DEPLOY_MODE, COPY_DEPLOY_MODE
+from lecfg.conf.conf import FARM_DEPLOY_MODE
 from lecfg.action.action import Action
-from pathlib import Path
+from lecfg.action.action_exception import ActionException
+from lecfg.run_log import RunLog
+from lecfg.file_copy import copy_file
+from lecfg.file_compare import files_identical
+from lecfg.link_farm import link_farm_plan
+import shutil
+import stat
+import os
+
+
+OLD_FILE_SUFFIX = ".lecfg.bak"
 
 
 class DeployAction(Action):
     """
-    Action to deploy the src configuration file into the dest path
+    Action to deploy the src configuration file into the dest path, either as
+    a symbolic link, as a copy or as a link farm
     """
 
     def __init__(self, name: str):
@@ -46,12 +59,178 @@ class DeployAction(Action):
             name of the action
         """
         super().__init__(name)
+        self._run_log = None
+
+    @property
+    def run_log(self) -> RunLog:
+        """
+        Record of the changes made by the action, used to roll them back. No
+        changes are recorded when it is not set
+        """
+        return self._run_log
+
+    @run_log.setter
+    def run_log(self, value: RunLog) -> None:
+        self._run_log = value
+
+    def _link(self, src_path: str, dest_path: str) -> None:
+        self.path_cache.symlink(src_path, dest_path)
+
+        if self._run_log is not None:
+            self._run_log.record_link(dest_path, src_path)
+
+    def _backup(self, dest_path: str) -> str:
+        """
+        Move an existing configuration aside
+
+        Parameters
+        ----------
+        dest_path: str
+            path to the existing configuration
+
+        Returns
+        -------
+        str
+            path to which the configuration was moved
+
+        Raises
+        ------
+        ActionException
+            if there is already a backup of the configuration
+        """
+        dest_bak = dest_path + OLD_FILE_SUFFIX
+
+        if self.path_cache.lstat(dest_bak) is not None:
+            raise ActionException("There is already a previous lecfg file "
+                                  "backup at the destination. Please "
+                                  "remove or rename it: %s" % dest_bak)
+
+        self.path_cache.rename(dest_path, dest_bak)
+
+        if self._run_log is not None:
+            self._run_log.record_backup(dest_path, dest_bak)
+
+        return dest_bak
+
+    def _copy(self, src_path: str, dest_path: str,
+              src_stat: os.stat_result) -> None:
+        """
+        Copy a configuration into its destination in place. Files that
+        already have the same contents at the destination are skipped, and
+        only the destination entries that differ from the source are moved
+        aside. Symbolic links are copied as symbolic links and special files,
+        such as named pipes or sockets, are not copied
+
+        Parameters
+        ----------
+        src_path: str
+            path to the configuration file or directory
+        dest_path: str
+            path where the configuration is to be copied
+        src_stat: os.stat_result
+            status of the configuration
+
+        Returns
+        -------
+        None
+        """
+        dest_stat = self.path_cache.lstat(dest_path)
+
+        if stat.S_ISLNK(src_stat.st_mode):
+            target = os.readlink(src_path)
+
+            if dest_stat is not None:
+                if self.path_cache.is_symlink(dest_path) and os.readlink(
+                        dest_path) == target:
+                    return
+
+                self._backup(dest_path)
+
+            self._link(target, dest_path)
+        elif stat.S_ISDIR(src_stat.st_mode):
+            if dest_stat is not None and not stat.S_ISDIR(dest_stat.st_mode):
+                self._backup(dest_path)
+                dest_stat = None
+
+            if dest_stat is None:
+                os.mkdir(dest_path)
+                self.path_cache.invalidate(dest_path)
+
+                if self._run_log is not None:
+                    self._run_log.record_mkdir(dest_path)
+
+            shutil.copymode(src_path, dest_path)
+
+            with os.scandir(src_path) as entries:
+                for entry in entries:
+                    self._copy(entry.path,
+                               os.path.join(dest_path, entry.name),
+                               entry.stat(follow_symlinks=False))
+        elif stat.S_ISREG(src_stat.st_mode):
+            if dest_stat is not None:
+                if stat.S_ISREG(dest_stat.st_mode) and files_identical(
+                        src_path, dest_path, self.digest_cache):
+                    if stat.S_IMODE(dest_stat.st_mode) != stat.S_IMODE(
+                            src_stat.st_mode):
+                        os.chmod(dest_path, stat.S_IMODE(src_stat.st_mode))
+                        self.path_cache.invalidate(dest_path)
+
+                    return
+
+                self._backup(dest_path)
+
+            copy_file(src_path, dest_path)
+            self.path_cache.invalidate(dest_path)
+
+            if self._run_log is not None:
+                self._run_log.record_copy(dest_path, src_path)
+
+    def _deploy_link_farm(self, src_path: str, dest_path: str) -> None:
+        """
+        Deploy a source directory into an existing destination directory as
+        a link farm, moving aside only the conflicting entries
+
+        Parameters
+        ----------
+        src_path: str
+            path to the source directory
+        dest_path: str
+            path to the existing destination directory
+
+        Returns
+        -------
+        None
+        """
+        plan = link_farm_plan(src_path, dest_path)
+
+        # create the links of each directory in one batch
+        for dest_dir_path, links in plan.items():
+            for name, link_src_path, replace in links:
+                link_path = os.path.join(dest_dir_path, name)
+
+                if replace:
+                    self._backup(link_path)
+
+                self._link(link_src_path, link_path)
 
-    def _deploy_conf(self, src_path: str, dest_path: str) -> ActionResult:
-        Path(dest_path).symlink_to(src_path)
+    def _deploy_conf(self, src_path: str, dest_path: str,
+                     deploy_mode: str = LINK_DEPLOY_MODE) -> ActionResult:
+        if deploy_mode == COPY_DEPLOY_MODE:
+            # the source itself is followed, unlike the entries below it
+            self._copy(src_path, dest_path, os.stat(src_path))
+        elif (deploy_mode == FARM_DEPLOY_MODE
+              and self.path_cache.is_dir(src_path)
+              and self.path_cache.is_dir(dest_path)
+              and not self.path_cache.is_symlink(dest_path)):
+            self._deploy_link_farm(src_path, dest_path)
+        else:
+            # a missing destination of a link farm is folded into a single
+            # link to the source directory
+            self._link(src_path, dest_path)
 
         # move to the next configuration
         return ActionResult.NEXT
 
     def run(self, conf: Conf) -> ActionResult:
-        return self._deploy_conf(conf.src_path, conf.dest_path)
+        return self._deploy_conf(conf.src_path, conf.dest_path,
+                                 conf.deploy_mode)
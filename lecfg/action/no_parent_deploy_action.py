@@ -26,7 +26,7 @@
 
 
 from lecfg.action.action_result import ActionResult
-from lecfg.conf.conf import Conf
+from lecfg.conf.conf import Conf, LINK_DEPLOY_MODE
 from lecfg.action.deploy_action import DeployAction
 from pathlib import Path
 
@@ -48,14 +48,25 @@ class NoParentDeployAction(DeployAction):
         """
         super().__init__(name)
 
-    def _create_parent_and_deploy(self, src_path: str, dest_path: str
+    def _create_parent_and_deploy(self, src_path: str, dest_path: str,
+                                  deploy_mode: str = LINK_DEPLOY_MODE
                                   ) -> ActionResult:
         # ensure the dest path parent directories are created
         dest_parent = Path(dest_path).parent
+        missing_dirs = [parent for parent in [dest_parent,
+                                              *dest_parent.parents]
+                        if not self.path_cache.exists(str(parent))]
         dest_parent.mkdir(parents=True, exist_ok=True)
+        self.path_cache.invalidate(str(dest_parent))
+
+        if self._run_log is not None:
+            # record the directories from the outermost to the innermost
+            for missing_dir in reversed(missing_dirs):
+                self._run_log.record_mkdir(str(missing_dir))
 
         # deploy the configuration
-        return super()._deploy_conf(src_path, dest_path)
+        return super()._deploy_conf(src_path, dest_path, deploy_mode)
 
     def run(self, conf: Conf) -> ActionResult:
-        return self._create_parent_and_deploy(conf.src_path, conf.dest_path)
+        return self._create_parent_and_deploy(conf.src_path, conf.dest_path,
+                                              conf.deploy_mode)
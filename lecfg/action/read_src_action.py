@@ -31,7 +31,6 @@ from lecfg.action.action import Action
 from lecfg.action.action_cmd import ActionCmd
 from lecfg.action.action_exception import ActionException
 import subprocess
-import os
 
 
 class ReadSrcAction(Action):
@@ -60,7 +59,7 @@ class ReadSrcAction(Action):
         self._read_dir_cmd = read_dir_cmd
 
     def _read(self, file_path: str):
-        if os.path.isfile(file_path):
+        if self.path_cache.is_file(file_path):
             cmd = self._read_file_cmd
         else:
             cmd = self._read_dir_cmd
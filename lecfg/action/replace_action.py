@@ -26,13 +26,8 @@
 
 
 from lecfg.action.action_result import ActionResult
-from lecfg.conf.conf import Conf
+from lecfg.conf.conf import Conf, COPY_DEPLOY_MODE, FARM_DEPLOY_MODE
 from lecfg.action.deploy_action import DeployAction
-from lecfg.action.action_exception import ActionException
-from pathlib import Path
-
-
-OLD_FILE_SUFFIX = ".lecfg.bak"
 
 
 class ReplaceAction(DeployAction):
@@ -53,20 +48,23 @@ class ReplaceAction(DeployAction):
         super().__init__(name)
 
     def run(self, conf: Conf) -> ActionResult:
-        dest_path = Path(conf.dest_path)
-
-        if dest_path.exists() and dest_path.samefile(conf.src_path):
+        if (conf.deploy_mode != COPY_DEPLOY_MODE
+           and self.path_cache.samefile(conf.dest_path, conf.src_path)):
             # If the destination file is already a sym link to the src, just
-            # return
+            # return. A link to the source is not a copy of it, and is moved
+            # aside like any other destination when copying
             return ActionResult.NEXT
 
-        dest_bak = dest_path.parent / (dest_path.name + OLD_FILE_SUFFIX)
-
-        if Path(dest_bak).exists():
-            raise ActionException("There is already a previous lecfg file "
-                                  "backup at the destination. Please "
-                                  "remove or rename it: %s" % dest_bak)
+        if conf.deploy_mode == COPY_DEPLOY_MODE or (
+           conf.deploy_mode == FARM_DEPLOY_MODE
+           and self.path_cache.is_dir(conf.src_path)
+           and self.path_cache.is_dir(conf.dest_path)
+           and not self.path_cache.is_symlink(conf.dest_path)):
+            # only the conflicting entries of the destination are moved aside
+            return self._deploy_conf(conf.src_path, conf.dest_path,
+                                     conf.deploy_mode)
 
-        dest_path = dest_path.replace(dest_bak)
+        self._backup(conf.dest_path)
 
-        return self._deploy_conf(conf.src_path, conf.dest_path)
+        return self._deploy_conf(conf.src_path, conf.dest_path,
+                                 conf.deploy_mode)
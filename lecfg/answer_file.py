@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+
+###
+# MIT License
+#
+# Copyright (c) 2020 André Lousa Marques <andre.lousa.marques at gmail.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+###
+
+from lecfg.conf.conf import Conf
+from lecfg.conf.conf_exception import ConfException
+from typing import Dict, Tuple
+import json
+import os
+
+ANSWER_FILE_VERSION = 1
+
+DEPLOY_ANSWER = "deploy"
+SKIP_ANSWER = "skip"
+SKIP_PACKAGE_ANSWER = "skip_package"
+
+ANSWERS = [DEPLOY_ANSWER, SKIP_ANSWER, SKIP_PACKAGE_ANSWER]
+
+
+class AnswerFile():
+    """
+    Decisions taken on the configurations of a work directory, keyed by
+    package, source and destination so that they can be replayed on other
+    systems regardless of the order of the questions. The file also keeps the
+    answers to the questions asked before the configurations: the selected
+    system and whether to resume a previous session
+    """
+
+    def __init__(self, file_path: str, work_dir_path: str):
+        """
+        Constructor. Loads the answers of the file, if it exists
+
+        Parameters
+        ----------
+        file_path: str
+            path to the answer file
+        work_dir_path: str
+            path to the work directory
+
+        Raises
+        ------
+        ConfException
+            if the answer file exists but is not valid
+        """
+        self._file_path = file_path
+        self._work_dir_path = work_dir_path
+        self.system = None
+        self.resume = None
+        self._answers = self._load()
+
+    @property
+    def file_path(self) -> str:
+        """
+        Path to the answer file
+        """
+        return self._file_path
+
+    def __len__(self) -> int:
+        return len(self._answers)
+
+    def _load(self) -> Dict[Tuple[str, str, str], str]:
+        if not os.path.exists(self._file_path):
+            return {}
+
+        try:
+            with open(self._file_path, "r") as answer_file:
+                data = json.load(answer_file)
+
+            if data.get("version") != ANSWER_FILE_VERSION:
+                raise ConfException(self._file_path,
+                                    "Unsupported answer file version")
+
+            self.system = data.get("system")
+            self.resume = data.get("resume")
+
+            if self.system is not None and not isinstance(self.system, str):
+                raise ConfException(self._file_path, "Invalid system")
+
+            if self.resume is not None and not isinstance(self.resume, bool):
+                raise ConfException(self._file_path,
+                                    "Invalid resume decision")
+
+            answers = {}
+
+            for answer in data["answers"]:
+                if answer["decision"] not in ANSWERS:
+                    raise ConfException(
+                        self._file_path, "Unknown decision \"%s\"" %
+                        answer["decision"])
+
+                answers[(answer["package"], answer["src"],
+                         answer["dest"])] = answer["decision"]
+
+            return answers
+        except (OSError, ValueError, KeyError, TypeError,
+                AttributeError) as e:
+            raise ConfException(self._file_path, str(e))
+
+    def _key(self, package_dir: str, conf: Conf) -> Tuple[str, str, str]:
+        # the source is relative to the package and the destination is kept
+        # unexpanded, so that the key is the same on every system
+        return (os.path.relpath(package_dir, self._work_dir_path),
+                os.path.relpath(conf.src_path, package_dir),
+                conf.raw_dest_path)
+
+    def decision(self, package_dir: str, conf: Conf) -> str:
+        """
+        Get the decision taken on a configuration
+
+        Parameters
+        ----------
+        package_dir: str
+            path to the package directory of the configuration
+        conf: Conf
+            configuration
+
+        Returns
+        -------
+        str
+            the decision, or None if there is no decision on the configuration
+        """
+        return self._answers.get(self._key(package_dir, conf))
+
+    def record(self, package_dir: str, conf: Conf, decision: str) -> None:
+        """
+        Record the decision taken on a configuration
+
+        Parameters
+        ----------
+        package_dir: str
+            path to the package directory of the configuration
+        conf: Conf
+            configuration
+        decision: str
+            one of the decisions in ANSWERS
+
+        Returns
+        -------
+        None
+        """
+        self._answers[self._key(package_dir, conf)] = decision
+
+    def save(self) -> None:
+        """
+        Write the answers to the answer file
+
+        Returns
+        -------
+        None
+        """
+        data = {"version": ANSWER_FILE_VERSION,
+                "answers": [{"package": package, "src": src, "dest": dest,
+                             "decision": decision}
+                            for (package, src, dest), decision
+                            in sorted(self._answers.items())]}
+
+        if self.system is not None:
+            data["system"] = self.system
+
+        if self.resume is not None:
+            data["resume"] = self.resume
+
+        tmp_path = "%s.tmp" % self._file_path
+
+        with open(tmp_path, "w") as answer_file:
+            json.dump(data, answer_file, indent=1)
+
+        os.replace(tmp_path, self._file_path)
@@ -0,0 +1,262 @@
+# -*- coding: utf-8 -*-
+
+###
+# MIT License
+#
+# Copyright (c) 2020 André Lousa Marques <andre.lousa.marques at gmail.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+###
+
+from lecfg.utilities import STATE_DIR_NAME
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple
+import hashlib
+import json
+import os
+
+DIGEST_CACHE_FILE_NAME = "digests.json"
+
+CHUNK_SIZE = 1024 * 1024
+
+# files and directories of the work directory that are not part of the
+# configuration and therefore are not hashed
+IGNORED_NAMES = [STATE_DIR_NAME, ".git", ".hg", ".svn"]
+
+
+def file_digest(file_path: str, algorithm: str = "sha512") -> str:
+    """
+    Calculate the digest of a file, streaming its contents in fixed size
+    chunks so that the whole file is never loaded into memory
+
+    Parameters
+    ----------
+    file_path: str
+        path to the file
+    algorithm: str
+        name of the hashlib algorithm to use
+
+    Returns
+    -------
+    str
+        hexadecimal digest of the file contents
+    """
+    digest = hashlib.new(algorithm)
+    buffer = bytearray(CHUNK_SIZE)
+    view = memoryview(buffer)
+
+    with open(file_path, "rb", buffering=0) as f:
+        while True:
+            size = f.readinto(buffer)
+
+            if not size:
+                break
+
+            digest.update(view[:size])
+
+    return digest.hexdigest()
+
+
+class DigestCache():
+    """
+    Persistent cache of file digests. Each digest is keyed by the file path and
+    is only reused while the file device, inode, size and modification time
+    are unchanged
+    """
+
+    def __init__(self, cache_file_path: str = None):
+        """
+        Constructor
+
+        Parameters
+        ----------
+        cache_file_path: str
+            path to the file where the cache is persisted, or None to keep the
+            cache in memory only
+        """
+        self._cache_file_path = cache_file_path
+        self._digests = {}
+        self._dirty = False
+
+        if cache_file_path is not None:
+            try:
+                with open(cache_file_path, "r") as cache_file:
+                    self._digests = json.load(cache_file)
+            except (OSError, ValueError):
+                # a missing or corrupt cache is rebuilt from scratch
+                self._digests = {}
+
+    def digest(self, file_path: str, stat: os.stat_result = None) -> str:
+        """
+        Get the SHA-512 digest of a file, calculating it only if the file
+        changed since it was last calculated
+
+        Parameters
+        ----------
+        file_path: str
+            path to the file
+        stat: os.stat_result
+            stat of the file, if already known
+
+        Returns
+        -------
+        str
+            hexadecimal digest of the file contents
+        """
+        if stat is None:
+            stat = os.stat(file_path)
+
+        signature = [stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns]
+        cached = self._digests.get(file_path)
+
+        if cached is not None and cached[:4] == signature:
+            return cached[4]
+
+        digest = file_digest(file_path)
+
+        self._digests[file_path] = signature + [digest]
+        self._dirty = True
+
+        return digest
+
+    def save(self) -> None:
+        """
+        Persist the cache, if it has changed
+
+        Returns
+        -------
+        None
+        """
+        if self._cache_file_path is None or not self._dirty:
+            return
+
+        os.makedirs(os.path.dirname(self._cache_file_path), exist_ok=True)
+
+        tmp_path = self._cache_file_path + ".tmp"
+
+        with open(tmp_path, "w") as cache_file:
+            json.dump(self._digests, cache_file, separators=(",", ":"))
+
+        os.replace(tmp_path, self._cache_file_path)
+        self._dirty = False
+
+
+class WorkDirHasher():
+    """
+    Calculates the SHA-512 hash of a work directory
+    """
+
+    def __init__(self, work_dir_path: str, digest_cache: DigestCache):
+        """
+        Constructor
+
+        Parameters
+        ----------
+        work_dir_path: str
+            path to the work directory
+        digest_cache: DigestCache
+            cache of the digests of the work directory files
+        """
+        self._work_dir_path = work_dir_path
+        self._digest_cache = digest_cache
+
+    def _entries(self) -> List[Tuple[str, os.DirEntry]]:
+        """
+        List every file and symbolic link of the work directory
+
+        Returns
+        -------
+        List[Tuple[str, os.DirEntry]]
+            path relative to the work directory and directory entry of each
+            file and symbolic link
+        """
+        entries = []
+        pending = [""]
+
+        while pending:
+            rel_dir = pending.pop()
+
+            with os.scandir(os.path.join(self._work_dir_path,
+                                         rel_dir)) as it:
+                for entry in it:
+                    if entry.name in IGNORED_NAMES:
+                        continue
+
+                    rel_path = os.path.join(rel_dir, entry.name)
+
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append(rel_path)
+                    else:
+                        entries.append((rel_path, entry))
+
+        entries.sort(key=lambda e: e[0])
+
+        return entries
+
+    def _entry_digest(self, entry: os.DirEntry) -> str:
+        """
+        Calculate the digest of a directory entry. Symbolic links are not
+        followed and are hashed by their target path, and special files, such
+        as named pipes, are hashed by their mode without being read
+
+        Parameters
+        ----------
+        entry: os.DirEntry
+            work directory entry
+
+        Returns
+        -------
+        str
+            kind of entry followed by its digest
+        """
+        if entry.is_symlink():
+            target = os.readlink(entry.path)
+            return "l" + hashlib.sha512(target.encode()).hexdigest()
+
+        status = entry.stat(follow_symlinks=False)
+
+        if not entry.is_file(follow_symlinks=False):
+            return "s" + hashlib.sha512(("%o" % status.st_mode).encode()
+                                        ).hexdigest()
+
+        return "f" + self._digest_cache.digest(entry.path, status)
+
+    def hexdigest(self) -> str:
+        """
+        Calculate the hash of the work directory. Files are hashed
+        concurrently and the work directory hash is built from the sorted
+        relative paths and digests of all its files
+
+        Returns
+        -------
+        str
+            hexadecimal SHA-512 hash of the work directory
+        """
+        entries = self._entries()
+        work_dir_digest = hashlib.sha512()
+
+        with ThreadPoolExecutor() as executor:
+            digests = executor.map(lambda e: self._entry_digest(e[1]),
+                                   entries)
+
+            for (rel_path, _), digest in zip(entries, digests):
+                work_dir_digest.update(("%s\0%s\n" % (rel_path, digest)
+                                        ).encode())
+
+        return work_dir_digest.hexdigest()
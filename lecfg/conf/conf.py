@@ -24,7 +24,13 @@
 # SOFTWARE.
 ###
 
-import os
+from lecfg.conf.system_index import ALL_SYSTEMS
+
+LINK_DEPLOY_MODE = "link"
+COPY_DEPLOY_MODE = "copy"
+FARM_DEPLOY_MODE = "farm"
+
+DEPLOY_MODES = [LINK_DEPLOY_MODE, COPY_DEPLOY_MODE, FARM_DEPLOY_MODE]
 
 
 class Conf():
@@ -33,7 +39,9 @@ class Conf():
     """
 
     def __init__(self, src_path: str, dest_path: str, description: str,
-                 version: str):
+                 version: str, raw_dest_path: str = None,
+                 deploy_mode: str = LINK_DEPLOY_MODE,
+                 systems: int = ALL_SYSTEMS):
         """
         Constructor
 
@@ -48,11 +56,26 @@ class Conf():
         version: str
             version str for the package version to which the configuration file
             applies
+        raw_dest_path: str
+            destination path as written in the README file, before expanding
+            the user directory and the environment variables. Defaults to the
+            destination path
+        deploy_mode: str
+            how the configuration is deployed: as a symbolic link ("link"), as
+            a copy ("copy") or, for directories, as a link farm with a
+            symbolic link per file ("farm")
+        systems: int
+            mask of the systems to which the configuration applies, as
+            interned by a SystemIndex
         """
         self._src_path = src_path
-        self._dest_path = os.path.expanduser(dest_path)
+        self._dest_path = dest_path
         self._description = description
         self._version = version
+        self._raw_dest_path = (raw_dest_path if raw_dest_path is not None
+                               else dest_path)
+        self._deploy_mode = deploy_mode
+        self._systems = systems
 
     @property
     def src_path(self) -> str:
@@ -98,3 +121,37 @@ class Conf():
     @version.setter
     def version(self, value) -> None:
         self._version = value
+
+    @property
+    def raw_dest_path(self) -> str:
+        """
+        Destination path as written in the README file, before expanding the
+        user directory and the environment variables
+        """
+        return self._raw_dest_path
+
+    @raw_dest_path.setter
+    def raw_dest_path(self, value) -> None:
+        self._raw_dest_path = value
+
+    @property
+    def deploy_mode(self) -> str:
+        """
+        How the configuration is deployed: "link", "copy" or "farm"
+        """
+        return self._deploy_mode
+
+    @deploy_mode.setter
+    def deploy_mode(self, value) -> None:
+        self._deploy_mode = value
+
+    @property
+    def systems(self) -> int:
+        """
+        Mask of the systems to which the configuration applies
+        """
+        return self._systems
+
+    @systems.setter
+    def systems(self, value) -> None:
+        self._systems = value
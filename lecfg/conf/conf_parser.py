@@ -25,12 +25,18 @@
 ###
 
 
+from typing import List, Tuple
+import hashlib
+import os
+
+
 class ConfParser():
     """
     Configuration parser
     """
 
-    def __init__(self, file_path: str, first_line: int = 0):
+    def __init__(self, file_path: str, first_line: int = 0,
+                 first_offset: int = None, fingerprint: str = None):
         """
         Constructor
 
@@ -40,6 +46,12 @@ class ConfParser():
             configuration file path
         first_line: int
             first line of the file. Ignore all previous lines
+        first_offset: int
+            byte offset of the first line of the file. When provided along
+            with the fingerprint of the file, the parser seeks straight to it
+            instead of skipping the previous lines
+        fingerprint: str
+            fingerprint of the file taken at the first line
 
         Raises
         ------
@@ -47,8 +59,13 @@ class ConfParser():
             if the given file path does not exist
         """
         self._file_path = file_path
-        self._conf_file = open(file_path, "r")
+        self._stat = os.stat(file_path)
         self._first_line = first_line
+        self._first_offset = first_offset
+        self._fingerprint = fingerprint
+        self._line_num = first_line
+        self._offset = 0
+        self._line_digest = None
 
     @property
     def file_path(self) -> str:
@@ -72,24 +89,105 @@ class ConfParser():
     def line_num(self, value) -> None:
         self._line_num = value
 
-    def lines(self) -> str:
+    @property
+    def offset(self) -> int:
         """
-        Generator function
+        Byte offset of the current line
+        """
+        return self._offset
+
+    @property
+    def fingerprint(self) -> str:
+        """
+        Fingerprint of the file taken at the current line. It identifies both
+        the file version and the contents of the current line
+        """
+        return self._build_fingerprint(self._line_digest)
+
+    def _build_fingerprint(self, line_digest: str) -> str:
+        return "%d-%d-%s" % (self._stat.st_size, self._stat.st_mtime_ns,
+                             line_digest)
+
+    def _line_hash(self, line: bytes) -> str:
+        return hashlib.sha1(line).hexdigest()
+
+    def _seek_first_line(self, conf_file) -> int:
+        """
+        Move the file position to the first line
+
+        Parameters
+        ----------
+        conf_file: BinaryIO
+            opened configuration file
 
         Returns
         -------
-        str
-            the next line from the configuration file
+        int
+            byte offset of the first line
         """
+        if self._first_offset is not None and self._fingerprint is not None:
+            conf_file.seek(self._first_offset)
+            line = conf_file.readline()
+            fingerprint = self._build_fingerprint(self._line_hash(line))
+
+            if fingerprint == self._fingerprint:
+                conf_file.seek(self._first_offset)
+                return self._first_offset
+
+            # the file changed since the offset was taken
+            conf_file.seek(0)
+
+        offset = 0
+
         for i in range(self._first_line):
             # skip lines until the first line
-            self._conf_file.readline()
+            offset += len(conf_file.readline())
 
-        for line_num, line in enumerate(self._conf_file):
-            # ignore empty lines and comments
-            if line.isspace() or line.lstrip().startswith("#"):
-                continue
-            self._line_num = line_num + self._first_line
-            yield list(map(lambda l: l.strip(), line.split('|')))
+        return offset
 
-        self._conf_file.close()
+    @property
+    def stat(self) -> os.stat_result:
+        """
+        Status of the configuration file when the parser was created
+        """
+        return self._stat
+
+    def records(self) -> Tuple[int, int, str, List[str]]:
+        """
+        Generator function
+
+        Returns
+        -------
+        Tuple[int, int, str, List[str]]
+            line number, byte offset, line digest and fields of the next line
+            from the configuration file
+        """
+        with open(self._file_path, "rb") as conf_file:
+            offset = self._seek_first_line(conf_file)
+
+            for line_num, raw_line in enumerate(conf_file):
+                line_offset = offset
+                offset += len(raw_line)
+                line = raw_line.decode()
+
+                # ignore empty lines and comments
+                if line.isspace() or line.lstrip().startswith("#"):
+                    continue
+                yield (line_num + self._first_line, line_offset,
+                       self._line_hash(raw_line),
+                       list(map(lambda l: l.strip(), line.split('|'))))
+
+    def lines(self) -> str:
+        """
+        Generator function
+
+        Returns
+        -------
+        str
+            the next line from the configuration file
+        """
+        for line_num, offset, line_digest, fields in self.records():
+            self._line_num = line_num
+            self._offset = offset
+            self._line_digest = line_digest
+            yield fields
@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+
+###
+# MIT License
+#
+# Copyright (c) 2020 André Lousa Marques <andre.lousa.marques at gmail.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+###
+
+from lecfg.conf.conf_parser import ConfParser
+from lecfg.utilities import STATE_DIR_NAME, state_file_path
+from typing import List, Tuple
+import bisect
+import json
+import os
+
+MANIFEST_FILE_NAME = "manifest.json"
+
+MANIFEST_VERSION = 1
+
+
+class Manifest():
+    """
+    Compiled cache of the parsed lines of all the package README files of a
+    work directory. The lines of each README file are only parsed again when
+    the file size or modification time changes
+    """
+
+    def __init__(self, work_dir_path: str):
+        """
+        Constructor
+
+        Parameters
+        ----------
+        work_dir_path: str
+            path to the work directory
+        """
+        self._work_dir_path = work_dir_path
+        self._packages = {}
+        self._dirty = True
+
+        try:
+            with open(self.file_path(work_dir_path), "r") as manifest_file:
+                manifest = json.load(manifest_file)
+
+            if manifest.get("version") == MANIFEST_VERSION:
+                self._packages = manifest["packages"]
+                self._dirty = False
+        except (OSError, ValueError, KeyError):
+            # a missing or corrupt manifest is rebuilt from scratch
+            self._packages = {}
+
+    @staticmethod
+    def file_path(work_dir_path: str) -> str:
+        """
+        Build the path to the manifest file of a work directory
+
+        Parameters
+        ----------
+        work_dir_path: str
+            path to the work directory
+
+        Returns
+        -------
+        str
+            path to the manifest file
+        """
+        return os.path.join(work_dir_path, STATE_DIR_NAME, MANIFEST_FILE_NAME)
+
+    @staticmethod
+    def is_compiled(work_dir_path: str) -> bool:
+        """
+        Check if the work directory has a compiled manifest
+
+        Parameters
+        ----------
+        work_dir_path: str
+            path to the work directory
+
+        Returns
+        -------
+        bool
+            True if a manifest file exists for the work directory
+        """
+        return os.path.isfile(Manifest.file_path(work_dir_path))
+
+    def records(self, readme_file_path: str, readme_stat: os.stat_result,
+                first_line: int = 0) -> Tuple[int, int, str, List[str]]:
+        """
+        Generator function. Parses the README file again if it changed since
+        it was compiled
+
+        Parameters
+        ----------
+        readme_file_path: str
+            path to the package README file
+        readme_stat: os.stat_result
+            current status of the package README file
+        first_line: int
+            first line of the file. Ignore all previous lines
+
+        Returns
+        -------
+        Tuple[int, int, str, List[str]]
+            line number, byte offset, line digest and fields of the next line
+            from the README file
+        """
+        key = os.path.relpath(readme_file_path, self._work_dir_path)
+        signature = [readme_stat.st_size, readme_stat.st_mtime_ns]
+        package = self._packages.get(key)
+
+        if package is None or package["signature"] != signature:
+            package = {"signature": signature,
+                       "records": list(ConfParser(readme_file_path).records())}
+            self._packages[key] = package
+            self._dirty = True
+
+        records = package["records"]
+        start = 0
+
+        if first_line > 0:
+            start = bisect.bisect_left([record[0] for record in records],
+                                       first_line)
+
+        for record in records[start:]:
+            yield tuple(record)
+
+    def retain(self, readme_file_paths: List[str]) -> None:
+        """
+        Drop the README files that are no longer part of the work directory
+
+        Parameters
+        ----------
+        readme_file_paths: List[str]
+            paths to the current package README files
+
+        Returns
+        -------
+        None
+        """
+        keys = set(os.path.relpath(path, self._work_dir_path)
+                   for path in readme_file_paths)
+
+        for key in list(self._packages.keys()):
+            if key not in keys:
+                del self._packages[key]
+                self._dirty = True
+
+    def save(self) -> None:
+        """
+        Persist the manifest, if it has changed
+
+        Returns
+        -------
+        None
+        """
+        if not self._dirty:
+            return
+
+        manifest_path = state_file_path(self._work_dir_path,
+                                        MANIFEST_FILE_NAME)
+        tmp_path = manifest_path + ".tmp"
+
+        with open(tmp_path, "w") as manifest_file:
+            json.dump({"version": MANIFEST_VERSION,
+                       "packages": self._packages},
+                      manifest_file, separators=(",", ":"))
+
+        os.replace(tmp_path, manifest_path)
+        self._dirty = False
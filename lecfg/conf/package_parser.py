@@ -26,8 +26,12 @@
 
 
 from lecfg.conf.conf_parser import ConfParser
-from lecfg.conf.conf import Conf
+from lecfg.conf.conf import Conf, LINK_DEPLOY_MODE, DEPLOY_MODES
 from lecfg.conf.conf_exception import ConfException
+from lecfg.conf.manifest import Manifest
+from lecfg.conf.system_index import SystemIndex, ALL_SYSTEMS
+from lecfg.conf.source_index import SourceIndex
+from typing import List, Tuple
 import os
 
 
@@ -37,6 +41,9 @@ PACKAGE_CONF_FIELDS = ["conf_file", "version",
 
 PACKAGE_CONF_FIELD_COUNT = len(PACKAGE_CONF_FIELDS)
 
+# optional last field of a package configuration line
+DEPLOY_MODE_FIELD = "deploy_mode"
+
 README_FILE_NAME = "README.lc"
 
 README_FILE_NOT_FOUND = ("The package directory is missing "
@@ -49,7 +56,12 @@ class PackageParser(ConfParser):
     """
 
     def __init__(self, package_dir_path: str, system_name: str,
-                 first_line: int = 0):
+                 first_line: int = 0, first_offset: int = None,
+                 fingerprint: str = None, manifest: Manifest = None,
+                 expand_dest_path: bool = True,
+                 deploy_mode: str = LINK_DEPLOY_MODE,
+                 system_index: SystemIndex = None,
+                 source_index: SourceIndex = None):
         """
         Constructor
 
@@ -58,9 +70,30 @@ class PackageParser(ConfParser):
         package_dir_path: str
             path to the package directory
         system_name: str
-            name of the system where lecfg is running
+            name of the system where lecfg is running, or None to read the
+            configurations of every system
         first_line: int
             first line of the file. Ignore all previous lines
+        first_offset: int
+            byte offset of the first line of the file
+        fingerprint: str
+            fingerprint of the file taken at the first line
+        manifest: Manifest
+            compiled manifest of the work directory from which to read the
+            parsed lines of the README file, or None to parse the file
+        expand_dest_path: bool
+            expand the user directory and the environment variables of the
+            destination paths. When False, the destination paths are kept as
+            written in the README file, to be expanded for each target later
+        deploy_mode: str
+            deploy mode of the configurations that do not set one
+        system_index: SystemIndex
+            index of the system ids, shared by the packages of a work
+            directory, or None to use an index of this package alone
+        source_index: SourceIndex
+            index of the files of the package, or of the whole work directory,
+            used to check that the configuration files exist. None to index
+            the package directory alone
 
         Raises
         ------
@@ -70,51 +103,153 @@ class PackageParser(ConfParser):
         """
         try:
             super().__init__(self._readme_file_path(package_dir_path),
-                             first_line)
+                             first_line, first_offset, fingerprint)
         except FileNotFoundError:
             raise ConfException(self._readme_file_path(package_dir_path),
                                 README_FILE_NOT_FOUND)
         self._package_dir_path = package_dir_path
         self._system_name = system_name
+        self._system_index = (system_index if system_index is not None
+                              else SystemIndex())
+        self._source_index = (source_index if source_index is not None
+                              else SourceIndex(package_dir_path))
+        self._system_mask = (ALL_SYSTEMS if system_name is None
+                             else 1 << self._system_index.system_id(
+                                 system_name))
+        self._manifest = manifest
+        self._expand_dest_path = expand_dest_path
+        self._deploy_mode = deploy_mode
 
-    def configurations(self) -> Conf:
+    def records(self) -> Tuple[int, int, str, List[str]]:
+        """
+        Generator function. Reads the lines from the manifest, when one is
+        provided
+
+        Returns
+        -------
+        Tuple[int, int, str, List[str]]
+            line number, byte offset, line digest and fields of the next line
+            from the README file
         """
-        Reads the next package configuration from the configuration file
+        if self._manifest is None:
+            yield from super().records()
+        else:
+            yield from self._manifest.records(self.file_path, self.stat,
+                                              self._first_line)
+
+    def _parse(self, package_conf: List[str], system_mask: int) -> Conf:
+        """
+        Validate a package configuration line and build its Conf object
+
+        Parameters
+        ----------
+        package_conf: List[str]
+            fields of the package configuration line
+        system_mask: int
+            mask of the systems of interest. The destination path of the
+            configurations of other systems is not expanded, as it may use
+            variables only set on those systems
 
         Returns
         -------
         Conf
-            Conf object representing the next configuration
+            Conf object representing the configuration, along with the mask
+            of the systems to which it applies, or None if it does not apply
+            to the systems of interest
+
+        Raises
+        ------
+        ConfException
+            Raised if the line has an unexpected number of fields, if the
+            configuration file does not exist, if the deploy mode is unknown
+            or if the destination path cannot be fully expanded
         """
-        for package_conf in super().lines():
-            package_conf_field_count = len(package_conf)
+        package_conf_field_count = len(package_conf)
 
-            if package_conf_field_count != PACKAGE_CONF_FIELD_COUNT:
-                message = ("Expected %d fields but got %d" %
-                           (PACKAGE_CONF_FIELD_COUNT,
-                            package_conf_field_count))
+        if package_conf_field_count not in (PACKAGE_CONF_FIELD_COUNT,
+                                            PACKAGE_CONF_FIELD_COUNT + 1):
+            message = ("Expected %d or %d fields but got %d" %
+                       (PACKAGE_CONF_FIELD_COUNT, PACKAGE_CONF_FIELD_COUNT + 1,
+                        package_conf_field_count))
 
-                raise ConfException(self._readme_file_path(
-                    self._package_dir_path), message, self.line_num)
+            raise ConfException(self._readme_file_path(
+                self._package_dir_path), message, self.line_num)
+
+        src_path = os.path.join(self._package_dir_path, package_conf[0])
+
+        if not self._source_index.exists(src_path):
+            message = ("Package %s mentions inexistent file: %s" %
+                       (self._package_dir_path, src_path))
+            raise ConfException(self._readme_file_path(
+                self._package_dir_path), message, self.line_num)
 
-            src_path = os.path.join(self._package_dir_path, package_conf[0])
+        version = package_conf[1]
+        systems = self._system_index.mask(package_conf[2])
+        description = package_conf[4]
+        deploy_mode = self._deploy_mode
 
-            if not os.path.exists(src_path):
-                message = ("Package %s mentions inexistent file: %s" %
-                           (self._package_dir_path, src_path))
+        if package_conf_field_count > PACKAGE_CONF_FIELD_COUNT:
+            deploy_mode = package_conf[5]
+
+            if deploy_mode not in DEPLOY_MODES:
+                message = ("Unknown deploy mode \"%s\", expected one of: %s" %
+                           (deploy_mode, ", ".join(DEPLOY_MODES)))
                 raise ConfException(self._readme_file_path(
                     self._package_dir_path), message, self.line_num)
 
-            version = package_conf[1]
-            system_list = package_conf[2].split(',')
-            dest_path = os.path.expandvars(package_conf[3])
-            description = package_conf[4]
+        if not systems & system_mask:
+            return None
+
+        if not self._expand_dest_path:
+            return Conf(src_path, package_conf[3], description, version,
+                        package_conf[3], deploy_mode, systems)
+
+        dest_path = os.path.expanduser(os.path.expandvars(package_conf[3]))
+
+        if "$" in dest_path or dest_path.startswith("~"):
+            message = ("Unable to expand the destination path: %s" %
+                       package_conf[3])
+            raise ConfException(self._readme_file_path(
+                self._package_dir_path), message, self.line_num)
+
+        return Conf(src_path, dest_path, description, version,
+                    package_conf[3], deploy_mode, systems)
+
+    def configurations(self) -> Conf:
+        """
+        Reads the next package configuration from the configuration file that
+        applies to the system
+
+        Returns
+        -------
+        Conf
+            Conf object representing the next configuration
+        """
+        for package_conf in super().lines():
+            conf = self._parse(package_conf, self._system_mask)
+
+            if conf is not None:
+                yield conf
+
+    def errors(self) -> List[ConfException]:
+        """
+        Validate every line of the package configuration file, regardless of
+        the systems to which each configuration applies
+
+        Returns
+        -------
+        List[ConfException]
+            errors found on the package configuration file
+        """
+        errors = []
+
+        for package_conf in super().lines():
+            try:
+                self._parse(package_conf, ALL_SYSTEMS)
+            except ConfException as e:
+                errors.append(e)
 
-            if(system_list[0] == "-"
-               or
-               self._system_name in system_list
-               ):
-                yield Conf(src_path, dest_path, description, version)
+        return errors
 
     def _readme_file_path(self, work_dir_path: str) -> str:
         """
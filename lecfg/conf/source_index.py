@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+
+###
+# MIT License
+#
+# Copyright (c) 2020 André Lousa Marques <andre.lousa.marques at gmail.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+###
+
+
+from threading import Lock
+from typing import Dict
+import os
+
+
+class SourceIndex():
+    """
+    Lazily populated index of the files below a directory. Each directory is
+    listed with a single os.scandir call the first time one of its entries is
+    looked up, and the type of every entry comes from that listing instead of
+    a stat call per path. Paths outside the directory are looked up on the
+    file system
+    """
+
+    def __init__(self, root_path: str):
+        """
+        Constructor
+
+        Parameters
+        ----------
+        root_path: str
+            path to the indexed directory
+        """
+        # the paths are compared as absolute paths, so that a relative root
+        # such as "." covers the paths built from it
+        self._root_path = os.path.abspath(root_path)
+        self._prefix = os.path.join(self._root_path, "")
+        self._dirs = {}
+        self._lock = Lock()
+
+    @property
+    def root_path(self) -> str:
+        """
+        Path to the indexed directory
+        """
+        return self._root_path
+
+    def covers(self, path: str) -> bool:
+        """
+        Check if a path is below the indexed directory
+
+        Parameters
+        ----------
+        path: str
+            file system path
+
+        Returns
+        -------
+        bool
+            True if the path is looked up on the index
+        """
+        return os.path.abspath(path).startswith(self._prefix)
+
+    def _entries(self, dir_path: str) -> Dict[str, os.DirEntry]:
+        """
+        Get the entries of an indexed directory, listing it if needed
+
+        Parameters
+        ----------
+        dir_path: str
+            normalized path to the directory
+
+        Returns
+        -------
+        Dict[str, os.DirEntry]
+            entries of the directory by name, empty if it is not a directory
+        """
+        entries = self._dirs.get(dir_path)
+
+        if entries is not None:
+            return entries
+
+        if dir_path != self._root_path:
+            entry = self._entry(dir_path)
+
+            if entry is None or not entry.is_dir():
+                # nothing to list below a missing path or a file
+                entries = {}
+
+        if entries is None:
+            try:
+                with os.scandir(dir_path) as dir_entries:
+                    entries = dict((entry.name, entry)
+                                   for entry in dir_entries)
+            except OSError:
+                entries = {}
+
+        # the prefetcher thread lists directories while the main thread
+        # invalidates them
+        with self._lock:
+            self._dirs[dir_path] = entries
+
+        return entries
+
+    def _entry(self, key: str) -> os.DirEntry:
+        parent, _, name = key.rpartition(os.sep)
+
+        return self._entries(parent).get(name)
+
+    def exists(self, path: str) -> bool:
+        """
+        Check if a path exists, following symbolic links
+
+        Parameters
+        ----------
+        path: str
+            file system path
+
+        Returns
+        -------
+        bool
+            True if the path exists
+        """
+        if not self.covers(path):
+            return os.path.exists(path)
+
+        entry = self._entry(os.path.abspath(path))
+
+        if entry is None:
+            return False
+
+        if entry.is_symlink():
+            try:
+                entry.stat()
+            except OSError:
+                # dangling symbolic link
+                return False
+
+        return True
+
+    def is_file(self, path: str) -> bool:
+        """
+        Check if a path is a regular file, following symbolic links
+
+        Parameters
+        ----------
+        path: str
+            file system path
+
+        Returns
+        -------
+        bool
+            True if the path is a regular file
+        """
+        if not self.covers(path):
+            return os.path.isfile(path)
+
+        entry = self._entry(os.path.abspath(path))
+
+        return entry is not None and entry.is_file()
+
+    def is_dir(self, path: str) -> bool:
+        """
+        Check if a path is a directory, following symbolic links
+
+        Parameters
+        ----------
+        path: str
+            file system path
+
+        Returns
+        -------
+        bool
+            True if the path is a directory
+        """
+        if not self.covers(path):
+            return os.path.isdir(path)
+
+        entry = self._entry(os.path.abspath(path))
+
+        return entry is not None and entry.is_dir()
+
+    def invalidate(self, path: str) -> None:
+        """
+        Forget the listings affected by a change to a path. To be called
+        whenever a path below the indexed directory is changed
+
+        Parameters
+        ----------
+        path: str
+            file system path that changed
+
+        Returns
+        -------
+        None
+        """
+        key = os.path.abspath(path)
+        prefix = os.path.join(key, "")
+
+        with self._lock:
+            self._dirs.pop(key.rpartition(os.sep)[0], None)
+
+            for dir_path in [d for d in self._dirs
+                             if d == key or d.startswith(prefix)]:
+                self._dirs.pop(dir_path, None)
@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+
+###
+# MIT License
+#
+# Copyright (c) 2020 André Lousa Marques <andre.lousa.marques at gmail.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+###
+
+
+from threading import Lock
+from typing import Dict, List
+
+# mask of the configurations that apply to every system
+ALL_SYSTEMS = -1
+
+# system list of the configurations that apply to every system
+ANY_SYSTEM = "-"
+
+
+class SystemIndex():
+    """
+    Interns system names into integer ids, so that the systems to which a
+    configuration applies are kept as a bitmask with the bit of each id set
+    """
+
+    def __init__(self, system_names: List[str] = None,
+                 members: Dict[str, List[str]] = None):
+        """
+        Constructor
+
+        Parameters
+        ----------
+        system_names: List[str]
+            names of the known systems, which get the lowest ids in the given
+            order. Other names are interned as they are found
+        members: Dict[str, List[str]]
+            systems each system or group stands for on a system list. Names
+            without members stand for themselves alone
+        """
+        self._ids = {}
+        self._systems = []
+        self._masks = {}
+        self._lock = Lock()
+
+        for system_name in system_names or []:
+            self.system_id(system_name)
+
+        self._member_masks = {}
+
+        for name, system_list in (members or {}).items():
+            mask = 0
+
+            for system_name in system_list:
+                mask |= 1 << self.system_id(system_name)
+
+            self._member_masks[name] = mask
+
+    @property
+    def systems(self) -> List[str]:
+        """
+        Names of the interned systems, ordered by id
+        """
+        return self._systems
+
+    def system_id(self, system_name: str) -> int:
+        """
+        Get the id of a system, interning its name if needed
+
+        Parameters
+        ----------
+        system_name: str
+            name of the system
+
+        Returns
+        -------
+        int
+            id of the system
+        """
+        system_id = self._ids.get(system_name)
+
+        if system_id is not None:
+            return system_id
+
+        # the packages may be parsed concurrently
+        with self._lock:
+            if system_name not in self._ids:
+                self._ids[system_name] = len(self._systems)
+                self._systems.append(system_name)
+
+            return self._ids[system_name]
+
+    def mask(self, system_list: str) -> int:
+        """
+        Get the mask of a system list as written in a README file. The masks
+        are cached per system list, as the same lists repeat over the whole
+        work directory
+
+        Parameters
+        ----------
+        system_list: str
+            comma separated system and group names, or "-" for every system
+
+        Returns
+        -------
+        int
+            mask with the bit of each system the list stands for set
+        """
+        mask = self._masks.get(system_list)
+
+        if mask is not None:
+            return mask
+
+        system_names = system_list.split(',')
+
+        if system_names[0] == ANY_SYSTEM:
+            mask = ALL_SYSTEMS
+        else:
+            mask = 0
+
+            for system_name in system_names:
+                member_mask = self._member_masks.get(system_name)
+
+                if member_mask is None:
+                    member_mask = 1 << self.system_id(system_name)
+
+                mask |= member_mask
+
+        self._masks[system_list] = mask
+
+        return mask
+
+    def system_names(self, mask: int) -> List[str]:
+        """
+        Get the names of the interned systems of a mask
+
+        Parameters
+        ----------
+        mask: int
+            mask of systems
+
+        Returns
+        -------
+        List[str]
+            names of the systems whose bit is set, ordered by id
+        """
+        return [system_name for system_id, system_name
+                in enumerate(self._systems) if mask & (1 << system_id)]
+
+    def counts(self, masks: List[int]) -> Dict[str, int]:
+        """
+        Count how many masks include each interned system
+
+        Parameters
+        ----------
+        masks: List[int]
+            masks of systems
+
+        Returns
+        -------
+        Dict[str, int]
+            number of masks with the bit of each system set
+        """
+        return dict((system_name, sum(1 for mask in masks
+                                      if mask & (1 << system_id)))
+                    for system_id, system_name in enumerate(self._systems))
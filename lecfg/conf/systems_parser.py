@@ -27,7 +27,8 @@
 
 from lecfg.conf.conf_parser import ConfParser
 from lecfg.conf.conf_exception import ConfException
-from typing import List
+from lecfg.conf.system_index import SystemIndex
+from typing import Dict, List, Set
 import os
 
 SYSTEMS_FILE_NAME = "lecfg.systems"
@@ -35,10 +36,22 @@ SYSTEMS_FILE_NAME = "lecfg.systems"
 SYSTEMS_FILE_NOT_FOUND = ("The provided work directory is missing "
                           "the systems file: %s" % SYSTEMS_FILE_NAME)
 
+# probe column value of the systems that cannot be detected
+NO_PROBE = "-"
+
+# parents column value of the systems that do not inherit from any other
+NO_PARENT = "-"
+
+# prefix of the names of the groups of systems
+GROUP_PREFIX = "@"
+
 
 class SystemsParser(ConfParser):
     """
-    Parser class for LECFG system.lecfg files
+    Parser class for LECFG system.lecfg files. Each line defines either a
+    system, as "name | probe | parents", or a group of systems, as
+    "@name | members". A system inherits the configurations of its parents,
+    and a group stands for all of its members along with their descendants
     """
 
     def __init__(self, work_dir_path: str):
@@ -53,7 +66,8 @@ class SystemsParser(ConfParser):
         Raises
         ------
         ConfException
-            Raised if the work directory does not have a systems file
+            Raised if the work directory does not have a systems file, or if
+            the systems and groups defined on it are invalid
         """
         try:
             super().__init__(self._systems_file_path(work_dir_path))
@@ -61,9 +75,172 @@ class SystemsParser(ConfParser):
             raise ConfException(self._systems_file_path(work_dir_path),
                                 SYSTEMS_FILE_NOT_FOUND)
         self._systems = []
+        self._probes = {}
+        self._parents = {}
+        self._groups = {}
+        self._line_nums = {}
 
         for line in super().lines():
-            self._systems.append(line[0])
+            name = line[0]
+
+            if name in self._line_nums:
+                self._error(name, "\"%s\" is defined more than once" % name,
+                            self.line_num)
+
+            self._line_nums[name] = self.line_num
+
+            if name.startswith(GROUP_PREFIX):
+                members = self._names(line[1] if len(line) > 1 else "")
+
+                if len(members) == 0:
+                    self._error(name, "Group \"%s\" has no members" % name)
+
+                self._groups[name] = members
+                continue
+
+            self._systems.append(name)
+
+            if len(line) > 1 and line[1] not in ("", NO_PROBE):
+                self._probes[name] = line[1]
+
+            if len(line) > 2 and line[2] not in ("", NO_PARENT):
+                self._parents[name] = self._names(line[2])
+
+        self._ancestors = {}
+        self._members = {}
+        self._resolve()
+
+    def _names(self, name_list: str) -> List[str]:
+        return [name.strip() for name in name_list.split(",")
+                if not name.isspace() and name != ""]
+
+    def _error(self, name: str, message: str, line_num: int = None) -> None:
+        """
+        Raise an error about the line that defines a system or group
+
+        Parameters
+        ----------
+        name: str
+            name of the system or group
+        message: str
+            error message
+        line_num: int
+            line of the error, if not the line that defines the name
+
+        Raises
+        ------
+        ConfException
+            always
+        """
+        raise ConfException(self.file_path, message,
+                            line_num if line_num is not None
+                            else self._line_nums[name])
+
+    def _resolve_ancestors(self, system_name: str, path: List[str]
+                           ) -> Set[str]:
+        """
+        Find every system from which a system inherits
+
+        Parameters
+        ----------
+        system_name: str
+            name of the system
+        path: List[str]
+            systems being resolved that inherit from this one, used to detect
+            cycles
+
+        Returns
+        -------
+        Set[str]
+            names of the parents of the system and of their ancestors
+        """
+        if system_name in self._ancestors:
+            return self._ancestors[system_name]
+
+        if system_name in path:
+            cycle = path[path.index(system_name):] + [system_name]
+            self._error(system_name, "Systems inherit from each other: %s" %
+                        " -> ".join(cycle))
+
+        ancestors = set()
+
+        for parent in self._parents.get(system_name, []):
+            if parent not in self._members:
+                self._error(system_name, "\"%s\" inherits from the unknown "
+                            "system \"%s\"" % (system_name, parent))
+
+            ancestors.add(parent)
+            ancestors |= self._resolve_ancestors(parent, path + [system_name])
+
+        self._ancestors[system_name] = ancestors
+
+        return ancestors
+
+    def _resolve_group(self, group_name: str, path: List[str]) -> Set[str]:
+        """
+        Find every system of a group
+
+        Parameters
+        ----------
+        group_name: str
+            name of the group
+        path: List[str]
+            groups being resolved that include this one, used to detect cycles
+
+        Returns
+        -------
+        Set[str]
+            names of the systems of the group, including the descendants of
+            its members
+        """
+        if group_name in self._members:
+            return self._members[group_name]
+
+        if group_name in path:
+            cycle = path[path.index(group_name):] + [group_name]
+            self._error(group_name, "Groups include each other: %s" %
+                        " -> ".join(cycle))
+
+        members = set()
+
+        for member in self._groups[group_name]:
+            if member in self._groups:
+                members |= self._resolve_group(member, path + [group_name])
+            elif member in self._members:
+                members |= self._members[member]
+            else:
+                self._error(group_name, "Group \"%s\" includes the unknown "
+                            "system \"%s\"" % (group_name, member))
+
+        self._members[group_name] = members
+
+        return members
+
+    def _resolve(self) -> None:
+        """
+        Expand the parents and the groups into the set of systems each system
+        and group stands for, so that matching a system against them is a
+        single lookup regardless of the depth of the hierarchy
+
+        Returns
+        -------
+        None
+
+        Raises
+        ------
+        ConfException
+            Raised if a system or group refers to an unknown system, or if
+            they refer to each other in a cycle
+        """
+        for system_name in self._systems:
+            self._members[system_name] = {system_name}
+
+        for system_name in self._systems:
+            for ancestor in self._resolve_ancestors(system_name, []):
+                self._members[ancestor].add(system_name)
+
+        for group_name in self._groups:
+            self._resolve_group(group_name, [])
 
     @property
     def systems(self) -> List[str]:
@@ -76,6 +253,65 @@ class SystemsParser(ConfParser):
     def systems(self, value: List[str]) -> None:
         self._systems = value
 
+    @property
+    def probes(self) -> Dict[str, str]:
+        """
+        Command that detects each system, which succeeds only when run on it.
+        Systems without a probe cannot be detected
+        """
+        return self._probes
+
+    def ancestors(self, system_name: str) -> Set[str]:
+        """
+        Systems from which a system inherits
+
+        Parameters
+        ----------
+        system_name: str
+            name of the system
+
+        Returns
+        -------
+        Set[str]
+            names of the parents of the system and of their ancestors
+        """
+        return self._ancestors.get(system_name, set())
+
+    def members(self, name: str) -> List[str]:
+        """
+        Systems a system or group stands for on a README file
+
+        Parameters
+        ----------
+        name: str
+            name of the system or group
+
+        Returns
+        -------
+        List[str]
+            names of the system and of its descendants, or of every system of
+            the group, in the order of the systems file
+        """
+        members = self._members.get(name, set())
+
+        return [system_name for system_name in self._systems
+                if system_name in members]
+
+    def system_index(self) -> SystemIndex:
+        """
+        Build an index of the system ids, where the systems of the systems
+        file get the lowest ids in the order of the file, and each system and
+        group is mapped to the systems it stands for
+
+        Returns
+        -------
+        SystemIndex
+            index of the system ids
+        """
+        return SystemIndex(self.systems,
+                           dict((name, self.members(name))
+                                for name in self._members))
+
     def is_valid(self, system_name: str) -> bool:
         """
         Check if a given system is a valid system for the given work directory
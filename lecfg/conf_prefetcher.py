@@ -0,0 +1,374 @@
+# -*- coding: utf-8 -*-
+
+###
+# MIT License
+#
+# Copyright (c) 2020 André Lousa Marques <andre.lousa.marques at gmail.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+###
+
+
+from lecfg.conf.conf import Conf
+from lecfg.conf.package_parser import PackageParser
+from lecfg.conf.source_index import SourceIndex
+from lecfg.path_cache import PathStatusCache
+from lecfg.checksum import DigestCache
+from lecfg.conf_status import ConfStatus, conf_status, same_contents
+from threading import Event, Thread
+from typing import List
+import queue
+import os
+
+# number of configurations evaluated ahead of the one under process
+PREFETCH_DEPTH = 8
+
+# interval at which a blocked worker checks if it was stopped, in seconds
+STOP_CHECK_INTERVAL = 0.1
+
+
+class PrefetchedConf():
+    """
+    Configuration read ahead from a package, along with its position on the
+    README file and its deployment status when it was read
+    """
+
+    def __init__(self, package: PackageParser, conf: Conf,
+                 generation: int, error: Exception = None):
+        """
+        Constructor
+
+        Parameters
+        ----------
+        package: PackageParser
+            package parser positioned at the line of the configuration
+        conf: Conf
+            configuration read, or None if reading it failed
+        generation: int
+            number of changes made to the file system before the status of the
+            configuration was evaluated
+        error: Exception
+            error raised while reading the configuration
+        """
+        self._conf = conf
+        self._file_path = package.file_path
+        self._line_num = package.line_num
+        self._offset = package.offset
+        self._fingerprint = package.fingerprint
+        self._generation = generation
+        self._error = error
+        self._status = None
+        self._identical = None
+
+    @property
+    def conf(self) -> Conf:
+        """
+        Configuration read
+        """
+        return self._conf
+
+    @property
+    def file_path(self) -> str:
+        """
+        Path to the README file of the configuration
+        """
+        return self._file_path
+
+    @property
+    def line_num(self) -> int:
+        """
+        Line of the configuration on the README file
+        """
+        return self._line_num
+
+    @property
+    def offset(self) -> int:
+        """
+        Byte offset of the line of the configuration
+        """
+        return self._offset
+
+    @property
+    def fingerprint(self) -> str:
+        """
+        Fingerprint of the README file taken at the line of the configuration
+        """
+        return self._fingerprint
+
+    @property
+    def generation(self) -> int:
+        """
+        Number of changes made to the file system before the status of the
+        configuration was evaluated
+        """
+        return self._generation
+
+    @property
+    def error(self) -> Exception:
+        """
+        Error raised while reading the configuration
+        """
+        return self._error
+
+    @property
+    def status(self) -> ConfStatus:
+        """
+        Deployment status of the configuration, or None if it is unknown
+        """
+        return self._status
+
+    @status.setter
+    def status(self, value) -> None:
+        self._status = value
+
+    @property
+    def identical(self) -> bool:
+        """
+        Whether the conflicting destination has the same contents as the
+        source, or None if they were not compared
+        """
+        return self._identical
+
+    @identical.setter
+    def identical(self, value) -> None:
+        self._identical = value
+
+
+class ConfPrefetcher():
+    """
+    Reads the configurations of a package in a background thread, evaluating
+    the deployment status of the next ones while the user answers about the
+    current one
+    """
+
+    def __init__(self, package: PackageParser, digest_cache: DigestCache,
+                 source_index: SourceIndex = None,
+                 depth: int = PREFETCH_DEPTH):
+        """
+        Constructor. Starts reading the package
+
+        Parameters
+        ----------
+        package: PackageParser
+            parser of the package to read. It must not be used by anyone else
+            until the prefetcher is closed
+        digest_cache: DigestCache
+            cache of file digests, warmed by comparing the conflicting
+            configurations
+        source_index: SourceIndex
+            index of the configuration sources, shared with the main thread
+        depth: int
+            maximum number of configurations read ahead
+        """
+        self._package = package
+        self._digest_cache = digest_cache
+        self._source_index = source_index
+        self._queue = queue.Queue(depth)
+        self._stop = Event()
+        self._changed_paths = []
+        self._position = None
+        self._thread = Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _evaluate(self, item: PrefetchedConf) -> None:
+        """
+        Evaluate the deployment status of a configuration and compare its
+        contents when it conflicts with the destination
+
+        Parameters
+        ----------
+        item: PrefetchedConf
+            configuration to evaluate
+
+        Returns
+        -------
+        None
+        """
+        # the status cache is not shared with the main thread, which changes
+        # the file system, and only lives for a single configuration so that
+        # it is never older than the generation of the configuration
+        path_cache = PathStatusCache(source_index=self._source_index)
+        conf = item.conf
+
+        item.status = conf_status(conf, path_cache, self._digest_cache)
+
+        if (item.status is ConfStatus.CONFLICT
+           and not path_cache.is_symlink(conf.dest_path)):
+            item.identical = same_contents(conf, path_cache,
+                                           self._digest_cache)
+
+    def _put(self, item: PrefetchedConf) -> bool:
+        """
+        Queue a configuration, waiting for room in the queue
+
+        Parameters
+        ----------
+        item: PrefetchedConf
+            configuration to queue, or None to signal the end of the package
+
+        Returns
+        -------
+        bool
+            False if the prefetcher was stopped before the configuration was
+            queued
+        """
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=STOP_CHECK_INTERVAL)
+                return True
+            except queue.Full:
+                continue
+
+        return False
+
+    def _run(self) -> None:
+        try:
+            for conf in self._package.configurations():
+                item = PrefetchedConf(self._package, conf,
+                                      len(self._changed_paths))
+
+                try:
+                    self._evaluate(item)
+                except OSError:
+                    # let the main thread evaluate it again and handle the
+                    # error
+                    item.status = None
+                    item.identical = None
+
+                if not self._put(item):
+                    return
+        except Exception as e:
+            # raised on the main thread once it reaches the failing line
+            if not self._put(PrefetchedConf(self._package, None,
+                                            len(self._changed_paths), e)):
+                return
+
+        self._put(None)
+
+    def __iter__(self) -> PrefetchedConf:
+        """
+        Generator function
+
+        Returns
+        -------
+        PrefetchedConf
+            the next configuration of the package
+
+        Raises
+        ------
+        Exception
+            the error raised while reading the next configuration
+        """
+        while True:
+            item = self._queue.get()
+
+            if item is None:
+                return
+
+            self._position = item
+
+            if item.error is not None:
+                raise item.error
+
+            yield item
+
+    @property
+    def position(self) -> PrefetchedConf:
+        """
+        Configuration under process, or the line that failed to be read. None
+        before the first configuration
+        """
+        return self._position
+
+    def changed(self, path: str) -> None:
+        """
+        Signal that a path was changed on the file system, after the
+        prefetcher was started
+
+        Parameters
+        ----------
+        path: str
+            path that was changed
+
+        Returns
+        -------
+        None
+        """
+        self._changed_paths.append(os.path.normpath(path))
+
+    def _is_stale(self, item: PrefetchedConf) -> bool:
+        """
+        Check if the status of a configuration may have changed since it was
+        evaluated
+
+        Parameters
+        ----------
+        item: PrefetchedConf
+            evaluated configuration
+
+        Returns
+        -------
+        bool
+            True if the status must be evaluated again
+        """
+        if item.status is None or item.status is ConfStatus.MISSING_PARENT:
+            # the missing parent directories may have been created since
+            return True
+
+        dest_path = os.path.normpath(item.conf.dest_path)
+        changed_paths: List[str] = self._changed_paths[item.generation:]
+
+        # a plain prefix test also matches the backups and some unrelated
+        # siblings, which only costs an extra evaluation
+        return any(dest_path.startswith(path) or path.startswith(dest_path)
+                   for path in changed_paths)
+
+    def refresh(self, item: PrefetchedConf,
+                path_cache: PathStatusCache) -> None:
+        """
+        Evaluate the status of a configuration again if the file system
+        changed under it since it was prefetched
+
+        Parameters
+        ----------
+        item: PrefetchedConf
+            configuration about to be processed
+        path_cache: PathStatusCache
+            cache of the status of the paths, as kept by the main thread
+
+        Returns
+        -------
+        None
+        """
+        if not self._is_stale(item):
+            return
+
+        item.status = conf_status(item.conf, path_cache, self._digest_cache)
+        item.identical = None
+
+    def close(self) -> None:
+        """
+        Stop reading the package and wait for the background thread to finish
+
+        Returns
+        -------
+        None
+        """
+        self._stop.set()
+        self._thread.join()
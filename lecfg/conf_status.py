@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+
+###
+# MIT License
+#
+# Copyright (c) 2020 André Lousa Marques <andre.lousa.marques at gmail.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+###
+
+from lecfg.conf.conf import Conf, COPY_DEPLOY_MODE, FARM_DEPLOY_MODE
+from lecfg.path_cache import PathStatusCache
+from lecfg.checksum import DigestCache
+from lecfg.file_compare import files_identical
+from lecfg.dir_compare import dir_differences
+from lecfg.link_farm import link_farm_plan
+from enum import Enum
+import os
+
+
+class ConfStatus(Enum):
+    LINKED = "linked"
+    COPIED = "copied"
+    MISSING = "missing"
+    MISSING_PARENT = "missing-parent"
+    CONFLICT = "conflict"
+    TYPE_MISMATCH = "type-mismatch"
+    DANGLING_LINK = "dangling-link"
+
+
+def same_contents(conf: Conf, path_cache: PathStatusCache,
+                  digest_cache: DigestCache) -> bool:
+    """
+    Check if the destination of a configuration is an identical copy of the
+    source. A symbolic link at the destination is never a copy, and a
+    destination directory may have entries of its own
+
+    Parameters
+    ----------
+    conf: Conf
+        configuration to evaluate
+    path_cache: PathStatusCache
+        cache of the status of the configuration paths
+    digest_cache: DigestCache
+        cache of file digests
+
+    Returns
+    -------
+    bool
+        True if the destination has the same contents as the source
+    """
+    if path_cache.is_symlink(conf.dest_path):
+        return False
+
+    if path_cache.is_file(conf.src_path) and path_cache.is_file(
+            conf.dest_path):
+        return files_identical(conf.src_path, conf.dest_path, digest_cache)
+
+    if path_cache.is_dir(conf.src_path) and path_cache.is_dir(
+            conf.dest_path):
+        # the entries added to a copied directory, such as the backups of
+        # the files it replaced, are left alone like in a link farm
+        return len(dir_differences(conf.src_path, conf.dest_path,
+                                   digest_cache, as_copy=True)) == 0
+
+    return False
+
+
+def conf_status(conf: Conf, path_cache: PathStatusCache,
+                digest_cache: DigestCache = None) -> ConfStatus:
+    """
+    Evaluate the deployment status of a configuration in the current system
+
+    Parameters
+    ----------
+    conf: Conf
+        configuration to evaluate
+    path_cache: PathStatusCache
+        cache of the status of the configuration paths
+    digest_cache: DigestCache
+        cache of file digests, used to check if the configurations deployed
+        as copies are up to date
+
+    Returns
+    -------
+    ConfStatus
+        deployment status of the configuration
+    """
+    if conf.deploy_mode == COPY_DEPLOY_MODE:
+        if same_contents(conf, path_cache,
+                         digest_cache if digest_cache is not None
+                         else DigestCache()):
+            return ConfStatus.COPIED
+    elif path_cache.links_to(conf.dest_path, conf.src_path):
+        return ConfStatus.LINKED
+    elif (conf.deploy_mode == FARM_DEPLOY_MODE
+          and path_cache.is_dir(conf.src_path)
+          and path_cache.is_dir(conf.dest_path)
+          and not path_cache.is_symlink(conf.dest_path)
+          and len(link_farm_plan(conf.src_path, conf.dest_path)) == 0):
+        # every entry of the source directory is linked
+        return ConfStatus.LINKED
+
+    if path_cache.exists(conf.dest_path):
+        if ((path_cache.is_dir(conf.dest_path)
+             and path_cache.is_file(conf.src_path))
+            or
+            (path_cache.is_file(conf.dest_path)
+             and path_cache.is_dir(conf.src_path))):
+            return ConfStatus.TYPE_MISMATCH
+
+        return ConfStatus.CONFLICT
+
+    if path_cache.is_symlink(conf.dest_path):
+        return ConfStatus.DANGLING_LINK
+
+    if path_cache.exists(os.path.dirname(conf.dest_path)):
+        return ConfStatus.MISSING
+
+    return ConfStatus.MISSING_PARENT
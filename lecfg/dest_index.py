@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+
+###
+# MIT License
+#
+# Copyright (c) 2020 André Lousa Marques <andre.lousa.marques at gmail.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+###
+
+from lecfg.conf.conf import Conf
+from typing import List
+import os
+
+
+class DestinationIndex():
+    """
+    Index of the destination paths of the configurations of a work
+    directory, used to find the configurations that would overwrite each
+    other
+    """
+
+    def __init__(self):
+        """
+        Constructor
+        """
+        self._owners = {}
+        self._duplicates = []
+
+    def _owner(self, readme_path: str, line_num: int) -> str:
+        return "\"%s\" at line %d" % (readme_path, line_num)
+
+    def add(self, readme_path: str, line_num: int, conf: Conf) -> None:
+        """
+        Add the destination path of a configuration to the index
+
+        Parameters
+        ----------
+        readme_path: str
+            path to the README file of the configuration
+        line_num: int
+            line of the README file of the configuration
+        conf: Conf
+            configuration
+
+        Returns
+        -------
+        None
+        """
+        dest_path = os.path.normpath(conf.dest_path)
+        owner = self._owner(readme_path, line_num)
+
+        if dest_path in self._owners:
+            self._duplicates.append(
+                "%s and %s have the same destination: %s" %
+                (self._owners[dest_path], owner, dest_path))
+            return
+
+        self._owners[dest_path] = owner
+
+    def conflicts(self) -> List[str]:
+        """
+        Find the configurations that would overwrite each other: the ones
+        with the same destination path, and the ones whose destination path
+        is inside the destination path of another one. Each destination path
+        is only looked up along its parent directories
+
+        Returns
+        -------
+        List[str]
+            description of each conflict found
+        """
+        conflicts = list(self._duplicates)
+
+        for dest_path, owner in self._owners.items():
+            child, parent = dest_path, os.path.dirname(dest_path)
+
+            while parent not in ("", child):
+                if parent in self._owners:
+                    conflicts.append(
+                        "%s deploys %s inside the destination of %s: %s" %
+                        (owner, dest_path, self._owners[parent], parent))
+                    break
+
+                child, parent = parent, os.path.dirname(parent)
+
+        return conflicts
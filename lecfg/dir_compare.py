@@ -0,0 +1,287 @@
+# -*- coding: utf-8 -*-
+
+###
+# MIT License
+#
+# Copyright (c) 2020 André Lousa Marques <andre.lousa.marques at gmail.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+###
+
+from lecfg.checksum import DigestCache
+from typing import Dict, List
+import hashlib
+import os
+import stat
+
+FILE_NODE = "f"
+LINK_NODE = "l"
+DIR_NODE = "d"
+SPECIAL_NODE = "s"
+
+NODE_KIND_NAMES = {FILE_NODE: "regular file",
+                   LINK_NODE: "symbolic link",
+                   DIR_NODE: "directory",
+                   SPECIAL_NODE: "special file"}
+
+
+def _link_digest(link_path: str) -> str:
+    """
+    Hash a symbolic link by its target path
+
+    Parameters
+    ----------
+    link_path: str
+        path to the symbolic link
+
+    Returns
+    -------
+    str
+        hexadecimal digest of the symbolic link target
+    """
+    return hashlib.sha512(os.readlink(link_path).encode()).hexdigest()
+
+
+def _special_digest(status: os.stat_result) -> str:
+    """
+    Hash a special file, such as a named pipe, a socket or a device, by its
+    type and mode, since reading its contents could block or never end
+
+    Parameters
+    ----------
+    status: os.stat_result
+        status of the special file, not following symbolic links
+
+    Returns
+    -------
+    str
+        hexadecimal digest of the special file type and mode
+    """
+    return hashlib.sha512(("%o" % status.st_mode).encode()).hexdigest()
+
+
+class MerkleNode():
+    """
+    Node of the Merkle tree of a directory. The hash of a directory node is
+    built from the names, kinds and hashes of its children, so two directories
+    have the same hash only if their whole trees have the same contents
+    """
+
+    def __init__(self, kind: str, digest: str,
+                 children: Dict[str, "MerkleNode"] = None):
+        """
+        Constructor
+
+        Parameters
+        ----------
+        kind: str
+            kind of file system entry represented by the node
+        digest: str
+            hash of the entry
+        children: Dict[str, MerkleNode]
+            nodes of the directory entries, by name, when the node represents a
+            directory
+        """
+        self.kind = kind
+        self.digest = digest
+        self.children = children
+
+    @staticmethod
+    def build(path: str, digest_cache: DigestCache,
+              follow_symlinks: bool = False) -> "MerkleNode":
+        """
+        Build the Merkle tree of a file system entry with a single os.scandir
+        pass per directory. File contents are only read when their digest is
+        not cached yet
+
+        Parameters
+        ----------
+        path: str
+            path to the entry
+        digest_cache: DigestCache
+            cache of file digests
+        follow_symlinks: bool
+            build the tree of the entry a symbolic link points to, instead of
+            a node for the link itself. The entries below are never followed
+
+        Returns
+        -------
+        MerkleNode
+            root node of the tree
+        """
+        status = os.stat(path, follow_symlinks=follow_symlinks)
+
+        if stat.S_ISLNK(status.st_mode):
+            return MerkleNode(LINK_NODE, _link_digest(path))
+
+        if stat.S_ISREG(status.st_mode):
+            return MerkleNode(FILE_NODE, digest_cache.digest(path, status))
+
+        if not stat.S_ISDIR(status.st_mode):
+            return MerkleNode(SPECIAL_NODE, _special_digest(status))
+
+        children = {}
+
+        with os.scandir(path) as it:
+            for entry in it:
+                if entry.is_symlink():
+                    children[entry.name] = MerkleNode(
+                        LINK_NODE, _link_digest(entry.path))
+                elif entry.is_dir():
+                    children[entry.name] = MerkleNode.build(entry.path,
+                                                            digest_cache)
+                elif entry.is_file(follow_symlinks=False):
+                    children[entry.name] = MerkleNode(
+                        FILE_NODE, digest_cache.digest(entry.path,
+                                                       entry.stat()))
+                else:
+                    children[entry.name] = MerkleNode(
+                        SPECIAL_NODE, _special_digest(
+                            entry.stat(follow_symlinks=False)))
+
+        digest = hashlib.sha512()
+
+        for name in sorted(children):
+            child = children[name]
+            digest.update(("%s\0%s\0%s\n" % (name, child.kind, child.digest)
+                           ).encode())
+
+        return MerkleNode(DIR_NODE, digest.hexdigest(), children)
+
+
+def _tree_differences(from_path: str, from_node: MerkleNode, to_path: str,
+                      to_node: MerkleNode, differences: List[str],
+                      as_copy: bool) -> None:
+    """
+    Collect the differences between two Merkle trees, descending only into the
+    sub trees whose hashes differ
+
+    Parameters
+    ----------
+    from_path: str
+        path to the original entry
+    from_node: MerkleNode
+        tree of the original entry
+    to_path: str
+        path to the changed entry
+    to_node: MerkleNode
+        tree of the changed entry
+    differences: List[str]
+        list to which the differences are added
+    as_copy: bool
+        compare the changed tree as a copy of the original one, ignoring the
+        entries added to the copy and the special files, which are not copied
+
+    Returns
+    -------
+    None
+    """
+    if from_node.kind == to_node.kind and from_node.digest == to_node.digest:
+        return
+
+    if from_node.kind != to_node.kind:
+        differences.append("File %s is a %s while file %s is a %s" %
+                           (from_path, NODE_KIND_NAMES[from_node.kind],
+                            to_path, NODE_KIND_NAMES[to_node.kind]))
+    elif from_node.kind != DIR_NODE:
+        differences.append("Files %s and %s differ" % (from_path, to_path))
+    else:
+        for name in sorted(set(from_node.children) | set(to_node.children)):
+            if name not in to_node.children:
+                if not (as_copy and from_node.children[name].kind
+                        == SPECIAL_NODE):
+                    differences.append("Only in %s: %s" % (from_path, name))
+            elif name not in from_node.children:
+                if not as_copy:
+                    differences.append("Only in %s: %s" % (to_path, name))
+            else:
+                _tree_differences(os.path.join(from_path, name),
+                                  from_node.children[name],
+                                  os.path.join(to_path, name),
+                                  to_node.children[name], differences,
+                                  as_copy)
+
+
+def dir_differences(from_dir_path: str, to_dir_path: str,
+                    digest_cache: DigestCache,
+                    as_copy: bool = False) -> List[str]:
+    """
+    List the differences between two directory trees
+
+    Parameters
+    ----------
+    from_dir_path: str
+        path to the original directory
+    to_dir_path: str
+        path to the changed directory
+    digest_cache: DigestCache
+        cache of file digests
+    as_copy: bool
+        compare the changed directory as a copy of the original one, ignoring
+        the entries added to the copy and the special files, which are not
+        copied
+
+    Returns
+    -------
+    List[str]
+        description of each differing entry, in the style of "diff -r"
+    """
+    differences = []
+
+    # the compared directories themselves may be reached through symbolic
+    # links, such as a configuration directory linked elsewhere
+    _tree_differences(from_dir_path,
+                      MerkleNode.build(from_dir_path, digest_cache, True),
+                      to_dir_path,
+                      MerkleNode.build(to_dir_path, digest_cache, True),
+                      differences, as_copy)
+
+    return differences
+
+
+def compare_dirs(from_dir_path: str, to_dir_path: str,
+                 digest_cache: DigestCache) -> bool:
+    """
+    Compare two directory trees and print the entries that differ
+
+    Parameters
+    ----------
+    from_dir_path: str
+        path to the original directory
+    to_dir_path: str
+        path to the changed directory
+    digest_cache: DigestCache
+        cache of file digests
+
+    Returns
+    -------
+    bool
+        True if both directory trees have the same contents
+    """
+    differences = dir_differences(from_dir_path, to_dir_path, digest_cache)
+
+    if len(differences) == 0:
+        print("Directories %s and %s are identical" % (from_dir_path,
+                                                       to_dir_path))
+        return True
+
+    for difference in differences:
+        print(difference)
+
+    return False
@@ -36,3 +36,7 @@ class ExitCode(Enum):
     USER_INTERRUPT = 5
     INVALID_README_FORMAT = 6
     PERMISSION_ERROR = 7
+    CHECKSUM_MISMATCH = 8
+    INVALID_ANSWER_FILE = 9
+    DESTINATION_CONFLICT = 10
+    INVALID_SYSTEMS_FILE = 11
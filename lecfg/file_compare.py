@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+
+###
+# MIT License
+#
+# Copyright (c) 2020 André Lousa Marques <andre.lousa.marques at gmail.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+###
+
+from lecfg.checksum import DigestCache
+from typing import Iterator
+import difflib
+import os
+
+
+def files_identical(file_path: str, other_file_path: str,
+                    digest_cache: DigestCache) -> bool:
+    """
+    Check if two files have the same contents. The file sizes are compared
+    first and the file contents are only hashed when the sizes match
+
+    Parameters
+    ----------
+    file_path: str
+        path to a file
+    other_file_path: str
+        path to the other file
+    digest_cache: DigestCache
+        cache of file digests
+
+    Returns
+    -------
+    bool
+        True if both files have the same contents
+    """
+    stat = os.stat(file_path)
+    other_stat = os.stat(other_file_path)
+
+    if stat.st_dev == other_stat.st_dev and stat.st_ino == other_stat.st_ino:
+        return True
+
+    if stat.st_size != other_stat.st_size:
+        return False
+
+    return (digest_cache.digest(file_path, stat) ==
+            digest_cache.digest(other_file_path, other_stat))
+
+
+def unified_diff(from_file_path: str, to_file_path: str) -> Iterator[str]:
+    """
+    Build the unified diff between two text files
+
+    Parameters
+    ----------
+    from_file_path: str
+        path to the original file
+    to_file_path: str
+        path to the changed file
+
+    Returns
+    -------
+    Iterator[str]
+        lines of the unified diff
+
+    Raises
+    ------
+    UnicodeDecodeError
+        if any of the files is not a text file
+    """
+    with open(from_file_path, "r") as from_file:
+        from_lines = from_file.readlines()
+
+    with open(to_file_path, "r") as to_file:
+        to_lines = to_file.readlines()
+
+    return difflib.unified_diff(from_lines, to_lines, from_file_path,
+                                to_file_path)
+
+
+def compare_files(from_file_path: str, to_file_path: str,
+                  digest_cache: DigestCache) -> bool:
+    """
+    Compare two files and print their differences in the unified diff format
+
+    Parameters
+    ----------
+    from_file_path: str
+        path to the original file
+    to_file_path: str
+        path to the changed file
+    digest_cache: DigestCache
+        cache of file digests
+
+    Returns
+    -------
+    bool
+        True if both files have the same contents
+    """
+    if files_identical(from_file_path, to_file_path, digest_cache):
+        print("Files %s and %s are identical" % (from_file_path,
+                                                 to_file_path))
+        return True
+
+    try:
+        for line in unified_diff(from_file_path, to_file_path):
+            print(line, end="" if line.endswith("\n") else "\n")
+    except UnicodeDecodeError:
+        print("Binary files %s and %s differ" % (from_file_path,
+                                                 to_file_path))
+
+    return False
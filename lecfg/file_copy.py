@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+
+###
+# MIT License
+#
+# Copyright (c) 2020 André Lousa Marques <andre.lousa.marques at gmail.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+###
+
+import errno
+import shutil
+import stat
+import os
+
+TMP_FILE_SUFFIX = ".lecfg.tmp"
+
+# errors raised by copy_file_range and sendfile when the file systems do not
+# support them
+_UNSUPPORTED_ERRNOS = (errno.EXDEV, errno.ENOSYS, errno.EINVAL,
+                       errno.EOPNOTSUPP, errno.ENOTSUP)
+
+
+def _copy_range(src_fd: int, dest_fd: int, size: int) -> bool:
+    """
+    Copy the contents of a file inside the kernel, with copy_file_range or,
+    when not supported, with sendfile
+
+    Parameters
+    ----------
+    src_fd: int
+        descriptor of the file to copy
+    dest_fd: int
+        descriptor of the destination file
+    size: int
+        size of the file to copy
+
+    Returns
+    -------
+    bool
+        True if the file was copied, False if neither call is supported
+    """
+    for copy_call in ("copy_file_range", "sendfile"):
+        if not hasattr(os, copy_call):
+            continue
+
+        offset = 0
+
+        try:
+            while offset < size:
+                if copy_call == "copy_file_range":
+                    copied = os.copy_file_range(src_fd, dest_fd,
+                                                size - offset)
+                else:
+                    copied = os.sendfile(dest_fd, src_fd, offset,
+                                         size - offset)
+
+                if copied == 0:
+                    # the file was truncated while being copied
+                    break
+
+                offset += copied
+
+            return True
+        except OSError as e:
+            if e.errno not in _UNSUPPORTED_ERRNOS or offset > 0:
+                raise
+
+    return False
+
+
+def copy_file(src_path: str, dest_path: str) -> None:
+    """
+    Copy a file, preserving its mode bits. The destination is replaced
+    atomically
+
+    Parameters
+    ----------
+    src_path: str
+        path to the file to copy
+    dest_path: str
+        path to the destination file
+
+    Returns
+    -------
+    None
+    """
+    src_stat = os.stat(src_path)
+    tmp_path = dest_path + TMP_FILE_SUFFIX
+    src_fd = os.open(src_path, os.O_RDONLY)
+
+    try:
+        dest_fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC,
+                          stat.S_IMODE(src_stat.st_mode))
+
+        try:
+            copied = _copy_range(src_fd, dest_fd, src_stat.st_size)
+            os.fchmod(dest_fd, stat.S_IMODE(src_stat.st_mode))
+        finally:
+            os.close(dest_fd)
+    finally:
+        os.close(src_fd)
+
+    if not copied:
+        # let shutil pick the fastest copy available on this platform
+        shutil.copyfile(src_path, tmp_path)
+
+    os.replace(tmp_path, dest_path)
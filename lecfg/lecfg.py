@@ -25,11 +25,14 @@
 ###
 
 from lecfg.conf.systems_parser import SystemsParser
+from lecfg.conf.system_index import SystemIndex
+from lecfg.conf.source_index import SourceIndex
 from lecfg.conf.package_parser import PackageParser, README_FILE_NAME
 from lecfg.conf.conf_exception import ConfException
+from lecfg.conf.manifest import Manifest
 from lecfg.session_manager import SessionManager
 from lecfg.session import Session
-from lecfg.conf.conf import Conf
+from lecfg.conf.conf import Conf, LINK_DEPLOY_MODE, COPY_DEPLOY_MODE
 from lecfg.action.read_src_action import ReadSrcAction
 from lecfg.action.read_dest_action import ReadDestAction
 from lecfg.action.save_exit_action import SaveExitAction
@@ -43,10 +46,26 @@ from lecfg.action.action_result import ActionResult
 from lecfg.action.action import Action
 from lecfg.action.action_cmd import ActionCmd
 from lecfg.action.action_exception import ActionException
-from lecfg.utilities import user_input
+from lecfg.checksum import DigestCache, WorkDirHasher
+from lecfg.checksum import DIGEST_CACHE_FILE_NAME
+from lecfg.utilities import user_input, state_file_path, STATE_DIR_NAME
 from lecfg.exit_code import ExitCode
-from pathlib import Path
-from typing import List
+from lecfg.path_cache import PathStatusCache
+from lecfg.conf_status import ConfStatus, conf_status, same_contents
+from lecfg.state_db import StateDb, STATE_DB_FILE_NAME
+from lecfg.run_log import RunLog, LINK_OP, COPY_OP, BACKUP_OP, MKDIR_OP
+from lecfg.answer_file import AnswerFile, DEPLOY_ANSWER, SKIP_ANSWER
+from lecfg.answer_file import SKIP_PACKAGE_ANSWER
+from lecfg.target import Target
+from lecfg.dest_index import DestinationIndex
+from lecfg.package_discovery import PackageDiscovery
+from lecfg.system_detector import SystemDetector
+from lecfg.conf_prefetcher import ConfPrefetcher, PrefetchedConf
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Dict, List, Tuple
+import sqlite3
+import shutil
+import json
 import os
 
 READ_CMD_FILE = "read.cmd"
@@ -55,10 +74,8 @@ READ_DIR_CMD_FILE = "read_dir.cmd"
 COMPARE_DIR_CMD_FILE = "compare_dir.cmd"
 
 DEFAULT_READ_CMD = "less"
-DEFAULT_CMP_CMD = "diff -su"
 
 DEFAULT_READ_DIR_CMD = "ls -l"
-DEFAULT_CMP_DIR_CMD = "diff -sur"
 
 
 class Lecfg():
@@ -74,7 +91,11 @@ class Lecfg():
                                   "(dest dir also does not exist). %s" %
                                   _question)
 
-    def __init__(self, work_dir: str):
+    def __init__(self, work_dir: str, replace_all: bool = False,
+                 changed_only: bool = False, record_file: str = None,
+                 replay_file: str = None, targets: List[Target] = None,
+                 deploy_mode: str = LINK_DEPLOY_MODE,
+                 use_dir_fd: bool = False):
         """
         Constructor
 
@@ -82,18 +103,65 @@ class Lecfg():
         ----------
         work_dir: str
             path to the work directory
+        replace_all: bool
+            deploy every configuration without asking the user, replacing any
+            existing configuration at the destination
+        changed_only: bool
+            only process the packages whose README file, or the sources or
+            destinations of its configurations, changed since the last time
+            the package was applied
+        record_file: str
+            path to an answer file where every decision is recorded
+        replay_file: str
+            path to an answer file recorded before, from which the decisions
+            are taken instead of asking the user
+        targets: List[Target]
+            targets into which the configurations are deployed, without
+            asking the user, instead of the current system
+        deploy_mode: str
+            deploy mode of the configurations that do not set one: "link",
+            "copy" or "farm"
+        use_dir_fd: bool
+            issue the file system calls on the destinations relative to their
+            opened parent directories. Only checking already deployed deep
+            trees was measured to be faster this way, deploying is not
         """
         self.work_dir = work_dir
+        self._replace_all = replace_all
+        self._changed_only = changed_only
+        self._state_db = None
+        # the sources of every package are only listed once per directory
+        self._source_index = SourceIndex(work_dir)
+        self._use_dir_fd = use_dir_fd
+        self._path_cache = PathStatusCache(use_dir_fd=use_dir_fd,
+                                           source_index=self._source_index)
+        self._manifest = None
+        self._digest_cache = None
+        self._system_index = SystemIndex()
+        self._converged_count = 0
+        self._conf_count = 0
         self._session_man = SessionManager(work_dir)
-
-    def _select_system(self, sys_parser: SystemsParser) -> str:
+        self._run_log = RunLog(work_dir)
+        self._record_file = record_file
+        self._replay_file = replay_file
+        self._recorded_answers = None
+        self._replayed_answers = None
+        self._targets = targets
+        self._deploy_mode = deploy_mode
+
+    def _select_system(self, sys_parser: SystemsParser,
+                       verbose: bool = True) -> str:
         """
-        Select the name of current system
+        Select the name of current system. When there is more than one
+        system, the current one is detected by running the system probes,
+        and the user is only asked if no single system is detected
 
         Parameters
         ----------
         sys_parser: SystemsParser
             SystemsParser object for the current work directory
+        verbose: bool
+            print the system detected
 
         Returns
         -------
@@ -108,13 +176,47 @@ class Lecfg():
                   "name of one system" % sys_parser.file_path)
             exit(ExitCode.EMPTY_SYSTEMS_FILE.value)
 
+        detected = SystemDetector(self.work_dir, sys_parser.probes).detect()
+
+        # the probe of a parent system usually succeeds on its descendants
+        # too, keep the most specific systems
+        inherited = set().union(*(sys_parser.ancestors(system_name)
+                                  for system_name in detected))
+        detected = [system_name for system_name in detected
+                    if system_name not in inherited]
+
+        if len(detected) == 1:
+            if verbose:
+                print("Detected system: [ %s ]" % detected[0])
+
+            return detected[0]
+
+        # let the user choose between the systems detected, if any
+        systems = detected if len(detected) > 1 else sys_parser.systems
+
+        if self._replayed_answers is not None:
+            system_name = self._replayed_answers.system
+
+            if system_name not in systems:
+                print("The answer file \"%s\" does not select one of the "
+                      "systems: %s" % (self._replayed_answers.file_path,
+                                       ", ".join(systems)))
+                exit(ExitCode.INVALID_ANSWER_FILE.value)
+
+            print("Replaying system: [ %s ]" % system_name)
+            return system_name
+
         question = ["Select the current system:\n"]
 
-        selection = user_input(question, sys_parser.systems)
+        selection = user_input(question, systems)
+
+        if self._recorded_answers is not None:
+            self._recorded_answers.system = systems[selection]
 
-        return sys_parser.systems[selection]
+        return systems[selection]
 
-    def _save_and_exit(self, package_name: str, line_num: int,
+    def _save_and_exit(self, package_name: str,
+                       position: PrefetchedConf = None,
                        exit_code: int = ExitCode.SAVE_AND_EXIT.value) -> None:
         """
         Save the current progress and exit
@@ -123,8 +225,9 @@ class Lecfg():
         ----------
         package_name: str
             name of the package being processed
-        line_num: int
-            current line number in the given package README file
+        position: PrefetchedConf
+            configuration under process, or None to resume from the start of
+            the package
         exit_code: int
             exit code to return while exiting lecfg
 
@@ -132,13 +235,21 @@ class Lecfg():
         -------
         None
         """
-        self._session_man.save_session(package_name, line_num)
+        if position is not None:
+            self._session_man.save_session(package_name, position.line_num,
+                                           position.offset,
+                                           position.fingerprint)
+        else:
+            self._session_man.save_session(package_name, 0)
+
+        self._save_caches()
+        self._save_answers()
 
         exit(exit_code)
 
     def _error_save_and_exit(self, package_name: str, error_msg: str,
                              exit_code: int,
-                             package: PackageParser = None) -> None:
+                             position: PrefetchedConf = None) -> None:
         """
         Print error, save the current progress and exit
 
@@ -150,27 +261,26 @@ class Lecfg():
             error message
         exit_code: int
             exit code to return while exiting lecfg
-        package: PackageParser
-            package parser object
+        position: PrefetchedConf
+            configuration under process, or the line that failed to be read
 
         Returns
         -------
         None
         """
-        if package is not None:
-            line_num = package.line_num
+        if position is not None:
             print("Error while processing file \"%s\" at line %d: %s" %
-                  (package.file_path, line_num, error_msg))
+                  (position.file_path, position.line_num, error_msg))
         else:
             print(error_msg)
-            line_num = None
 
         print("The current state has been saved and once you correct the "
               "error lecfg will resume from this point")
 
-        self._save_and_exit(package_name, line_num, exit_code)
+        self._save_and_exit(package_name, position, exit_code)
 
-    def _ask_question(self, question: str, options: List[Action], conf: Conf):
+    def _ask_question(self, question: str, options: List[Action], conf: Conf,
+                      identical: bool = None):
         """
         Ask a question to the user about the configuration under process
 
@@ -182,10 +292,14 @@ class Lecfg():
             list of actions that the user can select to answer the question
         conf: Conf
             configuration under process
+        identical: bool
+            whether the destination has the same contents as the source, or
+            None if they were not compared
 
         Returns
         -------
-        None
+        Action
+            action selected by the user
         """
         print("   --------------------------------------------\n")
         print("Handling configuration file:\n")
@@ -196,12 +310,324 @@ class Lecfg():
             print("* Description:             %s" % conf.description)
 
         print("* Applies to versions:     %s\n" % conf.version)
+
+        if identical is not None:
+            print("* Destination contents:    %s\n" %
+                  ("identical to the source" if identical
+                   else "different from the source"))
+
         query = []
         query.append(question + "\n")
 
         selection = user_input(query, options)
 
-        return options[selection].run(conf)
+        return options[selection]
+
+    def _package_name(self, package_dir: str) -> str:
+        """
+        Name of a package, relative to the work directory
+
+        Parameters
+        ----------
+        package_dir: str
+            path to the package directory
+
+        Returns
+        -------
+        str
+            name of the package
+        """
+        return os.path.relpath(package_dir, self.work_dir)
+
+    def _open_state_db(self) -> None:
+        """
+        Open the state database of the work directory
+
+        Returns
+        -------
+        None
+        """
+        try:
+            self._state_db = StateDb(state_file_path(self.work_dir,
+                                                     STATE_DB_FILE_NAME),
+                                     self._path_cache)
+        except (sqlite3.Error, OSError) as e:
+            print("Unable to open the state database, the decisions of this "
+                  "run will not be recorded: %s" % str(e))
+            self._state_db = None
+
+    def _close_state_db(self) -> None:
+        """
+        Close the state database of the work directory, if it is open
+
+        Returns
+        -------
+        None
+        """
+        if self._state_db is not None:
+            self._state_db.close()
+            self._state_db = None
+
+    def _record_conf(self, package_name: str, conf: Conf,
+                     decision: str) -> None:
+        """
+        Record the decision taken on a configuration in the state database
+
+        Parameters
+        ----------
+        package_name: str
+            name of the package
+        conf: Conf
+            configuration
+        decision: str
+            decision taken on the configuration
+
+        Returns
+        -------
+        None
+        """
+        if self._state_db is not None:
+            self._state_db.record_conf(package_name, conf, decision)
+
+    def _load_answers(self) -> None:
+        """
+        Load the answer files to record the decisions to, and to replay the
+        decisions from
+
+        Returns
+        -------
+        None
+        """
+        try:
+            if self._record_file is not None:
+                self._recorded_answers = AnswerFile(self._record_file,
+                                                    self.work_dir)
+
+            if self._replay_file is not None:
+                if not os.path.exists(self._replay_file):
+                    raise ConfException(self._replay_file,
+                                        "The answer file does not exist")
+
+                self._replayed_answers = AnswerFile(self._replay_file,
+                                                    self.work_dir)
+        except ConfException as e:
+            print(str(e))
+            exit(ExitCode.INVALID_ANSWER_FILE.value)
+
+    def _save_answers(self) -> None:
+        """
+        Write the recorded decisions to the answer file
+
+        Returns
+        -------
+        None
+        """
+        if self._recorded_answers is None:
+            return
+
+        try:
+            self._recorded_answers.save()
+        except OSError as e:
+            print("Unable to save the answer file: %s" % str(e))
+
+    def _record_answer(self, package_dir: str, conf: Conf,
+                       action: Action) -> None:
+        """
+        Record the decision taken on a configuration into the answer file
+
+        Parameters
+        ----------
+        package_dir: str
+            path to the package directory of the configuration
+        conf: Conf
+            configuration
+        action: Action
+            action selected for the configuration, or None if it was already
+            deployed
+
+        Returns
+        -------
+        None
+        """
+        if self._recorded_answers is None:
+            return
+
+        if action is None or isinstance(action, DeployAction):
+            answer = DEPLOY_ANSWER
+        elif isinstance(action, NextPackage):
+            answer = SKIP_PACKAGE_ANSWER
+        else:
+            answer = SKIP_ANSWER
+
+        self._recorded_answers.record(package_dir, conf, answer)
+
+    def _replay_answer(self, package_dir: str, conf: Conf,
+                       options: List[Action]) -> Action:
+        """
+        Select the action of a configuration from the replayed answer file
+
+        Parameters
+        ----------
+        package_dir: str
+            path to the package directory of the configuration
+        conf: Conf
+            configuration
+        options: List[Action]
+            list of actions that could be selected for the configuration
+
+        Returns
+        -------
+        Action
+            the action matching the recorded decision. Configurations without
+            a recorded decision are skipped
+        """
+        answer = self._replayed_answers.decision(package_dir, conf)
+
+        if answer is None:
+            print("No recorded decision for %s -> %s. Skipping...\n" %
+                  (conf.src_path, conf.dest_path))
+            answer = SKIP_ANSWER
+
+        answer_types = {DEPLOY_ANSWER: DeployAction,
+                        SKIP_ANSWER: NextAction,
+                        SKIP_PACKAGE_ANSWER: NextPackage}
+
+        action = next(option for option in options
+                      if isinstance(option, answer_types[answer]))
+
+        print("Replaying decision \"%s\" for %s -> %s\n" %
+              (action, conf.src_path, conf.dest_path))
+
+        return action
+
+    def _previous_session(self) -> Session:
+        """
+        Get the previous session to resume, taking the decision to resume it
+        from the replayed answer file, if any, instead of asking the user
+
+        Returns
+        -------
+        Session
+            the previous session to resume, or None to start a new session
+        """
+        if not self._session_man.has_previous_session():
+            return None
+
+        resume = None
+
+        if self._replayed_answers is not None:
+            resume = self._replayed_answers.resume
+
+            if resume is None:
+                print("The answer file \"%s\" does not decide whether to "
+                      "resume the previous session" %
+                      self._replayed_answers.file_path)
+                exit(ExitCode.INVALID_ANSWER_FILE.value)
+
+        previous_session = self._session_man.get_previous_session(resume)
+
+        if self._recorded_answers is not None:
+            self._recorded_answers.resume = previous_session is not None
+
+        return previous_session
+
+    def _resume_point(self, package_directories: List[str],
+                      previous_session: Session
+                      ) -> Tuple[List[str], Session]:
+        """
+        Select the packages left to process when resuming a previous session
+
+        Parameters
+        ----------
+        package_directories: List[str]
+            paths to the package directories
+        previous_session: Session
+            previous session, or None if there is no previous session
+
+        Returns
+        -------
+        Tuple[List[str], Session]
+            paths to the package directories to process, and the session to
+            resume on the first of them, if any
+        """
+        if previous_session is None:
+            return (package_directories, None)
+
+        if previous_session.package_dir not in package_directories:
+            print("\nThe package of the previous session no longer exists. "
+                  "Starting from the first package...")
+            return (package_directories, None)
+
+        index = package_directories.index(previous_session.package_dir)
+
+        if previous_session.package_done:
+            index += 1
+            previous_session = None
+
+        print("\nResuming previous session ... skipping %d packages" % index)
+
+        return (package_directories[index:], previous_session)
+
+    def _changed_packages(self, package_directories: List[str]) -> List[str]:
+        """
+        Select the packages to process. With the changed-only option, the
+        packages that did not change since they were last applied are left
+        out
+
+        Parameters
+        ----------
+        package_directories: List[str]
+            paths to the package directories
+
+        Returns
+        -------
+        List[str]
+            paths to the package directories to process
+        """
+        if not self._changed_only or self._state_db is None:
+            return package_directories
+
+        changed = [package_dir for package_dir in package_directories
+                   if self._state_db.package_changed(
+                       self._package_name(package_dir),
+                       os.path.join(package_dir, README_FILE_NAME))]
+
+        print("\n%d of %d packages changed since they were last applied" %
+              (len(changed), len(package_directories)))
+
+        return changed
+
+    def _question_and_options(self, status: ConfStatus
+                              ) -> Tuple[str, List[Action]]:
+        """
+        Select the question to ask the user about a configuration, and the
+        actions the user can select to answer it
+
+        Parameters
+        ----------
+        status: ConfStatus
+            deployment status of the configuration
+
+        Returns
+        -------
+        Tuple[str, List[Action]]
+            question and list of actions
+        """
+        if status is ConfStatus.CONFLICT:
+            return (self._replace_question, self._replace_options)
+
+        if status in (ConfStatus.TYPE_MISMATCH, ConfStatus.DANGLING_LINK):
+            # if the src and dest are not of the same type, or if there is
+            # nothing to compare at the dest, ommit the comparison action
+            return (self._replace_question,
+                    list(filter(lambda x: not isinstance(x, CompareAction),
+                                self._replace_options)))
+
+        if status is ConfStatus.MISSING:
+            return (self._deploy_question, self._deploy_options)
+
+        return (self._no_parent_deploy_question,
+                self._no_parent_deploy_options)
 
     def _process_package(self, package_dir: str, current_system: str,
                          previous_session: Session) -> None:
@@ -215,109 +641,140 @@ class Lecfg():
         current_system: str
             name of the current system
         previous_session: Session
-            previous session or None if there is no previous
-            session
+            previous session to resume on this package, or None to process
+            the whole package
 
         Returns
         -------
-        Session
-            previous session (if one was provided and the system has not
-            resumed it yet), or None if no previous_session was provided or if
-            the system has already resumed it
-        """
-        if (previous_session is not None
-           and previous_session.package_dir != package_dir):
-            # we are resuming a previous session and this is not the package we
-            # left on
-            print("Resuming previous session ... skipping [ %s ]..." %
-                  package_dir)
-            return previous_session
-
+        None
+        """
         print("Processing package directory: [ %s ]\n" % package_dir)
 
         try:
             if previous_session is not None:
                 package = PackageParser(package_dir, current_system,
-                                        previous_session.line_num)
+                                        previous_session.line_num,
+                                        previous_session.offset,
+                                        previous_session.fingerprint,
+                                        self._manifest,
+                                        deploy_mode=self._deploy_mode,
+                                        system_index=self._system_index,
+                                        source_index=self._source_index)
             else:
-                package = PackageParser(package_dir, current_system)
+                package = PackageParser(package_dir, current_system,
+                                        manifest=self._manifest,
+                                        deploy_mode=self._deploy_mode,
+                                        system_index=self._system_index,
+                                        source_index=self._source_index)
         except ConfException as e:
             error_msg = "Error creating package parser: %s" % str(e)
             self._error_save_and_exit(package_dir, error_msg,
                                       ExitCode.README_FILE_NOT_FOUND.value)
 
         has_configuration = False
+        has_decision = False
+        package_name = self._package_name(package_dir)
+        prefetcher = ConfPrefetcher(package, self._digest_cache,
+                                    self._source_index)
+        error = None
+        save_and_exit = False
+        next_package = False
+
+        if self._state_db is not None:
+            self._state_db.start_package(package_name,
+                                         previous_session is None)
 
         try:
-            for conf in package.configurations():
+            for item in prefetcher:
                 has_configuration = True
-
-                if(Path(conf.dest_path).exists()
-                   or
-                   Path(conf.dest_path).is_symlink()
-                   ):
-                    question = self._replace_question
-
-                    if (
-                        (
-                            Path(conf.dest_path).is_dir()
-                            and
-                            Path(conf.src_path).is_file()
-                        )
-                        or
-                        (
-                            Path(conf.dest_path).is_file()
-                            and
-                            Path(conf.src_path).is_dir()
-                        )
-                    ):
-                        # if the src and dest are not of the same type,
-                        # ommit the comparison action
-                        options = list(
-                            filter(lambda x: not isinstance(x, CompareAction),
-                                   self._replace_options
-                                   )
-                        )
-                    else:
-                        options = self._replace_options
-                elif Path(conf.dest_path).parent.exists():
-                    question = self._deploy_question
-                    options = self._deploy_options
+                conf = item.conf
+
+                if (previous_session is not None
+                   and previous_session.decided
+                   and item.line_num == previous_session.line_num):
+                    # the decision on this configuration was already taken
+                    # before the previous session was interrupted
+                    previous_session = None
+                    continue
+
+                previous_session = None
+                self._conf_count += 1
+
+                prefetcher.refresh(item, self._path_cache)
+                status = item.status
+
+                if status in (ConfStatus.LINKED, ConfStatus.COPIED):
+                    # the destination is already a symbolic link to the
+                    # source, or a copy of it, there is nothing to ask
+                    self._converged_count += 1
+                    self._record_conf(package_name, conf, status.value)
+                    self._record_answer(package_dir, conf, None)
+                    continue
+
+                question, options = self._question_and_options(status)
+
+                if self._replayed_answers is not None:
+                    action = self._replay_answer(package_dir, conf, options)
+                    result = action.run(conf)
                 else:
-                    question = self._no_parent_deploy_question
-                    options = self._no_parent_deploy_options
-
-                while True:
-                    result = self._ask_question(question, options, conf)
-
-                    if result is not ActionResult.REPEAT:
-                        break
+                    while True:
+                        action = self._ask_question(question, options, conf,
+                                                    item.identical)
+                        result = action.run(conf)
+
+                        if result is not ActionResult.REPEAT:
+                            break
+
+                # the action may have changed the destination, and the status
+                # of the configurations read ahead under it
+                prefetcher.changed(conf.dest_path)
+
+                if result is not ActionResult.SAVE_AND_EXIT:
+                    self._record_conf(package_name, conf, str(action))
+                    self._record_answer(package_dir, conf, action)
+                    self._session_man.record_decision(
+                        package_dir, item.line_num, item.offset,
+                        item.fingerprint, str(action))
+                    has_decision = True
 
                 if result is ActionResult.SAVE_AND_EXIT:
-                    self._save_and_exit(package_dir, package.line_num)
+                    save_and_exit = True
+                    break
                 elif result is ActionResult.NEXT_PACKAGE:
+                    next_package = True
                     break
         except ActionException as e:
-            self._error_save_and_exit(package_dir, str(e),
-                                      ExitCode.ACTION_ERROR.value, package)
+            error = (str(e), ExitCode.ACTION_ERROR.value)
         except ConfException as e:
-            self._error_save_and_exit(package_dir, str(e),
-                                      ExitCode.INVALID_README_FORMAT.value,
-                                      package)
+            error = (str(e), ExitCode.INVALID_README_FORMAT.value)
         except PermissionError as e:
             error_msg = ("Insufficient permissions. Session was saved. Please"
                          " run LECFG as root/admin and resume the current "
                          "session: %s" % str(e)
                          )
-            self._error_save_and_exit(package_dir, error_msg,
-                                      ExitCode.PERMISSION_ERROR.value,
-                                      package)
+            error = (error_msg, ExitCode.PERMISSION_ERROR.value)
+        finally:
+            # the caches are only saved once the package is no longer read
+            prefetcher.close()
+
+        if error is not None:
+            self._error_save_and_exit(package_dir, error[0], error[1],
+                                      prefetcher.position)
+
+        if save_and_exit:
+            self._save_and_exit(package_dir, prefetcher.position)
 
         if not has_configuration:
             print("No configuration defined for package [ %s ]."
                   " Skipping...\n" % package_dir)
 
-        return None
+        # a package left for the next one was not wholly applied, and is
+        # still to be processed by the next run of changed packages
+        if self._state_db is not None and not next_package:
+            self._state_db.record_package(package_name, package.file_path)
+
+        if has_decision:
+            self._session_man.record_package_done(package_dir)
 
     def _read_cmd_conf(self, conf_file_name: str) -> ActionCmd:
         file_path = os.path.join(self.work_dir, conf_file_name)
@@ -333,9 +790,38 @@ class Lecfg():
 
         return None
 
-    def process(self) -> None:
+    def _load_manifest(self) -> None:
         """
-        Process the given work directory
+        Load the compiled manifest of the work directory, if there is one
+
+        Returns
+        -------
+        None
+        """
+        if Manifest.is_compiled(self.work_dir):
+            self._manifest = Manifest(self.work_dir)
+
+    def _save_caches(self) -> None:
+        """
+        Persist the packages that were parsed again into the manifest and
+        the file digests calculated during the run
+
+        Returns
+        -------
+        None
+        """
+        for cache in (self._manifest, self._digest_cache):
+            if cache is None:
+                continue
+
+            try:
+                cache.save()
+            except OSError as e:
+                print("Unable to save the lecfg caches: %s" % str(e))
+
+    def _print_banner(self) -> None:
+        """
+        Print the lecfg banner
 
         Returns
         -------
@@ -349,17 +835,63 @@ class Lecfg():
         print(" \\_____/ \\___| \\____/\\_|     \\____/")
         print("\n")
 
-        print("\nChecking the systems file...\n")
+    def _load_systems_file(self) -> SystemsParser:
+        """
+        Parse the work directory systems file and index its systems
 
+        Returns
+        -------
+        SystemsParser
+            SystemsParser object for the current work directory
+        """
         try:
             sys_parser = SystemsParser(self.work_dir)
         except ConfException as e:
             print(str(e))
+
+            if e.line_num is not None:
+                exit(ExitCode.INVALID_SYSTEMS_FILE.value)
+
             exit(ExitCode.SYSTEMS_FILE_NOT_FOUND.value)
 
-        current_system = self._select_system(sys_parser)
-        print("\nCurrent system: [ %s ]\n" % current_system)
+        self._system_index = sys_parser.system_index()
+
+        return sys_parser
+
+    def _load_system(self, verbose: bool = True) -> str:
+        """
+        Parse the work directory systems file and select the current system
+
+        Parameters
+        ----------
+        verbose: bool
+            print the progress of the system selection
+
+        Returns
+        -------
+        str
+            The name of the current system
+        """
+        if verbose:
+            print("\nChecking the systems file...\n")
+
+        sys_parser = self._load_systems_file()
+        current_system = self._select_system(sys_parser, verbose)
+
+        if verbose:
+            print("\nCurrent system: [ %s ]\n" % current_system)
+
+        return current_system
+
+    def _build_options(self) -> None:
+        """
+        Build the lists of actions offered to the user for each kind of
+        question
 
+        Returns
+        -------
+        None
+        """
         read_cmd = self._read_cmd_conf(READ_CMD_FILE)
         read_dir_cmd = self._read_cmd_conf(READ_DIR_CMD_FILE)
         compare_cmd = self._read_cmd_conf(COMPARE_CMD_FILE)
@@ -371,12 +903,6 @@ class Lecfg():
         if read_dir_cmd is None:
             read_dir_cmd = ActionCmd(DEFAULT_READ_DIR_CMD)
 
-        if compare_cmd is None:
-            compare_cmd = ActionCmd(DEFAULT_CMP_CMD)
-
-        if compare_dir_cmd is None:
-            compare_dir_cmd = ActionCmd(DEFAULT_CMP_DIR_CMD)
-
         self._replace_options = [ReadSrcAction("Read src", read_cmd,
                                                read_dir_cmd),
                                  ReadDestAction("Read dest", read_cmd,
@@ -402,25 +928,976 @@ class Lecfg():
             NextPackage("Skip to next package"),
             SaveExitAction("Save & exit")]
 
-        prev_session = self._session_man.get_previous_session()
+        for action in (self._replace_options + self._deploy_options +
+                       self._no_parent_deploy_options):
+            action.path_cache = self._path_cache
+            action.digest_cache = self._digest_cache
+
+            if isinstance(action, DeployAction):
+                action.run_log = self._run_log
+
+    def _load_digest_cache(self) -> None:
+        """
+        Load the file digests calculated on the previous runs
+
+        Returns
+        -------
+        None
+        """
+        if self._digest_cache is None:
+            self._digest_cache = DigestCache(os.path.join(
+                self.work_dir, STATE_DIR_NAME, DIGEST_CACHE_FILE_NAME))
+
+    def _package_directories(self, verbose: bool = True) -> List[str]:
+        """
+        Detect the package directories of the work directory, at any depth
+        and leaving out the directories ignored by its .lecfgignore file
 
-        print("\nDetected package directories:")
+        Parameters
+        ----------
+        verbose: bool
+            print the detected package directories
 
-        (_, sub_directories, _) = next(os.walk(self.work_dir))
-        package_directories = []
+        Returns
+        -------
+        List[str]
+            sorted paths to the work directory sub directories that have a
+            package README file
+        """
+        if verbose:
+            print("\nDetected package directories:")
 
-        for sub_dir in sub_directories:
-            sub_dir_path = os.path.join(self.work_dir, sub_dir)
-            readme_file = Path(sub_dir_path) / README_FILE_NAME
+        package_directories = PackageDiscovery(
+            self.work_dir).package_directories()
 
-            if readme_file.exists():
-                package_directories.append(sub_dir_path)
-                print("    [ %s ]" % sub_dir)
+        if verbose:
+            for package_dir in package_directories:
+                print("    [ %s ]" % self._package_name(package_dir))
 
-        print("\n>>>>>>>>>>>>>>>>>>>>LeCFG START>>>>>>>>>>>>>>>>>>>>\n")
+        return package_directories
 
-        for package_dir in package_directories:
-            prev_session = self._process_package(package_dir, current_system,
-                                                 prev_session)
+    def _plan_package(self, package_dir: str, current_system: str
+                      ) -> List[Tuple[str, Conf, Action]]:
+        """
+        Plan the deployment of every configuration of a package, assuming
+        "Replace" as the answer for existing configurations
 
-        print("\n<<<<<<<<<<<<<<<<<<<<<LeCFG END<<<<<<<<<<<<<<<<<<<<<\n")
+        Parameters
+        ----------
+        package_dir: str
+            path to the package directory
+        current_system: str
+            name of the current system
+
+        Returns
+        -------
+        List[Tuple[str, Conf, Action]]
+            package directory and configurations of the package paired with
+            the action to apply on them, or None if the configuration is
+            already deployed
+        """
+        try:
+            package = PackageParser(package_dir, current_system,
+                                    manifest=self._manifest,
+                                    deploy_mode=self._deploy_mode,
+                                    system_index=self._system_index,
+                                    source_index=self._source_index)
+        except ConfException as e:
+            print("Error creating package parser: %s" % str(e))
+            exit(ExitCode.README_FILE_NOT_FOUND.value)
+
+        plan = []
+
+        try:
+            for conf in package.configurations():
+                status = conf_status(conf, self._path_cache,
+                                     self._digest_cache)
+
+                plan.append((package_dir, conf, self._bulk_actions[status]))
+        except ConfException as e:
+            print(str(e))
+            exit(ExitCode.INVALID_README_FORMAT.value)
+
+        return plan
+
+    def _apply_plan(self, plan: List[Tuple[str, Conf, Action]],
+                    package_directories: List[str]) -> None:
+        """
+        Apply every planned action without asking the user and print a
+        summary of the outcome
+
+        Parameters
+        ----------
+        plan: List[Tuple[str, Conf, Action]]
+            package directory and configurations paired with the action to
+            apply on them
+        package_directories: List[str]
+            paths to the planned package directories
+
+        Returns
+        -------
+        None
+        """
+        summary = {self._bulk_deploy: 0, self._bulk_no_parent_deploy: 0,
+                   self._bulk_replace: 0}
+        unchanged = 0
+        failures = []
+        failed_packages = set()
+
+        # apply the actions on each destination directory together, while
+        # the directory is open
+        for package_dir, conf, action in sorted(
+                plan, key=lambda p: os.path.dirname(p[1].dest_path)):
+            package_name = self._package_name(package_dir)
+
+            if action is None:
+                unchanged += 1
+                self._record_conf(package_name, conf,
+                                  ConfStatus.COPIED.value
+                                  if conf.deploy_mode == COPY_DEPLOY_MODE
+                                  else ConfStatus.LINKED.value)
+                continue
+
+            try:
+                action.run(conf)
+                summary[action] += 1
+                self._record_conf(package_name, conf, str(action))
+            except (ActionException, OSError) as e:
+                failures.append((conf, str(e)))
+                failed_packages.add(package_dir)
+
+        if self._state_db is not None:
+            for package_dir in package_directories:
+                if package_dir not in failed_packages:
+                    self._state_db.record_package(
+                        self._package_name(package_dir),
+                        os.path.join(package_dir, README_FILE_NAME))
+
+        self._print_summary({str(action): count
+                             for action, count in summary.items()},
+                            unchanged, failures)
+
+        if len(failures) > 0:
+            exit(ExitCode.ACTION_ERROR.value)
+
+    def _print_summary(self, summary: Dict[str, int], unchanged: int,
+                       failures: List[Tuple[Conf, str]]) -> None:
+        """
+        Print a summary of the outcome of a bulk deployment
+
+        Parameters
+        ----------
+        summary: Dict[str, int]
+            number of configurations on which each action was applied, by
+            action name
+        unchanged: int
+            number of configurations that were already deployed
+        failures: List[Tuple[Conf, str]]
+            configurations that failed to be deployed and the error messages
+
+        Returns
+        -------
+        None
+        """
+        print("Summary:")
+        for action_name, count in summary.items():
+            print("    %-34s %d" % (action_name + ":", count))
+        print("    %-34s %d" % ("Already deployed:", unchanged))
+        print("    %-34s %d" % ("Failed:", len(failures)))
+
+        for conf, error_msg in failures:
+            print("\n** Failed to deploy \"%s\" into \"%s\": %s" %
+                  (conf.src_path, conf.dest_path, error_msg))
+
+    def _build_bulk_actions(self) -> None:
+        """
+        Build the actions applied without asking the user, for each
+        deployment status
+
+        Returns
+        -------
+        None
+        """
+        self._bulk_deploy = DeployAction("Deployed")
+        self._bulk_no_parent_deploy = NoParentDeployAction(
+            "Deployed (dest directory created)")
+        self._bulk_replace = ReplaceAction("Replaced")
+
+        self._load_digest_cache()
+
+        for action in (self._bulk_deploy, self._bulk_no_parent_deploy,
+                       self._bulk_replace):
+            action.path_cache = self._path_cache
+            action.digest_cache = self._digest_cache
+            action.run_log = self._run_log
+
+        self._bulk_actions = {
+            ConfStatus.LINKED: None,
+            ConfStatus.COPIED: None,
+            ConfStatus.MISSING: self._bulk_deploy,
+            ConfStatus.MISSING_PARENT: self._bulk_no_parent_deploy,
+            ConfStatus.CONFLICT: self._bulk_replace,
+            ConfStatus.TYPE_MISMATCH: self._bulk_replace,
+            ConfStatus.DANGLING_LINK: self._bulk_replace}
+
+    def apply_to_target(self, target: Target, confs: List[Conf],
+                        run_log: RunLog = None
+                        ) -> Tuple[Dict[str, int], int,
+                                   List[Tuple[Conf, str]]]:
+        """
+        Deploy parsed configurations into a target without asking the user,
+        replacing any existing configuration
+
+        Parameters
+        ----------
+        target: Target
+            target into which the configurations are deployed
+        confs: List[Conf]
+            configurations, with their destination paths not expanded yet
+        run_log: RunLog
+            run log of the part of the run deploying into the target, or None
+            to record the changes as a run of their own
+
+        Returns
+        -------
+        Tuple[Dict[str, int], int, List[Tuple[Conf, str]]]
+            number of configurations on which each action was applied, number
+            of configurations that were already deployed, and configurations
+            that failed to be deployed paired with the error messages
+        """
+        if run_log is not None:
+            self._run_log = run_log
+
+        self._build_bulk_actions()
+
+        summary = {str(self._bulk_deploy): 0,
+                   str(self._bulk_no_parent_deploy): 0,
+                   str(self._bulk_replace): 0}
+        unchanged = 0
+        failures = []
+        target_confs = []
+
+        for conf in confs:
+            dest_path = target.expand(conf.raw_dest_path)
+
+            if dest_path is None:
+                failures.append((conf, "Unable to expand the destination "
+                                       "path for the target"))
+                continue
+
+            target_confs.append(Conf(conf.src_path, dest_path,
+                                     conf.description, conf.version,
+                                     conf.raw_dest_path, conf.deploy_mode))
+
+        try:
+            # handle the configurations of each destination directory
+            # together, while the directory is open
+            for target_conf in sorted(target_confs, key=lambda c:
+                                      os.path.dirname(c.dest_path)):
+                action = self._bulk_actions[conf_status(
+                    target_conf, self._path_cache, self._digest_cache)]
+
+                if action is None:
+                    unchanged += 1
+                    continue
+
+                try:
+                    action.run(target_conf)
+                    summary[str(action)] += 1
+                except (ActionException, OSError) as e:
+                    failures.append((target_conf, str(e)))
+        finally:
+            self._run_log.close()
+            self._path_cache.close()
+
+        return (summary, unchanged, failures)
+
+    def _run_targets(self, current_system: str) -> None:
+        """
+        Parse the packages of the work directory once and deploy them into
+        every target concurrently, without asking the user
+
+        Parameters
+        ----------
+        current_system: str
+            name of the current system
+
+        Returns
+        -------
+        None
+        """
+        package_directories = self._package_directories()
+        confs = []
+        # the destination paths are indexed as written in the README files,
+        # since they are expanded differently for each target
+        dest_index = DestinationIndex()
+
+        for package_dir in package_directories:
+            try:
+                package = PackageParser(package_dir, current_system,
+                                        manifest=self._manifest,
+                                        expand_dest_path=False,
+                                        deploy_mode=self._deploy_mode,
+                                        system_index=self._system_index,
+                                        source_index=self._source_index)
+
+                for conf in package.configurations():
+                    confs.append(conf)
+                    dest_index.add(package.file_path, package.line_num, conf)
+            except ConfException as e:
+                print(str(e))
+                exit(ExitCode.INVALID_README_FORMAT.value)
+
+        self._save_caches()
+        self._report_conflicts(dest_index, True)
+
+        print("\n>>>>>>>>>>>>>>>>>>>>LeCFG START>>>>>>>>>>>>>>>>>>>>\n")
+
+        print("Deploying %d configurations from %d packages into %d "
+              "targets\n" % (len(confs), len(package_directories),
+                             len(self._targets)))
+
+        max_workers = min(len(self._targets), os.cpu_count() or 1)
+        failed = False
+
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            # every target records its part of the run under the same run
+            # id, so that the whole run is rolled back at once
+            reports = executor.map(_apply_to_target,
+                                   [self.work_dir] * len(self._targets),
+                                   self._targets,
+                                   [confs] * len(self._targets),
+                                   [self._run_log.run_id] * len(self._targets),
+                                   range(len(self._targets)),
+                                   [self._use_dir_fd] * len(self._targets))
+
+            for target, report in zip(self._targets, reports):
+                summary, unchanged, failures = report
+                print("Target [ %s ]" % target)
+                self._print_summary(summary, unchanged, failures)
+                print()
+
+                failed = failed or len(failures) > 0
+
+        print("<<<<<<<<<<<<<<<<<<<<<LeCFG END<<<<<<<<<<<<<<<<<<<<<\n")
+
+        if failed:
+            exit(ExitCode.ACTION_ERROR.value)
+
+    def _process_all(self, package_directories: List[str],
+                     current_system: str) -> None:
+        """
+        Plan the configurations of all the packages up front and deploy them
+        in bulk, replacing any existing configuration
+
+        Parameters
+        ----------
+        package_directories: List[str]
+            paths to the package directories
+        current_system: str
+            name of the current system
+
+        Returns
+        -------
+        None
+        """
+        self._build_bulk_actions()
+
+        plan = []
+
+        for package_dir in package_directories:
+            plan.extend(self._plan_package(package_dir, current_system))
+
+            if self._state_db is not None:
+                self._state_db.start_package(self._package_name(package_dir),
+                                             True)
+
+        print("Planned %d configurations from %d packages\n" %
+              (len(plan), len(package_directories)))
+
+        self._apply_plan(plan, package_directories)
+
+    def _validate_package(self, package_dir: str) -> List[ConfException]:
+        """
+        Validate every configuration line of a package
+
+        Parameters
+        ----------
+        package_dir: str
+            path to the package directory
+
+        Returns
+        -------
+        List[ConfException]
+            errors found on the package README file
+        """
+        try:
+            return PackageParser(package_dir, None,
+                                 manifest=self._manifest,
+                                 source_index=self._source_index).errors()
+        except ConfException as e:
+            return [e]
+
+    def checksum(self) -> None:
+        """
+        Calculate the SHA-512 hash of the work directory and request the user
+        to confirm that it is the expected hash
+
+        Returns
+        -------
+        None
+        """
+        print("\nCalculating the work directory hash...\n")
+
+        digest_cache = DigestCache(state_file_path(self.work_dir,
+                                                   DIGEST_CACHE_FILE_NAME))
+        work_dir_hash = WorkDirHasher(self.work_dir, digest_cache).hexdigest()
+
+        try:
+            digest_cache.save()
+        except OSError as e:
+            print("Unable to save the digest cache: %s" % str(e))
+
+        print("SHA-512: %s\n" % work_dir_hash)
+
+        question = ["Is this the expected hash of the work directory?\n"]
+
+        selection = user_input(question, ["Yes", "No"])
+
+        if selection == 1:
+            print("The work directory hash does not match the expected hash")
+            exit(ExitCode.CHECKSUM_MISMATCH.value)
+
+    def status(self, ndjson: bool = False, all_systems: bool = False
+               ) -> None:
+        """
+        Report the deployment status of every configuration of the work
+        directory for the current system, without changing anything. The
+        configurations are evaluated concurrently and the report is streamed
+        as they are evaluated
+
+        Parameters
+        ----------
+        ndjson: bool
+            report one JSON object per line instead of a table
+        all_systems: bool
+            report the configurations of every system instead, along with the
+            systems to which each one applies and a summary per system. The
+            work directory is still parsed a single time
+
+        Returns
+        -------
+        None
+        """
+        if not ndjson:
+            self._print_banner()
+
+        if all_systems:
+            systems = self._load_systems_file().systems
+            current_system = None
+        else:
+            current_system = self._load_system(verbose=not ndjson)
+
+        self._load_manifest()
+        self._load_digest_cache()
+
+        confs = []
+        errors = []
+
+        for package_dir in self._package_directories(verbose=False):
+            package_name = os.path.relpath(package_dir, self.work_dir)
+
+            try:
+                package = PackageParser(package_dir, current_system,
+                                        manifest=self._manifest,
+                                        deploy_mode=self._deploy_mode,
+                                        system_index=self._system_index,
+                                        source_index=self._source_index)
+
+                for conf in package.configurations():
+                    confs.append((package_name, conf))
+            except ConfException as e:
+                errors.append((package_name, str(e)))
+
+        self._save_caches()
+
+        counts = dict((status, 0) for status in ConfStatus)
+        # systems of the configurations with each status
+        status_systems = dict((status, []) for status in ConfStatus)
+
+        with ThreadPoolExecutor() as executor:
+            statuses = executor.map(
+                lambda c: conf_status(c[1], self._path_cache,
+                                      self._digest_cache), confs)
+
+            for (package_name, conf), status in zip(confs, statuses):
+                counts[status] += 1
+                status_systems[status].append(conf.systems)
+
+                if ndjson:
+                    record = {"package": package_name,
+                              "status": status.value,
+                              "src": conf.src_path,
+                              "dest": conf.dest_path}
+
+                    if all_systems:
+                        record["systems"] = self._system_index.system_names(
+                            conf.systems)
+
+                    print(json.dumps(record))
+                elif all_systems:
+                    print("%-15s %s -> %s [ %s ]" % (
+                        status.value, conf.dest_path, conf.src_path,
+                        ", ".join(self._system_index.system_names(
+                            conf.systems))))
+                else:
+                    print("%-15s %s -> %s" % (status.value, conf.dest_path,
+                                              conf.src_path))
+
+        for package_name, error_msg in errors:
+            if ndjson:
+                print(json.dumps({"package": package_name,
+                                  "error": error_msg}))
+            else:
+                print("%-15s %s" % ("error", error_msg))
+
+        if not ndjson and all_systems:
+            system_counts = dict(
+                (status, self._system_index.counts(masks))
+                for status, masks in status_systems.items())
+
+            print("\nSummary:")
+            for system_name in systems:
+                print("    %s:" % system_name)
+
+                for status, per_system in system_counts.items():
+                    print("        %-15s %d" % (status.value + ":",
+                                                per_system[system_name]))
+        elif not ndjson:
+            print("\nSummary:")
+            for status, count in counts.items():
+                print("    %-15s %d" % (status.value + ":", count))
+
+        if len(errors) > 0:
+            exit(ExitCode.INVALID_README_FORMAT.value)
+
+    def compile(self) -> None:
+        """
+        Compile the README files of all the packages of the work directory
+        into the work directory manifest. Once compiled, the manifest is
+        transparently used and kept up to date by the following runs
+
+        Returns
+        -------
+        None
+        """
+        self._manifest = Manifest(self.work_dir)
+
+        package_directories = self._package_directories()
+        readme_files = [os.path.join(package_dir, README_FILE_NAME)
+                        for package_dir in package_directories]
+
+        self._manifest.retain(readme_files)
+
+        for package_dir in package_directories:
+            for _ in PackageParser(package_dir, None,
+                                   manifest=self._manifest).records():
+                pass
+
+        self._manifest.save()
+
+        print("\nCompiled %d packages into %s" %
+              (len(package_directories), Manifest.file_path(self.work_dir)))
+
+    def dry_run(self) -> None:
+        """
+        Validate the README files of all the packages of the work directory
+        concurrently and report all the errors found
+
+        Returns
+        -------
+        None
+        """
+        self._print_banner()
+
+        errors = []
+
+        try:
+            SystemsParser(self.work_dir)
+        except ConfException as e:
+            errors.append(e)
+
+        self._load_manifest()
+
+        package_directories = self._package_directories()
+
+        print("\nValidating %d packages...\n" % len(package_directories))
+
+        with ThreadPoolExecutor() as executor:
+            for package_errors in executor.map(self._validate_package,
+                                               package_directories):
+                errors.extend(package_errors)
+
+        self._save_caches()
+
+        for error in errors:
+            print("** %s" % str(error))
+
+        if len(errors) > 0:
+            print("\nFound %d errors" % len(errors))
+            exit(ExitCode.INVALID_README_FORMAT.value)
+
+        print("No errors found")
+
+    def _undo_operation(self, operation: dict) -> str:
+        """
+        Undo a symbolic link creation, a copy or a backup recorded in a run
+        log
+
+        Parameters
+        ----------
+        operation: dict
+            recorded operation
+
+        Returns
+        -------
+        str
+            the error message when the operation could not be undone, or None
+        """
+        dest_path = operation["dest"]
+
+        if operation["op"] == LINK_OP:
+            if not os.path.lexists(dest_path):
+                # already removed
+                return None
+
+            if (not os.path.islink(dest_path)
+               or os.readlink(dest_path) != operation["src"]):
+                return ("%s changed since it was deployed and was left "
+                        "untouched" % dest_path)
+
+            os.unlink(dest_path)
+        elif operation["op"] == COPY_OP:
+            if not os.path.lexists(dest_path):
+                # already removed
+                return None
+
+            # the copy is not tracked by the source like a symbolic link is,
+            # only remove it while it still has the contents of the source
+            if not same_contents(Conf(operation["src"], dest_path, "", ""),
+                                 PathStatusCache(), DigestCache()):
+                return ("%s changed since it was copied and was left "
+                        "untouched" % dest_path)
+
+            if os.path.isdir(dest_path) and not os.path.islink(dest_path):
+                shutil.rmtree(dest_path)
+            else:
+                os.unlink(dest_path)
+        elif operation["op"] == BACKUP_OP:
+            backup_path = operation["backup"]
+
+            if not os.path.lexists(backup_path):
+                # already restored
+                return None
+
+            if os.path.lexists(dest_path):
+                return ("Unable to restore %s: %s already exists" %
+                        (backup_path, dest_path))
+
+            os.rename(backup_path, dest_path)
+
+        return None
+
+    def rollback(self) -> None:
+        """
+        Roll back the most recent run of lecfg, removing the symbolic links it
+        created, restoring the configurations it replaced and removing the
+        directories it created
+
+        Returns
+        -------
+        None
+        """
+        run_logs = RunLog.last_run(self.work_dir)
+
+        if len(run_logs) == 0:
+            print("There is no run to roll back")
+            return
+
+        # the processes of a run deploy into distinct targets, so the
+        # operations of each run log are undone independently
+        operations = []
+
+        for run_log_path in run_logs:
+            operations.extend(RunLog.operations(run_log_path))
+
+        print("Rolling back %d operations of run %s\n" % (
+            len(operations), RunLog.log_run_id(run_logs[0])))
+
+        # undo the operations in reverse order, grouped by destination
+        # directory. Operations on the same path always share the same group
+        groups = {}
+
+        for operation in reversed(operations):
+            if operation["op"] != MKDIR_OP:
+                groups.setdefault(os.path.dirname(operation["dest"]),
+                                  []).append(operation)
+
+        errors = []
+
+        for dir_operations in groups.values():
+            for operation in dir_operations:
+                try:
+                    error = self._undo_operation(operation)
+                except OSError as e:
+                    error = str(e)
+
+                if error is not None:
+                    errors.append(error)
+
+        # remove the created directories, the innermost ones first
+        created_dirs = [operation["path"] for operation in operations
+                        if operation["op"] == MKDIR_OP]
+
+        for dir_path in sorted(created_dirs, key=len, reverse=True):
+            if not os.path.isdir(dir_path):
+                continue
+
+            if len(os.listdir(dir_path)) > 0:
+                print("Directory %s is not empty and was left untouched" %
+                      dir_path)
+                continue
+
+            try:
+                os.rmdir(dir_path)
+            except OSError as e:
+                errors.append("Unable to remove directory %s: %s" %
+                              (dir_path, e.strerror))
+
+        for error in errors:
+            print(error)
+
+        if len(errors) > 0:
+            print("\nFound %d errors. Fix them and roll back again" %
+                  len(errors))
+            exit(ExitCode.ACTION_ERROR.value)
+
+        for run_log_path in run_logs:
+            RunLog.mark_rolled_back(run_log_path)
+
+        print("Rolled back %d symbolic links, %d copies, %d backups and %d "
+              "directories" %
+              (len([op for op in operations if op["op"] == LINK_OP]),
+               len([op for op in operations if op["op"] == COPY_OP]),
+               len([op for op in operations if op["op"] == BACKUP_OP]),
+               len(created_dirs)))
+
+    def _report_conflicts(self, dest_index: DestinationIndex,
+                          fatal: bool) -> None:
+        """
+        Report the configurations that would overwrite each other, if there
+        are any
+
+        Parameters
+        ----------
+        dest_index: DestinationIndex
+            index of the destination paths of the configurations
+        fatal: bool
+            exit when there are conflicts. The user can still choose which of
+            the conflicting configurations to deploy when asked about them
+
+        Returns
+        -------
+        None
+        """
+        conflicts = dest_index.conflicts()
+
+        if len(conflicts) == 0:
+            return
+
+        for conflict in conflicts:
+            print("** %s" % conflict)
+
+        if fatal:
+            print("\nFound %d destination conflicts. Please fix the "
+                  "README.lc files before deploying them without asking"
+                  % len(conflicts))
+            exit(ExitCode.DESTINATION_CONFLICT.value)
+
+        print("\nFound %d destination conflicts. The configurations "
+              "processed last will replace the ones deployed first\n" %
+              len(conflicts))
+
+    def _check_destinations(self, package_directories: List[str],
+                            current_system: str, fatal: bool) -> None:
+        """
+        Index the destination paths of the configurations of every package
+        up front, and report the ones that would overwrite each other
+
+        Parameters
+        ----------
+        package_directories: List[str]
+            paths to the package directories
+        current_system: str
+            name of the current system
+        fatal: bool
+            exit when there are conflicts
+
+        Returns
+        -------
+        None
+        """
+        dest_index = DestinationIndex()
+
+        for package_dir in package_directories:
+            try:
+                package = PackageParser(package_dir, current_system,
+                                        manifest=self._manifest,
+                                        deploy_mode=self._deploy_mode,
+                                        system_index=self._system_index,
+                                        source_index=self._source_index)
+
+                for conf in package.configurations():
+                    dest_index.add(package.file_path, package.line_num, conf)
+            except ConfException:
+                # reported once the package is processed
+                continue
+
+        self._report_conflicts(dest_index, fatal)
+
+    def _run_bulk(self, current_system: str) -> None:
+        """
+        Deploy all the packages of the work directory without asking the user
+
+        Parameters
+        ----------
+        current_system: str
+            name of the current system
+
+        Returns
+        -------
+        None
+        """
+        package_directories = self._package_directories()
+
+        self._check_destinations(package_directories, current_system, True)
+
+        package_directories = self._changed_packages(package_directories)
+
+        print("\n>>>>>>>>>>>>>>>>>>>>LeCFG START>>>>>>>>>>>>>>>>>>>>\n")
+
+        self._process_all(package_directories, current_system)
+
+        self._save_caches()
+
+        print("\n<<<<<<<<<<<<<<<<<<<<<LeCFG END<<<<<<<<<<<<<<<<<<<<<\n")
+
+    def _run_interactive(self, current_system: str) -> None:
+        """
+        Process the packages of the work directory, asking the user about
+        each configuration
+
+        Parameters
+        ----------
+        current_system: str
+            name of the current system
+
+        Returns
+        -------
+        None
+        """
+        self._build_options()
+
+        package_directories = self._package_directories()
+
+        self._check_destinations(package_directories, current_system, False)
+
+        prev_session = self._previous_session()
+        self._session_man.start_session(prev_session)
+
+        package_directories, prev_session = self._resume_point(
+            package_directories, prev_session)
+        package_directories = self._changed_packages(package_directories)
+
+        print("\n>>>>>>>>>>>>>>>>>>>>LeCFG START>>>>>>>>>>>>>>>>>>>>\n")
+
+        for package_dir in package_directories:
+            if (prev_session is not None
+               and prev_session.package_dir != package_dir):
+                prev_session = None
+
+            self._process_package(package_dir, current_system, prev_session)
+            prev_session = None
+
+        self._save_caches()
+        self._save_answers()
+        self._session_man.finish_session()
+
+        print("\nProcessed %d configurations, %d of which were already "
+              "deployed and skipped" % (self._conf_count,
+                                        self._converged_count))
+
+        print("\n<<<<<<<<<<<<<<<<<<<<<LeCFG END<<<<<<<<<<<<<<<<<<<<<\n")
+
+    def process(self) -> None:
+        """
+        Process the given work directory
+
+        Returns
+        -------
+        None
+        """
+        self._print_banner()
+
+        # the answer file may select the current system
+        self._load_answers()
+
+        current_system = self._load_system()
+
+        self._load_manifest()
+        self._load_digest_cache()
+        self._open_state_db()
+
+        try:
+            if self._targets:
+                self._run_targets(current_system)
+            elif self._replace_all:
+                self._run_bulk(current_system)
+            else:
+                self._run_interactive(current_system)
+        finally:
+            # also reached when lecfg exits before the end of the run
+            self._close_state_db()
+            self._run_log.close()
+            self._path_cache.close()
+
+
+def _apply_to_target(work_dir: str, target: Target, confs: List[Conf],
+                     run_id: str, part: int, use_dir_fd: bool
+                     ) -> Tuple[Dict[str, int], int, List[Tuple[Conf, str]]]:
+    """
+    Deploy parsed configurations into a target. Runs in a worker process
+
+    Parameters
+    ----------
+    work_dir: str
+        path to the work directory
+    target: Target
+        target into which the configurations are deployed
+    confs: List[Conf]
+        configurations, with their destination paths not expanded yet
+    run_id: str
+        id of the run the deployment is part of
+    part: int
+        index of the target in the run
+    use_dir_fd: bool
+        issue the file system calls relative to the opened parent directories
+
+    Returns
+    -------
+    Tuple[Dict[str, int], int, List[Tuple[Conf, str]]]
+        outcome of the deployment, as returned by Lecfg.apply_to_target
+    """
+    return Lecfg(work_dir, replace_all=True,
+                 use_dir_fd=use_dir_fd).apply_to_target(
+        target, confs, RunLog(work_dir, run_id, part))
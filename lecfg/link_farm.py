@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+
+###
+# MIT License
+#
+# Copyright (c) 2020 André Lousa Marques <andre.lousa.marques at gmail.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+###
+
+from typing import Dict, List, Tuple
+import os
+
+
+def _plan_dir(src_dir_path: str, dest_dir_path: str,
+              plan: Dict[str, List[Tuple[str, str, bool]]]) -> None:
+    """
+    Plan the symbolic links of a directory of the link farm
+
+    Parameters
+    ----------
+    src_dir_path: str
+        path to the source directory
+    dest_dir_path: str
+        path to the existing destination directory
+    plan: Dict[str, List[Tuple[str, str, bool]]]
+        plan to which the symbolic links of the directory are added
+
+    Returns
+    -------
+    None
+    """
+    with os.scandir(dest_dir_path) as entries:
+        dest_entries = {entry.name: entry for entry in entries}
+
+    links = []
+
+    with os.scandir(src_dir_path) as entries:
+        for entry in sorted(entries, key=lambda e: e.name):
+            dest_entry = dest_entries.get(entry.name)
+
+            if dest_entry is None:
+                # nothing conflicts, link the whole entry (tree folding)
+                links.append((entry.name, entry.path, False))
+            elif dest_entry.is_symlink():
+                if os.readlink(dest_entry.path) != entry.path:
+                    links.append((entry.name, entry.path, True))
+            elif (entry.is_dir(follow_symlinks=False)
+                  and dest_entry.is_dir(follow_symlinks=False)):
+                # both sides are directories, unfold them
+                _plan_dir(entry.path, dest_entry.path, plan)
+            else:
+                links.append((entry.name, entry.path, True))
+
+    if len(links) > 0:
+        plan[dest_dir_path] = links
+
+
+def link_farm_plan(src_dir_path: str, dest_dir_path: str
+                   ) -> Dict[str, List[Tuple[str, str, bool]]]:
+    """
+    Plan the symbolic links needed to deploy a source directory into an
+    existing destination directory as a link farm, in the style of GNU Stow.
+    Entries missing at the destination are linked as a whole, and
+    directories existing on both sides are descended into, so that only the
+    conflicting entries are replaced. The source tree is walked once
+
+    Parameters
+    ----------
+    src_dir_path: str
+        path to the source directory
+    dest_dir_path: str
+        path to the existing destination directory
+
+    Returns
+    -------
+    Dict[str, List[Tuple[str, str, bool]]]
+        symbolic links to create, grouped by destination directory: name of
+        the link, path to which it points and whether an existing entry must
+        be moved aside first. Empty when the link farm is already deployed
+    """
+    plan = {}
+
+    _plan_dir(src_dir_path, dest_dir_path, plan)
+
+    return plan
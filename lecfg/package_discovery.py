@@ -0,0 +1,320 @@
+# -*- coding: utf-8 -*-
+
+###
+# MIT License
+#
+# Copyright (c) 2020 André Lousa Marques <andre.lousa.marques at gmail.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+###
+
+
+from lecfg.checksum import IGNORED_NAMES
+from lecfg.conf.package_parser import README_FILE_NAME
+from lecfg.utilities import STATE_DIR_NAME, state_file_path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+import fnmatch
+import hashlib
+import json
+import os
+import re
+
+IGNORE_FILE_NAME = ".lecfgignore"
+
+DISCOVERY_CACHE_FILE_NAME = "packages.json"
+
+DISCOVERY_CACHE_VERSION = 1
+
+
+class IgnorePatterns():
+    """
+    Glob patterns of the directories of a work directory to leave out of the
+    package discovery, read from its .lecfgignore file. Each line holds one
+    pattern. A pattern with a "/" is matched against the path of the
+    directory relative to the work directory, any other pattern against the
+    name of the directory at any depth
+    """
+
+    def __init__(self, work_dir_path: str):
+        """
+        Constructor
+
+        Parameters
+        ----------
+        work_dir_path: str
+            path to the work directory
+        """
+        lines = []
+
+        try:
+            with open(os.path.join(work_dir_path, IGNORE_FILE_NAME),
+                      "r") as ignore_file:
+                lines = ignore_file.read().splitlines()
+        except OSError:
+            # every directory is searched when there is no ignore file
+            pass
+
+        name_patterns = []
+        path_patterns = []
+
+        for line in lines:
+            pattern = line.strip().rstrip("/")
+
+            if pattern == "" or pattern.startswith("#"):
+                continue
+
+            if "/" in pattern:
+                path_patterns.append(fnmatch.translate(pattern.lstrip("/")))
+            else:
+                name_patterns.append(fnmatch.translate(pattern))
+
+        self._digest = hashlib.sha1(
+            json.dumps([name_patterns, path_patterns]).encode()).hexdigest()
+        self._name_regex = self._compile(name_patterns)
+        self._path_regex = self._compile(path_patterns)
+
+    def _compile(self, patterns: List[str]):
+        if len(patterns) == 0:
+            return None
+
+        return re.compile("|".join("(?:%s)" % p for p in patterns))
+
+    @property
+    def digest(self) -> str:
+        """
+        Digest of the patterns, which identifies them on the discovery cache
+        """
+        return self._digest
+
+    def ignored(self, rel_path: str, name: str) -> bool:
+        """
+        Check if a directory is ignored
+
+        Parameters
+        ----------
+        rel_path: str
+            path to the directory relative to the work directory, with "/"
+            as separator
+        name: str
+            name of the directory
+
+        Returns
+        -------
+        bool
+            True if the directory and everything below it are ignored
+        """
+        if name in IGNORED_NAMES:
+            return True
+
+        if self._name_regex is not None and self._name_regex.match(name):
+            return True
+
+        return (self._path_regex is not None
+                and self._path_regex.match(rel_path) is not None)
+
+
+class PackageDiscovery():
+    """
+    Finds the package directories at any depth of a work directory. The top
+    level directories are searched concurrently, and the result of each
+    directory is cached along with its modification time, which changes
+    whenever an entry is added, removed or renamed in it. A directory whose
+    modification time is unchanged is not listed again
+    """
+
+    def __init__(self, work_dir_path: str):
+        """
+        Constructor
+
+        Parameters
+        ----------
+        work_dir_path: str
+            path to the work directory
+        """
+        self._work_dir_path = work_dir_path
+        self._ignore = IgnorePatterns(work_dir_path)
+
+    def _load_cache(self) -> Dict[str, list]:
+        cache_path = os.path.join(self._work_dir_path, STATE_DIR_NAME,
+                                  DISCOVERY_CACHE_FILE_NAME)
+
+        try:
+            with open(cache_path, "r") as cache_file:
+                cache = json.load(cache_file)
+        except (OSError, ValueError):
+            # a missing or corrupt cache is rebuilt from scratch
+            return {}
+
+        if (not isinstance(cache, dict)
+           or cache.get("version") != DISCOVERY_CACHE_VERSION
+           or cache.get("ignore") != self._ignore.digest
+           or not isinstance(cache.get("dirs"), dict)):
+            return {}
+
+        return cache["dirs"]
+
+    def _save_cache(self, dirs: Dict[str, list]) -> None:
+        cache_path = state_file_path(self._work_dir_path,
+                                     DISCOVERY_CACHE_FILE_NAME)
+        tmp_path = cache_path + ".tmp"
+
+        with open(tmp_path, "w") as cache_file:
+            json.dump({"version": DISCOVERY_CACHE_VERSION,
+                       "ignore": self._ignore.digest,
+                       "dirs": dirs}, cache_file, separators=(",", ":"))
+
+        os.replace(tmp_path, cache_path)
+
+    def _list_dir(self, rel_path: str, cached: Dict[str, list]
+                  ) -> Tuple[list, bool]:
+        """
+        Get the modification time, whether it is a package and the sub
+        directories of a directory, listing it only if it changed
+
+        Parameters
+        ----------
+        rel_path: str
+            path to the directory relative to the work directory, with "/"
+            as separator
+        cached: Dict[str, list]
+            cached result of each directory
+
+        Returns
+        -------
+        Tuple[list, bool]
+            result of the directory, and whether it was listed again
+        """
+        dir_path = os.path.join(self._work_dir_path, *rel_path.split("/"))
+        mtime = os.stat(dir_path).st_mtime_ns
+        result = cached.get(rel_path)
+
+        if result is not None and result[0] == mtime:
+            return (result, False)
+
+        is_package = False
+        sub_dirs = []
+
+        with os.scandir(dir_path) as entries:
+            for entry in entries:
+                if entry.name == README_FILE_NAME:
+                    is_package = True
+                elif entry.is_dir(follow_symlinks=False):
+                    sub_dirs.append(entry.name)
+
+        return ([mtime, is_package, sorted(sub_dirs)], True)
+
+    def _search(self, rel_path: str, cached: Dict[str, list]
+                ) -> Tuple[Dict[str, list], bool]:
+        """
+        Search a directory and everything below it
+
+        Parameters
+        ----------
+        rel_path: str
+            path to the directory relative to the work directory
+        cached: Dict[str, list]
+            cached result of each directory
+
+        Returns
+        -------
+        Tuple[Dict[str, list], bool]
+            result of each directory searched, and whether any of them was
+            listed again
+        """
+        dirs = {}
+        changed = False
+        pending = [rel_path]
+
+        while pending:
+            dir_rel_path = pending.pop()
+
+            try:
+                result, listed = self._list_dir(dir_rel_path, cached)
+            except OSError:
+                # unreadable or removed while searching
+                changed = True
+                continue
+
+            dirs[dir_rel_path] = result
+            changed = changed or listed
+
+            for name in result[2]:
+                sub_rel_path = (name if dir_rel_path == ""
+                                else dir_rel_path + "/" + name)
+
+                if not self._ignore.ignored(sub_rel_path, name):
+                    pending.append(sub_rel_path)
+
+        return (dirs, changed)
+
+    def _search_top_level(self, cached: Dict[str, list]
+                          ) -> Tuple[Dict[str, list], bool]:
+        """
+        Search the work directory, searching each top level directory
+        concurrently
+
+        Parameters
+        ----------
+        cached: Dict[str, list]
+            cached result of each directory
+
+        Returns
+        -------
+        Tuple[Dict[str, list], bool]
+            result of each directory searched, and whether any of them was
+            listed again
+        """
+        result, changed = self._list_dir("", cached)
+        top_level = [name for name in result[2]
+                     if not self._ignore.ignored(name, name)]
+        dirs = {"": result}
+
+        with ThreadPoolExecutor() as executor:
+            for sub_dirs, sub_changed in executor.map(
+                    lambda name: self._search(name, cached), top_level):
+                dirs.update(sub_dirs)
+                changed = changed or sub_changed
+
+        return (dirs, changed)
+
+    def package_directories(self) -> List[str]:
+        """
+        Find the package directories, which are the directories below the work
+        directory that have a package README file
+
+        Returns
+        -------
+        List[str]
+            sorted paths to the package directories
+        """
+        cached = self._load_cache()
+        dirs, changed = self._search_top_level(cached)
+
+        # the directories that are gone are dropped from the cache too
+        if changed or len(dirs) != len(cached):
+            try:
+                self._save_cache(dirs)
+            except OSError:
+                # the result is still valid for this run
+                pass
+
+        return sorted(os.path.join(self._work_dir_path, *rel_path.split("/"))
+                      for rel_path, result in dirs.items()
+                      if result[1] and rel_path != "")
@@ -0,0 +1,491 @@
+# -*- coding: utf-8 -*-
+
+###
+# MIT License
+#
+# Copyright (c) 2020 André Lousa Marques <andre.lousa.marques at gmail.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+###
+
+from lecfg.conf.source_index import SourceIndex
+from collections import OrderedDict
+from contextlib import contextmanager
+from threading import Lock
+from typing import Iterator, List, Tuple
+import stat
+import os
+
+# maximum number of directories kept open at once
+MAX_DIR_FDS = 64
+
+# directories opened only to be used as dir_fd need search permission alone
+# where O_PATH is available
+DIR_OPEN_FLAGS = getattr(os, "O_PATH", os.O_RDONLY) | os.O_DIRECTORY
+
+DIR_FD_SUPPORTED = (os.open in os.supports_dir_fd
+                    and os.stat in os.supports_dir_fd
+                    and os.stat in os.supports_follow_symlinks
+                    and os.readlink in os.supports_dir_fd
+                    and os.symlink in os.supports_dir_fd
+                    and os.rename in os.supports_dir_fd)
+
+
+class PathStatusCache():
+    """
+    Per-run cache of the status of file system paths. Each path is stat'ed at
+    most once until it is invalidated by an action that changes the file system
+    """
+
+    def __init__(self, use_dir_fd: bool = False,
+                 source_index: SourceIndex = None):
+        """
+        Constructor
+
+        Parameters
+        ----------
+        use_dir_fd: bool
+            issue the file system calls relative to the parent directory of
+            each path, which is opened once and kept open while it is used.
+            It saves resolving the whole path on every call when many paths
+            share the same parent, and guarantees that the calls on a path
+            all act on the same directory. Ignored if the platform does not
+            support it
+        source_index: SourceIndex
+            index of the configuration sources, which answers whether the
+            paths below its directory exist and their type without a stat
+            call each
+        """
+        self._lstats = {}
+        self._stats = {}
+        self._links = {}
+        self._use_dir_fd = use_dir_fd and DIR_FD_SUPPORTED
+        self._dir_fds = OrderedDict()
+        # the status of the configurations may be checked concurrently
+        self._dir_fds_lock = Lock()
+        self._source_index = source_index
+
+    def _key(self, path: str) -> str:
+        return os.path.normpath(path)
+
+    def _acquire_dir_fd(self, dir_path: str) -> List:
+        """
+        Get an opened directory, opening it if needed, and hold it open until
+        it is released
+
+        Parameters
+        ----------
+        dir_path: str
+            normalized path to the directory
+
+        Returns
+        -------
+        List
+            descriptor of the directory, number of calls using it and whether
+            it is to be closed once no call uses it anymore
+        """
+        with self._dir_fds_lock:
+            dir_fd = self._dir_fds.get(dir_path)
+
+            if dir_fd is not None:
+                self._dir_fds.move_to_end(dir_path)
+                dir_fd[1] += 1
+                return dir_fd
+
+            dir_fd = [os.open(dir_path, DIR_OPEN_FLAGS), 1, False]
+            self._dir_fds[dir_path] = dir_fd
+
+            if len(self._dir_fds) > MAX_DIR_FDS:
+                # close the least recently used directory no call is using
+                unused = next((path for path, (_, refs, _) in
+                               self._dir_fds.items() if refs == 0), None)
+
+                if unused is not None:
+                    self._detach_dir_fd(unused)
+
+            return dir_fd
+
+    def _release_dir_fd(self, dir_fd: List) -> None:
+        with self._dir_fds_lock:
+            dir_fd[1] -= 1
+
+            if dir_fd[2] and dir_fd[1] == 0:
+                os.close(dir_fd[0])
+
+    def _detach_dir_fd(self, dir_path: str) -> None:
+        """
+        Forget an opened directory, closing it as soon as no call uses it.
+        To be called with the lock of the opened directories held
+
+        Parameters
+        ----------
+        dir_path: str
+            normalized path to the directory
+
+        Returns
+        -------
+        None
+        """
+        dir_fd = self._dir_fds.pop(dir_path)
+        dir_fd[2] = True
+
+        if dir_fd[1] == 0:
+            os.close(dir_fd[0])
+
+    @contextmanager
+    def _at(self, key: str) -> Iterator[Tuple[str, int]]:
+        """
+        Split a path into the arguments of a file system call relative to its
+        parent directory. The parent directory is held open, even by other
+        threads, until the call is done
+
+        Parameters
+        ----------
+        key: str
+            normalized path
+
+        Returns
+        -------
+        Iterator[Tuple[str, int]]
+            name of the path inside its parent directory and descriptor of the
+            parent directory, or the path itself and None when the calls are
+            not relative to the parent directory
+        """
+        dir_fd = None
+
+        if self._use_dir_fd:
+            dir_path, sep, name = key.rpartition(os.sep)
+
+            if name not in ("", os.curdir, os.pardir):
+                try:
+                    dir_fd = self._acquire_dir_fd(dir_path or sep or os.curdir)
+                except PermissionError:
+                    pass
+
+        if dir_fd is None:
+            yield (key, None)
+            return
+
+        try:
+            yield (name, dir_fd[0])
+        finally:
+            self._release_dir_fd(dir_fd)
+
+    def lstat(self, path: str) -> os.stat_result:
+        """
+        Get the status of a path, without following symbolic links
+
+        Parameters
+        ----------
+        path: str
+            file system path
+
+        Returns
+        -------
+        os.stat_result
+            status of the path, or None if the path does not exist
+        """
+        key = self._key(path)
+
+        try:
+            return self._lstats[key]
+        except KeyError:
+            pass
+
+        try:
+            if self._use_dir_fd:
+                with self._at(key) as (name, dir_fd):
+                    result = os.stat(name, dir_fd=dir_fd,
+                                     follow_symlinks=False)
+            else:
+                result = os.lstat(key)
+        except (FileNotFoundError, NotADirectoryError):
+            result = None
+
+        self._lstats[key] = result
+
+        return result
+
+    def stat(self, path: str) -> os.stat_result:
+        """
+        Get the status of a path, following symbolic links
+
+        Parameters
+        ----------
+        path: str
+            file system path
+
+        Returns
+        -------
+        os.stat_result
+            status of the path, or None if the path does not exist or is a
+            dangling symbolic link
+        """
+        lstat = self.lstat(path)
+
+        if lstat is None or not stat.S_ISLNK(lstat.st_mode):
+            return lstat
+
+        key = self._key(path)
+
+        try:
+            return self._stats[key]
+        except KeyError:
+            pass
+
+        try:
+            result = os.stat(key)
+        except (FileNotFoundError, NotADirectoryError):
+            result = None
+
+        self._stats[key] = result
+
+        return result
+
+    def readlink(self, path: str) -> str:
+        """
+        Get the target of a symbolic link
+
+        Parameters
+        ----------
+        path: str
+            file system path
+
+        Returns
+        -------
+        str
+            normalized absolute path to which the symbolic link points, or None
+            if the path is not a symbolic link
+        """
+        if not self.is_symlink(path):
+            return None
+
+        key = self._key(path)
+
+        try:
+            return self._links[key]
+        except KeyError:
+            pass
+
+        try:
+            link_dir = os.path.dirname(os.path.abspath(key))
+
+            with self._at(key) as (name, dir_fd):
+                target = os.path.normpath(os.path.join(
+                    link_dir, os.readlink(name, dir_fd=dir_fd)))
+        except OSError:
+            target = None
+
+        self._links[key] = target
+
+        return target
+
+    def links_to(self, path: str, target_path: str) -> bool:
+        """
+        Check if a path is a symbolic link to the given target path
+
+        Parameters
+        ----------
+        path: str
+            file system path
+        target_path: str
+            expected target of the symbolic link
+
+        Returns
+        -------
+        bool
+            True if the path is a symbolic link to the target path
+        """
+        target = self.readlink(path)
+
+        if target is None:
+            return False
+
+        if target == os.path.normpath(os.path.abspath(target_path)):
+            return True
+
+        # the link may reach the target through another spelling of its path,
+        # e.g. a symbolic link to one of its parent directories
+        return self.samefile(path, target_path)
+
+    def _indexed(self, path: str) -> bool:
+        return (self._source_index is not None
+                and self._source_index.covers(path))
+
+    def exists(self, path: str) -> bool:
+        if self._indexed(path):
+            return self._source_index.exists(path)
+
+        return self.stat(path) is not None
+
+    def is_symlink(self, path: str) -> bool:
+        lstat = self.lstat(path)
+
+        return lstat is not None and stat.S_ISLNK(lstat.st_mode)
+
+    def is_dir(self, path: str) -> bool:
+        if self._indexed(path):
+            return self._source_index.is_dir(path)
+
+        result = self.stat(path)
+
+        return result is not None and stat.S_ISDIR(result.st_mode)
+
+    def is_file(self, path: str) -> bool:
+        if self._indexed(path):
+            return self._source_index.is_file(path)
+
+        result = self.stat(path)
+
+        return result is not None and stat.S_ISREG(result.st_mode)
+
+    def samefile(self, path: str, other_path: str) -> bool:
+        """
+        Check if two paths point to the same file
+
+        Parameters
+        ----------
+        path: str
+            file system path
+        other_path: str
+            other file system path
+
+        Returns
+        -------
+        bool
+            True if both paths exist and point to the same file
+        """
+        result = self.stat(path)
+        other_result = self.stat(other_path)
+
+        if result is None or other_result is None:
+            return False
+
+        return (result.st_dev == other_result.st_dev
+                and result.st_ino == other_result.st_ino)
+
+    def symlink(self, target_path: str, path: str) -> None:
+        """
+        Create a symbolic link and invalidate its status
+
+        Parameters
+        ----------
+        target_path: str
+            path to which the symbolic link points
+        path: str
+            path to the symbolic link
+
+        Returns
+        -------
+        None
+        """
+        with self._at(self._key(path)) as (name, dir_fd):
+            os.symlink(target_path, name, dir_fd=dir_fd)
+
+        self.invalidate(path)
+
+    def rename(self, path: str, new_path: str) -> None:
+        """
+        Rename a path, replacing any file at the new path, and invalidate the
+        status of both paths
+
+        Parameters
+        ----------
+        path: str
+            path to rename
+        new_path: str
+            new path
+
+        Returns
+        -------
+        None
+        """
+        # only the paths below a directory are affected by its renaming
+        lstat = self.lstat(path)
+        new_lstat = self.lstat(new_path)
+
+        with self._at(self._key(path)) as (name, dir_fd), \
+                self._at(self._key(new_path)) as (new_name, new_dir_fd):
+            os.rename(name, new_name, src_dir_fd=dir_fd,
+                      dst_dir_fd=new_dir_fd)
+
+        self.invalidate(path, recursive=(lstat is None
+                                         or stat.S_ISDIR(lstat.st_mode)))
+        self.invalidate(new_path, recursive=(new_lstat is not None
+                                             and stat.S_ISDIR(
+                                                 new_lstat.st_mode)))
+
+    def close(self) -> None:
+        """
+        Close the directories opened to issue the file system calls
+
+        Returns
+        -------
+        None
+        """
+        with self._dir_fds_lock:
+            for dir_path in list(self._dir_fds):
+                self._detach_dir_fd(dir_path)
+
+    def invalidate(self, path: str, recursive: bool = False) -> None:
+        """
+        Forget the status of a path and of its parent directories. To be
+        called whenever the path is changed
+
+        Parameters
+        ----------
+        path: str
+            file system path that changed
+        recursive: bool
+            also forget the status of every path below the given path. To be
+            used when a directory is moved or replaced
+
+        Returns
+        -------
+        None
+        """
+        key = self._key(path)
+        parents = [os.sep if os.path.isabs(key) else os.curdir]
+        end = key.rfind(os.sep)
+
+        while end > 0:
+            parents.append(key[:end])
+            end = key.rfind(os.sep, 0, end)
+
+        for cache in (self._lstats, self._stats, self._links):
+            if recursive:
+                prefix = key + os.sep
+
+                for cached in [k for k in cache if k.startswith(prefix)]:
+                    del cache[cached]
+
+            cache.pop(key, None)
+
+            for parent in parents:
+                cache.pop(parent, None)
+
+        if self._indexed(key):
+            self._source_index.invalidate(key)
+
+        # a directory that is moved or replaced must be opened again
+        with self._dir_fds_lock:
+            for dir_path in [d for d in self._dir_fds
+                             if d == key or (recursive
+                                             and d.startswith(key + os.sep))]:
+                self._detach_dir_fd(dir_path)
@@ -0,0 +1,300 @@
+# -*- coding: utf-8 -*-
+
+###
+# MIT License
+#
+# Copyright (c) 2020 André Lousa Marques <andre.lousa.marques at gmail.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+###
+
+from lecfg.utilities import STATE_DIR_NAME
+from datetime import datetime
+from pathlib import Path
+from typing import List
+import json
+import os
+
+RUN_LOG_DIR_NAME = "runs"
+RUN_LOG_FILE_SUFFIX = ".log"
+ROLLED_BACK_SUFFIX = ".rolledback"
+# separates the run id from the part of the run, in the names of the run logs
+# of the processes that take part in the same run
+RUN_PART_SEPARATOR = "+"
+
+LINK_OP = "link"
+COPY_OP = "copy"
+BACKUP_OP = "backup"
+MKDIR_OP = "mkdir"
+
+
+class RunLog():
+    """
+    Record of every change a run of lecfg makes to the file system, from which
+    the run can be rolled back
+    """
+
+    def __init__(self, work_dir_path: str, run_id: str = None,
+                 part: int = None):
+        """
+        Constructor
+
+        Parameters
+        ----------
+        work_dir_path: str
+            path to the work directory
+        run_id: str
+            id of the run the log belongs to, or None to start a new run
+        part: int
+            index of the part of the run recorded in the log, when several
+            processes take part in the same run, or None for the whole run
+        """
+        if run_id is None:
+            run_id = "%s-%d" % (datetime.utcnow().strftime(
+                "%Y%m%dT%H%M%S%f"), os.getpid())
+
+        file_name = run_id
+
+        if part is not None:
+            file_name += "%s%d" % (RUN_PART_SEPARATOR, part)
+
+        self._run_id = run_id
+        self._run_log_dir = self.run_log_dir(work_dir_path)
+        self._file_path = os.path.join(self._run_log_dir,
+                                       file_name + RUN_LOG_FILE_SUFFIX)
+        self._fd = None
+
+    @property
+    def run_id(self) -> str:
+        """
+        Id of the run the log belongs to
+        """
+        return self._run_id
+
+    @staticmethod
+    def run_log_dir(work_dir_path: str) -> str:
+        """
+        Build the path to the directory of the run logs of a work directory
+
+        Parameters
+        ----------
+        work_dir_path: str
+            path to the work directory
+
+        Returns
+        -------
+        str
+            path to the run logs directory
+        """
+        return os.path.join(work_dir_path, STATE_DIR_NAME, RUN_LOG_DIR_NAME)
+
+    @staticmethod
+    def run_logs(work_dir_path: str) -> List[str]:
+        """
+        List the run logs of a work directory that were not rolled back yet
+
+        Parameters
+        ----------
+        work_dir_path: str
+            path to the work directory
+
+        Returns
+        -------
+        List[str]
+            paths to the run logs, from the oldest to the most recent
+        """
+        return sorted(str(path) for path in Path(RunLog.run_log_dir(
+            work_dir_path)).glob("*%s" % RUN_LOG_FILE_SUFFIX))
+
+    @staticmethod
+    def log_run_id(run_log_path: str) -> str:
+        """
+        Get the id of the run a run log belongs to
+
+        Parameters
+        ----------
+        run_log_path: str
+            path to the run log
+
+        Returns
+        -------
+        str
+            id of the run
+        """
+        return Path(run_log_path).stem.split(RUN_PART_SEPARATOR)[0]
+
+    @staticmethod
+    def last_run(work_dir_path: str) -> List[str]:
+        """
+        List the run logs of the most recent run of a work directory that was
+        not rolled back yet, one per process that took part in the run
+
+        Parameters
+        ----------
+        work_dir_path: str
+            path to the work directory
+
+        Returns
+        -------
+        List[str]
+            paths to the run logs of the run, or an empty list if there is no
+            run to roll back
+        """
+        run_logs = RunLog.run_logs(work_dir_path)
+
+        if len(run_logs) == 0:
+            return []
+
+        # run ids start with the time of the run
+        last_run_id = max(RunLog.log_run_id(run_log_path)
+                          for run_log_path in run_logs)
+
+        return [run_log_path for run_log_path in run_logs
+                if RunLog.log_run_id(run_log_path) == last_run_id]
+
+    @staticmethod
+    def operations(run_log_path: str) -> List[dict]:
+        """
+        Read the operations recorded in a run log
+
+        Parameters
+        ----------
+        run_log_path: str
+            path to the run log
+
+        Returns
+        -------
+        List[dict]
+            recorded operations, in the order they were made
+        """
+        operations = []
+
+        with open(run_log_path, "r") as run_log:
+            for line in run_log:
+                try:
+                    operations.append(json.loads(line))
+                except ValueError:
+                    # an operation that was being recorded when lecfg crashed
+                    break
+
+        return operations
+
+    @staticmethod
+    def mark_rolled_back(run_log_path: str) -> None:
+        """
+        Mark a run log as rolled back, so that it is not rolled back again
+
+        Parameters
+        ----------
+        run_log_path: str
+            path to the run log
+
+        Returns
+        -------
+        None
+        """
+        os.replace(run_log_path, run_log_path + ROLLED_BACK_SUFFIX)
+
+    def _append(self, operation: dict) -> None:
+        if self._fd is None:
+            os.makedirs(self._run_log_dir, exist_ok=True)
+            self._fd = os.open(self._file_path,
+                               os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+
+        os.write(self._fd, (json.dumps(operation) + "\n").encode())
+
+    def record_link(self, dest_path: str, src_path: str) -> None:
+        """
+        Record the creation of a symbolic link
+
+        Parameters
+        ----------
+        dest_path: str
+            path to the created symbolic link
+        src_path: str
+            path to which the symbolic link points
+
+        Returns
+        -------
+        None
+        """
+        self._append({"op": LINK_OP, "dest": dest_path, "src": src_path})
+
+    def record_copy(self, dest_path: str, src_path: str) -> None:
+        """
+        Record the copy of a configuration
+
+        Parameters
+        ----------
+        dest_path: str
+            path to the created copy
+        src_path: str
+            path to the copied configuration
+
+        Returns
+        -------
+        None
+        """
+        self._append({"op": COPY_OP, "dest": dest_path, "src": src_path})
+
+    def record_backup(self, dest_path: str, backup_path: str) -> None:
+        """
+        Record that an existing configuration was moved aside
+
+        Parameters
+        ----------
+        dest_path: str
+            original path of the configuration
+        backup_path: str
+            path to which the configuration was moved
+
+        Returns
+        -------
+        None
+        """
+        self._append({"op": BACKUP_OP, "dest": dest_path,
+                      "backup": backup_path})
+
+    def record_mkdir(self, dir_path: str) -> None:
+        """
+        Record the creation of a directory
+
+        Parameters
+        ----------
+        dir_path: str
+            path to the created directory
+
+        Returns
+        -------
+        None
+        """
+        self._append({"op": MKDIR_OP, "path": dir_path})
+
+    def close(self) -> None:
+        """
+        Flush the run log to disk and close it
+
+        Returns
+        -------
+        None
+        """
+        if self._fd is not None:
+            os.fsync(self._fd)
+            os.close(self._fd)
+            self._fd = None
@@ -24,12 +24,17 @@
 # SOFTWARE.
 ###
 
+import json
 import os
 
+POSITION_RECORD = "position"
+DECISION_RECORD = "decision"
+PACKAGE_DONE_RECORD = "package_done"
+
 
 class Session():
     """
-    LeCfg session
+    LeCfg session, loaded from a session journal
     """
 
     def __init__(self, file_path: str, work_dir_path: str):
@@ -39,7 +44,7 @@ class Session():
         Parameters
         ----------
         file_path: str
-            session file path
+            session journal file path
         work_dir_path: str
             path to the work directory
 
@@ -48,24 +53,41 @@ class Session():
         FileNotFoundException
             if the given file path does not exist
         AssertionError
-            if the session file format is invalid or if the package dir path
-            does not exist or is not within the current work directory
+            if the session journal has no valid record or if the package dir
+            path does not exist or is not within the current work directory
         """
+        self._file_path = file_path
+        last_record = None
+
         with open(file_path, "r") as session_file:
-            fields = list(map(lambda l: l.strip(),
-                              session_file.readline().split(",")))
+            for line in session_file:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # a record that was being written when lecfg crashed
+                    continue
+
+                if isinstance(record, dict) and "type" in record:
+                    last_record = record
 
-            assert len(fields) > 1 and len(fields) <= 2, (
-                "Invalid session file format")
+        assert last_record is not None, "Invalid session file format"
 
-            self._package_dir = fields[0]
+        self._kind = last_record["type"]
+        self._package_dir = last_record["package"]
 
-            assert self._package_dir.startswith(work_dir_path) is True
-            assert os.path.isdir(self._package_dir) is True
+        assert self._package_dir.startswith(work_dir_path) is True
+        assert os.path.isdir(self._package_dir) is True
 
-            self._line_num = int(fields[1])
+        self._line_num = last_record.get("line", 0)
+        self._offset = last_record.get("offset")
+        self._fingerprint = last_record.get("fingerprint")
 
-        os.remove(file_path)
+    @property
+    def file_path(self) -> str:
+        """
+        Session journal file path
+        """
+        return self._file_path
 
     @property
     def package_dir(self) -> str:
@@ -80,3 +102,34 @@ class Session():
         Line number where to resume
         """
         return self._line_num
+
+    @property
+    def offset(self) -> int:
+        """
+        Byte offset of the line where to resume, or None if unknown
+        """
+        return self._offset
+
+    @property
+    def fingerprint(self) -> str:
+        """
+        Fingerprint of the package README file taken at the line where to
+        resume, or None if unknown
+        """
+        return self._fingerprint
+
+    @property
+    def decided(self) -> bool:
+        """
+        True if a decision was already taken on the configuration at the line
+        where to resume, in which case it must not be processed again
+        """
+        return self._kind == DECISION_RECORD
+
+    @property
+    def package_done(self) -> bool:
+        """
+        True if the package where to resume was completely processed, in which
+        case the session resumes on the next package
+        """
+        return self._kind == PACKAGE_DONE_RECORD
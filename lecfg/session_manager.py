@@ -26,15 +26,23 @@
 
 from datetime import datetime
 from lecfg.session import Session
+from lecfg.session import POSITION_RECORD, DECISION_RECORD
+from lecfg.session import PACKAGE_DONE_RECORD
+from lecfg.utilities import user_input, STATE_DIR_NAME
 from pathlib import Path
-from lecfg.utilities import user_input
+from typing import List
+import json
+import os
 
+JOURNAL_DIR_NAME = "journals"
+JOURNAL_FILE_SUFFIX = ".journal"
 SAVE_FILE_SUFFIX = "_lecfg.sav"
 
 
 class SessionManager():
     """
-    LeCfg session manager
+    LeCfg session manager. Each run appends its progress to a session journal,
+    which is removed once the run completes
     """
 
     def __init__(self, work_dir_path: str):
@@ -47,33 +55,116 @@ class SessionManager():
             path to the work directory
         """
         self._work_dir_path = work_dir_path
+        self._journal_dir = os.path.join(work_dir_path, STATE_DIR_NAME,
+                                         JOURNAL_DIR_NAME)
+        self._journal_path = None
+        self._journal_fd = None
 
-    def get_previous_session(self) -> Session:
+    def _migrate_saved_sessions(self) -> None:
+        """
+        Convert the sessions saved by previous versions of lecfg, as a single
+        position in the work directory, into session journals
+
+        Returns
+        -------
+        None
+        """
+        for save_file_path in sorted(Path(self._work_dir_path).glob(
+                "*%s" % SAVE_FILE_SUFFIX)):
+            with open(save_file_path, "r") as save_file:
+                fields = save_file.read().strip().split(",")
+
+            record = {"type": POSITION_RECORD, "package": fields[0]}
+
+            try:
+                record["line"] = int(fields[1])
+
+                if len(fields) == 4:
+                    record["offset"] = int(fields[2])
+                    record["fingerprint"] = fields[3]
+            except (IndexError, ValueError):
+                print("Discarding saved session %s with an invalid format" %
+                      save_file_path)
+                os.remove(save_file_path)
+                continue
+
+            file_name = "%s-%d%s" % (
+                datetime.utcfromtimestamp(os.path.getmtime(
+                    save_file_path)).strftime("%Y%m%dT%H%M%S%f"),
+                os.getpid(), JOURNAL_FILE_SUFFIX)
+
+            os.makedirs(self._journal_dir, exist_ok=True)
+
+            with open(os.path.join(self._journal_dir, file_name),
+                      "w") as journal_file:
+                journal_file.write(json.dumps(record) + "\n")
+
+            os.remove(save_file_path)
+
+            print("Migrated saved session %s" % save_file_path)
+
+    def _previous_sessions(self) -> List[Path]:
+        """
+        List the journals of the previous sessions, from the oldest
+
+        Returns
+        -------
+        List[Path]
+            paths to the session journals
+        """
+        self._migrate_saved_sessions()
+
+        return sorted(Path(self._journal_dir).glob(
+            "*%s" % JOURNAL_FILE_SUFFIX))
+
+    def has_previous_session(self) -> bool:
+        """
+        Check if there is any previous session that could be resumed
+
+        Returns
+        -------
+        bool
+            True if at least one previous session exists
+        """
+        return len(self._previous_sessions()) > 0
+
+    def get_previous_session(self, resume: bool = None) -> Session:
         """
         Get the previous session. If multiple sessions exist let the user
         select.
 
+        Parameters
+        ----------
+        resume: bool
+            whether to resume a previous session without asking the user, in
+            which case the most recent one is resumed, or None to ask
+
         Returns
         -------
         Session
             Return the previous session or None if none exists
         """
-        previous_sessions = list(Path(self._work_dir_path).glob(
-            "*%s" % SAVE_FILE_SUFFIX))
+        previous_sessions = self._previous_sessions()
         session_count = len(previous_sessions)
 
-        if session_count > 0:
-            question = []
-            question.append("There is at least one previously saved session. Do you want to resume?\n")
+        if session_count == 0 or resume is False:
+            return None
+
+        if resume is True:
+            return Session(str(previous_sessions[-1]), self._work_dir_path)
 
-            options = []
-            options.append("Yes")
-            options.append("No")
+        question = []
+        question.append("There is at least one previously saved session."
+                        " Do you want to resume?\n")
 
-            selection = user_input(question, options)
+        options = []
+        options.append("Yes")
+        options.append("No")
 
-            if selection == 1:
-                return None
+        selection = user_input(question, options)
+
+        if selection == 1:
+            return None
 
         if session_count > 1:
             question = ["Multiple sessions available. Please select one:"]
@@ -83,12 +174,122 @@ class SessionManager():
             return Session(str(previous_sessions[selection]),
                            self._work_dir_path)
 
-        if session_count == 1:
-            return Session(str(previous_sessions[0]), self._work_dir_path)
+        return Session(str(previous_sessions[0]), self._work_dir_path)
+
+    def start_session(self, previous_session: Session = None) -> None:
+        """
+        Start journaling the current session. A resumed session keeps
+        appending to the journal of the previous session
+
+        Parameters
+        ----------
+        previous_session: Session
+            session being resumed, or None to start a new session
+
+        Returns
+        -------
+        None
+        """
+        if previous_session is not None:
+            self._journal_path = previous_session.file_path
+        else:
+            file_name = "%s-%d%s" % (
+                datetime.utcnow().strftime("%Y%m%dT%H%M%S%f"), os.getpid(),
+                JOURNAL_FILE_SUFFIX)
+            self._journal_path = os.path.join(self._journal_dir, file_name)
+
+        self._journal_fd = None
+
+    def _append(self, record: dict) -> None:
+        """
+        Append a record to the session journal and flush it to disk. The
+        journal file is only created when the first record is appended
+
+        Parameters
+        ----------
+        record: dict
+            journal record
+
+        Returns
+        -------
+        None
+        """
+        if self._journal_path is None:
+            self.start_session()
+
+        if self._journal_fd is None:
+            os.makedirs(self._journal_dir, exist_ok=True)
+            self._journal_fd = os.open(self._journal_path,
+                                       os.O_RDWR | os.O_CREAT | os.O_APPEND,
+                                       0o644)
+
+            # a resumed journal may end with the truncated record that was
+            # being written when lecfg crashed, drop it so that the next
+            # record starts on a line of its own
+            size = os.fstat(self._journal_fd).st_size
+
+            if size > 0:
+                with open(self._journal_path, "rb") as journal_file:
+                    valid_size = journal_file.read().rfind(b"\n") + 1
+
+                if valid_size < size:
+                    os.ftruncate(self._journal_fd, valid_size)
+
+            # make the new journal entry durable in its directory
+            dir_fd = os.open(self._journal_dir, os.O_RDONLY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+
+        # a single write of a whole line, so that a crash can only leave a
+        # truncated last record behind
+        os.write(self._journal_fd, (json.dumps(record) + "\n").encode())
+        os.fsync(self._journal_fd)
+
+    def record_decision(self, package_dir: str, line_num: int, offset: int,
+                        fingerprint: str, decision: str) -> None:
+        """
+        Record the decision taken on a configuration
+
+        Parameters
+        ----------
+        package_dir: str
+            package directory path being processed
+        line_num: int
+            line number of the configuration in the package README file
+        offset: int
+            byte offset of the configuration in the package README file
+        fingerprint: str
+            fingerprint of the package README file at the configuration line
+        decision: str
+            decision taken on the configuration
+
+        Returns
+        -------
+        None
+        """
+        self._append({"type": DECISION_RECORD, "package": package_dir,
+                      "line": line_num, "offset": offset,
+                      "fingerprint": fingerprint, "decision": decision})
+
+    def record_package_done(self, package_dir: str) -> None:
+        """
+        Record that a package was completely processed
 
-        return None
+        Parameters
+        ----------
+        package_dir: str
+            package directory path
 
-    def save_session(self, package_dir: str, line_num: int) -> None:
+        Returns
+        -------
+        None
+        """
+        self._append({"type": PACKAGE_DONE_RECORD, "package": package_dir})
+
+    def save_session(self, package_dir: str, line_num: int,
+                     offset: int = None, fingerprint: str = None) -> None:
         """
         Save current session to resume later
 
@@ -98,16 +299,42 @@ class SessionManager():
             package directory path being processed
         line_num: int
             current line number in the given package README file
+        offset: int
+            byte offset of the current line in the given package README file
+        fingerprint: str
+            fingerprint of the given package README file at the current line
 
         Returns
         -------
         None
         """
+        record = {"type": POSITION_RECORD, "package": package_dir,
+                  "line": line_num}
+
+        if offset is not None and fingerprint is not None:
+            record["offset"] = offset
+            record["fingerprint"] = fingerprint
 
-        file_name = datetime.utcnow().strftime("%d-%m-%Y_%H-%M")
-        file_name += SAVE_FILE_SUFFIX
+        self._append(record)
+        self._close()
+
+    def _close(self) -> None:
+        if self._journal_fd is not None:
+            os.close(self._journal_fd)
+            self._journal_fd = None
+
+    def finish_session(self) -> None:
+        """
+        Finish the current session, which no longer needs to be resumed
+
+        Returns
+        -------
+        None
+        """
+        self._close()
 
-        save_file_path = str(Path(self._work_dir_path) / file_name)
+        if self._journal_path is not None and os.path.exists(
+                self._journal_path):
+            os.remove(self._journal_path)
 
-        with open(save_file_path, "w") as save_file:
-            save_file.write(package_dir + "," + str(line_num))
+        self._journal_path = None
@@ -0,0 +1,311 @@
+# -*- coding: utf-8 -*-
+
+###
+# MIT License
+#
+# Copyright (c) 2020 André Lousa Marques <andre.lousa.marques at gmail.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+###
+
+from lecfg.conf.conf import Conf
+from lecfg.path_cache import PathStatusCache
+from datetime import datetime
+from typing import Dict, List, Tuple
+import hashlib
+import os
+import sqlite3
+import stat
+
+STATE_DB_FILE_NAME = "state.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS packages (
+    package TEXT PRIMARY KEY,
+    readme_fingerprint TEXT NOT NULL,
+    applied_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS confs (
+    package TEXT NOT NULL,
+    src_path TEXT NOT NULL,
+    dest_path TEXT NOT NULL,
+    decision TEXT NOT NULL,
+    src_fingerprint TEXT NOT NULL,
+    dest_fingerprint TEXT NOT NULL,
+    applied_at TEXT NOT NULL,
+    PRIMARY KEY (package, src_path, dest_path)
+);
+"""
+
+
+class StateDb():
+    """
+    Local database of the state of the work directory configurations as left
+    by the last runs of lecfg
+    """
+
+    def __init__(self, db_file_path: str, path_cache: PathStatusCache):
+        """
+        Constructor
+
+        Parameters
+        ----------
+        db_file_path: str
+            path to the database file
+        path_cache: PathStatusCache
+            cache of the status of the configuration paths
+
+        Raises
+        ------
+        sqlite3.Error
+            if the database cannot be opened
+        """
+        self._path_cache = path_cache
+        self._recorded: Dict[str, List[Tuple[str, str]]] = {}
+        self._db = sqlite3.connect(db_file_path)
+        self._db.executescript(SCHEMA)
+
+    @staticmethod
+    def _status_fingerprint(status: os.stat_result) -> str:
+        """
+        Fingerprint the status of a path
+
+        Parameters
+        ----------
+        status: os.stat_result
+            status of the path, not following symbolic links
+
+        Returns
+        -------
+        str
+            fingerprint of the status
+        """
+        return "%d-%d-%d-%d" % (status.st_mode, status.st_ino,
+                                status.st_size, status.st_mtime_ns)
+
+    def _tree_fingerprint(self, dir_path: str) -> str:
+        """
+        Fingerprint the entries below a directory by their status, so that
+        the files edited anywhere in the tree change the fingerprint, without
+        reading their contents
+
+        Parameters
+        ----------
+        dir_path: str
+            path to the directory
+
+        Returns
+        -------
+        str
+            hexadecimal digest of the status of every entry of the tree
+        """
+        digest = hashlib.sha512()
+        pending = [dir_path]
+
+        while pending:
+            current_dir = pending.pop()
+
+            try:
+                with os.scandir(current_dir) as it:
+                    entries = sorted(it, key=lambda e: e.name)
+            except OSError:
+                continue
+
+            for entry in entries:
+                try:
+                    status = entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+
+                fingerprint = self._status_fingerprint(status)
+
+                if stat.S_ISLNK(status.st_mode):
+                    fingerprint += "-" + os.readlink(entry.path)
+                elif stat.S_ISDIR(status.st_mode):
+                    pending.append(entry.path)
+
+                digest.update(("%s\0%s\n" % (entry.path, fingerprint)
+                               ).encode())
+
+        return digest.hexdigest()
+
+    def _fingerprint(self, path: str) -> str:
+        """
+        Fingerprint a path by its status, without following symbolic links.
+        The fingerprint of a directory covers the status of its whole tree
+
+        Parameters
+        ----------
+        path: str
+            file system path
+
+        Returns
+        -------
+        str
+            fingerprint of the path, or an empty string if it does not exist
+        """
+        status = self._path_cache.lstat(path)
+
+        if status is None:
+            return ""
+
+        fingerprint = self._status_fingerprint(status)
+
+        target = self._path_cache.readlink(path)
+
+        if target is not None:
+            fingerprint += "-" + target
+        elif stat.S_ISDIR(status.st_mode):
+            fingerprint += "-" + self._tree_fingerprint(path)
+
+        return fingerprint
+
+    def package_changed(self, package_name: str,
+                        readme_file_path: str) -> bool:
+        """
+        Check if a package changed since it was last applied
+
+        Parameters
+        ----------
+        package_name: str
+            name of the package
+        readme_file_path: str
+            path to the package README file
+
+        Returns
+        -------
+        bool
+            True if the package was never applied, or if its README file or
+            the sources or destinations of its configurations changed since
+        """
+        row = self._db.execute("SELECT readme_fingerprint FROM packages "
+                               "WHERE package = ?", (package_name,)).fetchone()
+
+        if row is None or row[0] != self._fingerprint(readme_file_path):
+            return True
+
+        for src_path, dest_path, src_fp, dest_fp in self._db.execute(
+                "SELECT src_path, dest_path, src_fingerprint, "
+                "dest_fingerprint FROM confs WHERE package = ?",
+                (package_name,)):
+            if (self._fingerprint(src_path) != src_fp
+               or self._fingerprint(dest_path) != dest_fp):
+                return True
+
+        return False
+
+    def record_conf(self, package_name: str, conf: Conf,
+                    decision: str) -> None:
+        """
+        Record the decision taken on a configuration
+
+        Parameters
+        ----------
+        package_name: str
+            name of the package
+        conf: Conf
+            configuration
+        decision: str
+            decision taken on the configuration
+
+        Returns
+        -------
+        None
+        """
+        if package_name in self._recorded:
+            self._recorded[package_name].append((conf.src_path,
+                                                 conf.dest_path))
+
+        self._db.execute("INSERT OR REPLACE INTO confs VALUES "
+                         "(?, ?, ?, ?, ?, ?, ?)",
+                         (package_name, conf.src_path, conf.dest_path,
+                          decision, self._fingerprint(conf.src_path),
+                          self._fingerprint(conf.dest_path),
+                          datetime.utcnow().isoformat()))
+
+    def start_package(self, package_name: str, from_start: bool) -> None:
+        """
+        Forget that a package was applied, as it is about to be applied again
+
+        Parameters
+        ----------
+        package_name: str
+            name of the package
+        from_start: bool
+            True if all the package configurations are going to be applied,
+            False if the package is resumed from a given line
+
+        Returns
+        -------
+        None
+        """
+        if from_start:
+            self._recorded[package_name] = []
+        else:
+            self._recorded.pop(package_name, None)
+
+        self._db.execute("DELETE FROM packages WHERE package = ?",
+                         (package_name,))
+
+    def record_package(self, package_name: str,
+                       readme_file_path: str) -> None:
+        """
+        Record that a package was successfully applied. If the whole package
+        was applied, the configurations that are no longer part of it are
+        forgotten
+
+        Parameters
+        ----------
+        package_name: str
+            name of the package
+        readme_file_path: str
+            path to the package README file
+
+        Returns
+        -------
+        None
+        """
+        recorded = self._recorded.pop(package_name, None)
+
+        if recorded is not None:
+            recorded = set(recorded)
+
+            for src_path, dest_path in self._db.execute(
+                    "SELECT src_path, dest_path FROM confs WHERE package = ?",
+                    (package_name,)).fetchall():
+                if (src_path, dest_path) not in recorded:
+                    self._db.execute("DELETE FROM confs WHERE package = ? "
+                                     "AND src_path = ? AND dest_path = ?",
+                                     (package_name, src_path, dest_path))
+
+        self._db.execute("INSERT OR REPLACE INTO packages VALUES (?, ?, ?)",
+                         (package_name, self._fingerprint(readme_file_path),
+                          datetime.utcnow().isoformat()))
+        self._db.commit()
+
+    def close(self) -> None:
+        """
+        Commit any pending change and close the database
+
+        Returns
+        -------
+        None
+        """
+        self._db.commit()
+        self._db.close()
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+
+###
+# MIT License
+#
+# Copyright (c) 2020 André Lousa Marques <andre.lousa.marques at gmail.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+###
+
+
+from lecfg.utilities import state_file_path, STATE_DIR_NAME
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+import subprocess
+import sys
+import hashlib
+import socket
+import json
+import os
+
+DETECTION_CACHE_FILE_NAME = "systems.json"
+
+DETECTION_CACHE_VERSION = 1
+
+# maximum time a probe may run before its system is considered undetected,
+# in seconds
+PROBE_TIMEOUT = 5
+
+
+class SystemDetector():
+    """
+    Detects the current system by running the probe command of every system
+    concurrently. The systems detected are cached in the work directory per
+    host and set of probes, so the probes only run again when either changes
+    """
+
+    def __init__(self, work_dir_path: str, probes: Dict[str, str],
+                 timeout: float = None):
+        """
+        Constructor
+
+        Parameters
+        ----------
+        work_dir_path: str
+            path to the work directory, from where the probes are run
+        probes: Dict[str, str]
+            command that detects each system
+        timeout: float
+            maximum time each probe may run, in seconds, or None to use the
+            default timeout
+        """
+        self._work_dir_path = work_dir_path
+        self._probes = probes
+        self._timeout = timeout if timeout is not None else PROBE_TIMEOUT
+
+    def _cache_key(self) -> str:
+        """
+        Key of the detection on the cache, identifying the host and the probes
+        run on it
+
+        Returns
+        -------
+        str
+            hexadecimal digest of the host name and of the probes
+        """
+        key = json.dumps([socket.gethostname(), self._probes],
+                         sort_keys=True)
+
+        return hashlib.sha1(key.encode()).hexdigest()
+
+    def _load_cache(self) -> dict:
+        cache_path = os.path.join(self._work_dir_path, STATE_DIR_NAME,
+                                  DETECTION_CACHE_FILE_NAME)
+
+        try:
+            with open(cache_path, "r") as cache_file:
+                cache = json.load(cache_file)
+        except (OSError, ValueError):
+            # a missing or corrupt cache is rebuilt from scratch
+            return {}
+
+        if (not isinstance(cache, dict)
+           or cache.get("version") != DETECTION_CACHE_VERSION
+           or not isinstance(cache.get("hosts"), dict)):
+            return {}
+
+        return cache["hosts"]
+
+    def _save_cache(self, hosts: dict) -> None:
+        cache_path = state_file_path(self._work_dir_path,
+                                     DETECTION_CACHE_FILE_NAME)
+        tmp_path = cache_path + ".tmp"
+
+        with open(tmp_path, "w") as cache_file:
+            json.dump({"version": DETECTION_CACHE_VERSION, "hosts": hosts},
+                      cache_file, indent=2)
+
+        os.replace(tmp_path, cache_path)
+
+    def _probe(self, system_name: str) -> bool:
+        """
+        Run the probe of a system
+
+        Parameters
+        ----------
+        system_name: str
+            name of the system
+
+        Returns
+        -------
+        bool
+            True if the probe succeeded, False if it failed, or None if it
+            timed out
+        """
+        try:
+            result = subprocess.run(self._probes[system_name], shell=True,
+                                    cwd=self._work_dir_path,
+                                    stdin=subprocess.DEVNULL,
+                                    stdout=subprocess.DEVNULL,
+                                    stderr=subprocess.DEVNULL,
+                                    timeout=self._timeout)
+        except subprocess.TimeoutExpired:
+            # kept off the standard output, which may be machine readable
+            print("Probe of system [ %s ] timed out after %s seconds" %
+                  (system_name, self._timeout), file=sys.stderr)
+            return None
+
+        return result.returncode == 0
+
+    def detect(self) -> List[str]:
+        """
+        Find the systems whose probe succeeds on the current host, running the
+        probes only if they are not cached for it
+
+        Returns
+        -------
+        List[str]
+            names of the systems detected, in the order of the systems file
+        """
+        if len(self._probes) == 0:
+            return []
+
+        hosts = self._load_cache()
+        key = self._cache_key()
+        detected = hosts.get(key)
+
+        if isinstance(detected, list):
+            return detected
+
+        names = list(self._probes)
+
+        with ThreadPoolExecutor(max_workers=len(names)) as executor:
+            results = list(executor.map(self._probe, names))
+
+        detected = [name for name, result in zip(names, results) if result]
+
+        if None in results:
+            # a probe that timed out may succeed on the next run
+            return detected
+
+        hosts[key] = detected
+
+        try:
+            self._save_cache(hosts)
+        except OSError:
+            # the detection is still valid for this run
+            pass
+
+        return detected
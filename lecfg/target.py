@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+
+###
+# MIT License
+#
+# Copyright (c) 2020 André Lousa Marques <andre.lousa.marques at gmail.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+###
+
+from typing import Dict
+import os
+import re
+
+_VAR_RE = re.compile(r"\$(\w+|\{[^}]*\})", re.ASCII)
+
+
+class Target():
+    """
+    Deployment target: a root directory into which the configurations are
+    deployed, with its own home directory and environment
+    """
+
+    def __init__(self, root: str, env: Dict[str, str] = None):
+        """
+        Constructor
+
+        Parameters
+        ----------
+        root: str
+            root directory of the target. The destination paths are deployed
+            relative to it
+        env: Dict[str, str]
+            environment variables of the target, used to expand the
+            destination paths on top of the lecfg environment. The HOME
+            variable sets the home directory of the target
+        """
+        self._root = root
+        self._env = dict(os.environ)
+
+        if env is not None:
+            self._env.update(env)
+
+    @property
+    def root(self) -> str:
+        """
+        Root directory of the target
+        """
+        return self._root
+
+    @property
+    def home(self) -> str:
+        """
+        Home directory of the target
+        """
+        return self._env.get("HOME")
+
+    def __str__(self) -> str:
+        return self._root
+
+    @staticmethod
+    def parse(spec: str) -> "Target":
+        """
+        Build a target from its command line specification
+
+        Parameters
+        ----------
+        spec: str
+            target specification: "ROOT[,NAME=VALUE...]", where each
+            NAME=VALUE pair sets an environment variable of the target, such
+            as HOME
+
+        Returns
+        -------
+        Target
+            the specified target
+
+        Raises
+        ------
+        ValueError
+            if the specification is not valid
+        """
+        fields = spec.split(",")
+        root = fields[0]
+
+        if root == "":
+            raise ValueError("missing target root directory: %s" % spec)
+
+        env = {}
+
+        for field in fields[1:]:
+            name, sep, value = field.partition("=")
+
+            if sep == "" or name == "":
+                raise ValueError("expected NAME=VALUE but got \"%s\"" % field)
+
+            env[name] = value
+
+        return Target(root, env)
+
+    def _expand_var(self, match: re.Match) -> str:
+        name = match.group(1)
+
+        if name.startswith("{"):
+            name = name[1:-1]
+
+        # undefined variables are kept, as os.path.expandvars does
+        return self._env.get(name, match.group(0))
+
+    def expand(self, raw_dest_path: str) -> str:
+        """
+        Expand a destination path for the target
+
+        Parameters
+        ----------
+        raw_dest_path: str
+            destination path as written in the README file
+
+        Returns
+        -------
+        str
+            destination path inside the target root directory, or None if
+            the path references undefined environment variables or an
+            unknown home directory
+        """
+        dest_path = _VAR_RE.sub(self._expand_var, raw_dest_path)
+
+        if dest_path == "~" or dest_path.startswith("~" + os.sep):
+            if self.home is None:
+                return None
+
+            dest_path = self.home + dest_path[1:]
+
+        if "$" in dest_path or dest_path.startswith("~"):
+            return None
+
+        return os.path.join(self._root, dest_path.lstrip(os.sep))
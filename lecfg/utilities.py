@@ -26,6 +26,9 @@
 
 from typing import List
 from lecfg.exit_code import ExitCode
+import os
+
+STATE_DIR_NAME = ".lecfg"
 
 
 def user_input(question: List[str], options: List[str]) -> int:
@@ -70,3 +73,27 @@ def print_error(msg: str) -> None:
     None
     """
     print("\n** %s\n\n" % msg)
+
+
+def state_file_path(work_dir_path: str, file_name: str) -> str:
+    """
+    Build the path to a file of the lecfg state directory of a work
+    directory, creating the state directory if it does not exist yet
+
+    Parameters
+    ----------
+    work_dir_path: str
+        path to the work directory
+    file_name: str
+        name of the state file
+
+    Returns
+    -------
+    str
+        path to the state file
+    """
+    state_dir = os.path.join(work_dir_path, STATE_DIR_NAME)
+
+    os.makedirs(state_dir, exist_ok=True)
+
+    return os.path.join(state_dir, file_name)
@@ -0,0 +1,78 @@
+from lecfg.checksum import DigestCache
+from lecfg.dir_compare import dir_differences
+from pathlib import Path
+import os
+
+
+def test_dir_differences(setup, monkeypatch):
+    src_dir = setup("init.vim", "set number\n", parent_dir="src")
+    setup("a.vim", "syntax on\n", parent_dir=os.path.join(src_dir, "plugin"))
+    setup("b.vim", "", parent_dir=os.path.join(src_dir, "plugin"))
+    setup("only_src", "", parent_dir=src_dir)
+
+    dest_dir = setup("init.vim", "set number\n", parent_dir="dest")
+    setup("a.vim", "syntax off\n", parent_dir=os.path.join(dest_dir, "plugin"))
+    setup("b.vim", "", parent_dir=os.path.join(dest_dir, "plugin"))
+    os.mkdir(os.path.join(dest_dir, "only_src"))
+
+    digest_cache = DigestCache()
+
+    assert dir_differences(dest_dir, src_dir, digest_cache) == [
+        "File %s is a directory while file %s is a regular file" % (
+            os.path.join(dest_dir, "only_src"),
+            os.path.join(src_dir, "only_src")),
+        "Files %s and %s differ" % (
+            os.path.join(dest_dir, "plugin", "a.vim"),
+            os.path.join(src_dir, "plugin", "a.vim"))]
+
+    Path(os.path.join(dest_dir, "only_src")).rmdir()
+    setup("only_src", "", parent_dir=dest_dir)
+    setup("a.vim", "syntax on\n", parent_dir=os.path.join(dest_dir, "plugin"))
+
+    # unchanged files are not read again
+    read_files = []
+    real_open = open
+
+    def counting_open(path, *args, **kwargs):
+        read_files.append(path)
+        return real_open(path, *args, **kwargs)
+
+    monkeypatch.setattr("builtins.open", counting_open)
+
+    assert dir_differences(dest_dir, src_dir, digest_cache) == []
+    assert sorted(read_files) == [
+        os.path.join(dest_dir, "only_src"),
+        os.path.join(dest_dir, "plugin", "a.vim")]
+
+
+def test_special_file_differences(setup):
+    src_dir = setup("init.vim", "", parent_dir="src")
+    dest_dir = setup("init.vim", "", parent_dir="dest")
+
+    # named pipes are compared by their mode and never opened
+    os.mkfifo(os.path.join(src_dir, "pipe"), 0o600)
+    os.mkfifo(os.path.join(dest_dir, "pipe"), 0o600)
+
+    digest_cache = DigestCache()
+
+    assert dir_differences(dest_dir, src_dir, digest_cache) == []
+
+    os.unlink(os.path.join(dest_dir, "pipe"))
+    setup("pipe", "", parent_dir=dest_dir)
+
+    assert dir_differences(dest_dir, src_dir, digest_cache) == [
+        "File %s is a regular file while file %s is a special file" % (
+            os.path.join(dest_dir, "pipe"), os.path.join(src_dir, "pipe"))]
+
+
+def test_linked_dir_differences(setup):
+    src_dir = setup("init.vim", "set number\n", parent_dir="src")
+    dest_dir = setup("init.vim", "set nonumber\n", parent_dir="dest")
+
+    # the destination is reached through a symbolic link
+    os.symlink(dest_dir, dest_dir + ".link")
+
+    assert dir_differences(dest_dir + ".link", src_dir, DigestCache()) == [
+        "Files %s and %s differ" % (
+            os.path.join(dest_dir + ".link", "init.vim"),
+            os.path.join(src_dir, "init.vim"))]
@@ -3,7 +3,11 @@ from lecfg.conf.package_parser import README_FILE_NOT_FOUND
 from lecfg.conf.systems_parser import SystemsParser
 from lecfg.conf.systems_parser import SYSTEMS_FILE_NOT_FOUND
 from lecfg.conf.conf_exception import ConfException
+from lecfg.conf.system_index import SystemIndex, ALL_SYSTEMS
+from lecfg.conf.source_index import SourceIndex
+from lecfg.path_cache import PathStatusCache
 import pytest
+import os
 
 TEST_PACKAGE_CONF = """
 # README.lc
@@ -55,6 +59,190 @@ def test_parse_error(setup):
     assert len(conf_objs) == 2
 
 
+def test_system_index(setup):
+    package_dir = setup("README.lc", TEST_PACKAGE_CONF)
+
+    # setup package dir
+    setup(".vimrc", "", parent_dir=package_dir)
+    setup(".vimrc_gentoo", "", parent_dir=package_dir)
+    setup(".vimrc_work", "", parent_dir=package_dir)
+
+    system_index = SystemIndex(["Debian", "Gentoo"])
+
+    # every configuration is read when no system is given
+    vim_package = PackageParser(package_dir, None, system_index=system_index)
+    masks = [conf.systems for conf in vim_package.configurations()]
+
+    assert masks == [ALL_SYSTEMS, 0b10, 0b11]
+    assert system_index.system_names(masks[2]) == ["Debian", "Gentoo"]
+    assert system_index.counts(masks) == {"Debian": 2, "Gentoo": 3}
+
+    # unknown systems are interned as they are found
+    assert system_index.mask("Arch,Debian") == 0b101
+    assert system_index.systems == ["Debian", "Gentoo", "Arch"]
+
+    vim_package = PackageParser(package_dir, "Arch", system_index=system_index)
+
+    assert len(list(vim_package.configurations())) == 1
+
+
+SYSTEMS_CONF = """
+Debian | grep "Debian" /etc/os-release
+Ubuntu | grep "Ubuntu" /etc/os-release | Debian
+Mint | - | Ubuntu
+Gentoo | -
+@Linux | @Apt, Gentoo
+@Apt | Debian
+"""
+
+GROUP_PACKAGE_CONF = """
+.vimrc | - | Debian | /tmp/.vimrc | Vim Configuration
+.vimrc_gentoo | 8.0 | Gentoo | /tmp/.vimrc | Vim Configuration
+.vimrc_work | 8.0 | @Linux | /tmp/.vimrc | Vim configuration
+"""
+
+
+def test_system_groups(setup):
+    work_dir = setup("lecfg.systems", SYSTEMS_CONF)
+    setup("README.lc", GROUP_PACKAGE_CONF)
+
+    # setup package dir
+    setup(".vimrc", "", parent_dir=work_dir)
+    setup(".vimrc_gentoo", "", parent_dir=work_dir)
+    setup(".vimrc_work", "", parent_dir=work_dir)
+
+    sys_parser = SystemsParser(work_dir)
+
+    assert sys_parser.systems == ["Debian", "Ubuntu", "Mint", "Gentoo"]
+    assert sys_parser.ancestors("Mint") == {"Debian", "Ubuntu"}
+    assert sys_parser.members("Debian") == ["Debian", "Ubuntu", "Mint"]
+    assert sys_parser.members("@Linux") == sys_parser.systems
+
+    system_index = sys_parser.system_index()
+
+    # the configurations of the ancestors and of the groups apply
+    package = PackageParser(work_dir, "Mint", system_index=system_index)
+
+    assert [conf.src_path for conf in package.configurations()] == [
+        os.path.join(work_dir, ".vimrc"),
+        os.path.join(work_dir, ".vimrc_work")]
+
+    package = PackageParser(work_dir, "Gentoo", system_index=system_index)
+
+    assert len(list(package.configurations())) == 2
+
+
+@pytest.mark.parametrize("systems_conf,line_num", [
+    ("Debian | - | Mint\nUbuntu | - | Debian\nMint | - | Ubuntu\n", 0),
+    ("Debian | -\n@Linux | @Apt\n@Apt | Debian, @Linux\n", 1),
+    ("Debian | - | Arch\n", 0),
+    ("Debian | -\n@Linux | Debian, Arch\n", 1),
+    ("Debian | -\nDebian | - \n", 1),
+])
+def test_invalid_system_hierarchy(setup, systems_conf, line_num):
+    work_dir = setup("lecfg.systems", systems_conf)
+
+    with pytest.raises(ConfException) as error:
+        SystemsParser(work_dir)
+
+    assert error.value.line_num == line_num
+
+
+def test_source_index(setup, monkeypatch):
+    package_dir = setup("README.lc", TEST_PACKAGE_CONF)
+
+    # setup package dir
+    setup(".vimrc", "", parent_dir=package_dir)
+    setup(".vimrc_gentoo", "", parent_dir=package_dir)
+    setup("init.vim", "", parent_dir=os.path.join(package_dir, "nvim"))
+    os.symlink(".vimrc", os.path.join(package_dir, ".vimrc_work"))
+
+    scandir_calls = []
+    real_scandir = os.scandir
+
+    def counting_scandir(path):
+        scandir_calls.append(path)
+        return real_scandir(path)
+
+    def failing_stat(path, *args, **kwargs):
+        raise AssertionError("unexpected stat of %s" % path)
+
+    monkeypatch.setattr(os, "scandir", counting_scandir)
+    monkeypatch.setattr(os.path, "exists", failing_stat)
+    monkeypatch.setattr(os, "lstat", failing_stat)
+
+    source_index = SourceIndex(package_dir)
+    vim_package = PackageParser(package_dir, "Debian",
+                                source_index=source_index)
+
+    assert len(list(vim_package.configurations())) == 2
+    assert scandir_calls == [package_dir]
+
+    # the type of the sources is also known to the status cache
+    path_cache = PathStatusCache(source_index=source_index)
+
+    assert path_cache.is_file(os.path.join(package_dir, ".vimrc_work"))
+    assert path_cache.is_dir(os.path.join(package_dir, "nvim"))
+    assert path_cache.exists(os.path.join(package_dir, "nvim", "init.vim"))
+    assert not path_cache.exists(os.path.join(package_dir, "nvim", "a.vim"))
+    assert scandir_calls == [package_dir, os.path.join(package_dir, "nvim")]
+
+    monkeypatch.undo()
+
+    setup("a.vim", "", parent_dir=os.path.join(package_dir, "nvim"))
+    path_cache.invalidate(os.path.join(package_dir, "nvim", "a.vim"))
+
+    assert path_cache.exists(os.path.join(package_dir, "nvim", "a.vim"))
+
+
+def test_relative_source_index(setup, monkeypatch):
+    package_dir = setup(".vimrc", "", parent_dir="vim")
+
+    # the work directory is usually given as the current directory
+    monkeypatch.chdir(os.path.dirname(package_dir))
+
+    source_index = SourceIndex(".")
+    vimrc_path = os.path.join(".", "vim", ".vimrc")
+
+    def failing_stat(path, *args, **kwargs):
+        raise AssertionError("unexpected stat of %s" % path)
+
+    monkeypatch.setattr(os.path, "exists", failing_stat)
+    monkeypatch.setattr(os.path, "isfile", failing_stat)
+
+    assert source_index.covers(vimrc_path) is True
+    assert source_index.covers(os.path.join("vim", ".vimrc")) is True
+    assert source_index.exists(vimrc_path) is True
+    assert source_index.is_file(vimrc_path) is True
+    assert source_index.is_dir(os.path.join(".", "vim")) is True
+
+
+OTHER_SYSTEM_PACKAGE_CONF = """
+.vimrc | - | - | /tmp/.vimrc | Vim Configuration
+.vimrc_work | - | Other | $LECFG_UNDEFINED_VAR/.vimrc | Vim configuration
+"""
+
+
+def test_unexpanded_dest_of_other_system(setup, monkeypatch):
+    package_dir = setup("README.lc", OTHER_SYSTEM_PACKAGE_CONF)
+
+    setup(".vimrc", "", parent_dir=package_dir)
+    setup(".vimrc_work", "", parent_dir=package_dir)
+
+    monkeypatch.delenv("LECFG_UNDEFINED_VAR", raising=False)
+
+    # the line of the other system is skipped
+    vim_package = PackageParser(package_dir, "Debian")
+
+    assert len(list(vim_package.configurations())) == 1
+
+    # but it is still reported when validating the whole file
+    errors = PackageParser(package_dir, "Debian").errors()
+
+    assert len(errors) == 1
+    assert "Unable to expand the destination path" in str(errors[0])
+
+
 def test_invalid_system_file():
     with pytest.raises(ConfException, match=SYSTEMS_FILE_NOT_FOUND):
         SystemsParser("")
@@ -63,3 +251,43 @@ def test_invalid_system_file():
 def test_invalid_package_file():
     with pytest.raises(ConfException, match=README_FILE_NOT_FOUND):
         PackageParser("", "Debian")
+
+
+def test_resume_from_offset(setup):
+    package_dir = setup("README.lc", TEST_PACKAGE_CONF)
+
+    # setup package dir
+    setup(".vimrc", "", parent_dir=package_dir)
+    setup(".vimrc_gentoo", "", parent_dir=package_dir)
+    setup(".vimrc_work", "", parent_dir=package_dir)
+
+    vim_package = PackageParser(package_dir, "Debian")
+    configurations = vim_package.configurations()
+
+    next(configurations)
+    conf = next(configurations)
+
+    line_num = vim_package.line_num
+    offset = vim_package.offset
+    fingerprint = vim_package.fingerprint
+
+    assert line_num == 5
+    assert offset == TEST_PACKAGE_CONF.index(".vimrc_work")
+
+    # seek straight to the saved offset, the line number is not used to find
+    # the line
+    resumed = PackageParser(package_dir, "Debian", 0, offset, fingerprint)
+    resumed_confs = list(resumed.configurations())
+
+    assert len(resumed_confs) == 1
+    assert resumed_confs[0].src_path == conf.src_path
+
+    # once the file changes the line number is used instead
+    setup("README.lc", TEST_PACKAGE_CONF + "\n")
+
+    resumed = PackageParser(package_dir, "Debian", line_num, offset,
+                            fingerprint)
+    resumed_confs = list(resumed.configurations())
+
+    assert len(resumed_confs) == 1
+    assert resumed.line_num == line_num
@@ -0,0 +1,59 @@
+from lecfg.checksum import DigestCache
+from lecfg.conf.conf_exception import ConfException
+from lecfg.conf.package_parser import PackageParser
+from lecfg.conf_prefetcher import ConfPrefetcher
+from lecfg.conf_status import ConfStatus
+from lecfg.path_cache import PathStatusCache
+import pytest
+import os
+
+PACKAGE_CONF = """
+.vimrc | - | - | %s/.vimrc | Vim configuration
+.bashrc | - | - | %s/.bashrc | Bash configuration
+# invalid line below
+.zshrc
+"""
+
+
+def test_prefetch(setup, create_dir):
+    system_dir = create_dir("SYSTEM")
+    package_dir = setup("README.lc", PACKAGE_CONF % (system_dir, system_dir),
+                        parent_dir="vim")
+    setup(".vimrc", "set number\n", parent_dir=package_dir)
+    setup(".bashrc", "", parent_dir=package_dir)
+    setup(".vimrc", "set number\n", parent_dir=system_dir)
+
+    package = PackageParser(package_dir, "Debian")
+    prefetcher = ConfPrefetcher(package, DigestCache(), depth=1)
+    items = iter(prefetcher)
+
+    try:
+        vimrc = next(items)
+
+        # the position is the one of the configuration, not of the parser
+        # reading ahead
+        assert vimrc.line_num == 1
+        assert prefetcher.position is vimrc
+        assert vimrc.status is ConfStatus.CONFLICT
+        assert vimrc.identical is True
+
+        bashrc = next(items)
+
+        assert bashrc.line_num == 2
+        assert bashrc.status is ConfStatus.MISSING
+        assert bashrc.identical is None
+
+        # the destination was deployed after it was prefetched
+        os.symlink(bashrc.conf.src_path, bashrc.conf.dest_path)
+        prefetcher.changed(bashrc.conf.dest_path)
+        prefetcher.refresh(bashrc, PathStatusCache())
+
+        assert bashrc.status is ConfStatus.LINKED
+
+        # errors are raised when their line is reached
+        with pytest.raises(ConfException):
+            next(items)
+
+        assert prefetcher.position.line_num == 4
+    finally:
+        prefetcher.close()
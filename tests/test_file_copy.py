@@ -0,0 +1,65 @@
+from lecfg.action.deploy_action import DeployAction
+from lecfg.action.replace_action import ReplaceAction
+from lecfg.conf.conf import Conf, COPY_DEPLOY_MODE
+from lecfg.conf_status import ConfStatus, conf_status
+from lecfg.file_copy import copy_file
+import stat
+import os
+
+
+def test_copy_file(setup, create_dir):
+    src_dir = setup("init.vim", "set number\n", parent_dir="src")
+    os.chmod(os.path.join(src_dir, "init.vim"), 0o600)
+
+    dest_file = os.path.join(create_dir("dest"), "init.vim")
+
+    copy_file(os.path.join(src_dir, "init.vim"), dest_file)
+
+    assert open(dest_file).read() == "set number\n"
+    assert stat.S_IMODE(os.stat(dest_file).st_mode) == 0o600
+
+
+def test_copy_tree(setup, create_dir):
+    src_dir = setup("init.vim", "set number\n", parent_dir="src")
+    setup("a.vim", "syntax on\n", parent_dir=os.path.join(src_dir, "plugin"))
+    setup("b.vim", "", parent_dir=os.path.join(src_dir, "plugin"))
+    os.chmod(os.path.join(src_dir, "init.vim"), 0o600)
+    os.symlink("init.vim", os.path.join(src_dir, "vimrc"))
+    os.mkfifo(os.path.join(src_dir, "pipe"))
+
+    dest_dir = os.path.join(create_dir("dest"), "nvim")
+    conf = Conf(src_dir, dest_dir, "", "-", deploy_mode=COPY_DEPLOY_MODE)
+
+    DeployAction("Deploy").run(conf)
+
+    dest_file = os.path.join(dest_dir, "init.vim")
+
+    assert open(dest_file).read() == "set number\n"
+    assert stat.S_IMODE(os.stat(dest_file).st_mode) == 0o600
+    assert os.readlink(os.path.join(dest_dir, "vimrc")) == "init.vim"
+    assert open(os.path.join(dest_dir, "plugin", "a.vim")).read() == (
+        "syntax on\n")
+    assert not os.path.lexists(os.path.join(dest_dir, "pipe"))
+
+    # only the changed file is copied again, and only the file it replaces
+    # is moved aside
+    setup("a.vim", "syntax off\n", parent_dir=os.path.join(src_dir, "plugin"))
+    setup("local.vim", "", parent_dir=dest_dir)
+
+    b_inode = os.stat(os.path.join(dest_dir, "plugin", "b.vim")).st_ino
+
+    ReplaceAction("Replace").run(conf)
+
+    assert open(os.path.join(dest_dir, "plugin", "a.vim")).read() == (
+        "syntax off\n")
+    assert open(os.path.join(dest_dir, "plugin", "a.vim.lecfg.bak")
+                ).read() == "syntax on\n"
+    assert os.stat(os.path.join(dest_dir, "plugin", "b.vim")).st_ino == (
+        b_inode)
+    assert os.path.exists(os.path.join(dest_dir, "local.vim"))
+    assert not os.path.exists(dest_dir + ".lecfg.bak")
+
+    # the entries added to the destination are left alone
+    action = DeployAction("Deploy")
+
+    assert conf_status(conf, action.path_cache) is ConfStatus.COPIED
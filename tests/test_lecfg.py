@@ -1,11 +1,13 @@
 from lecfg.lecfg import Lecfg
 from lecfg.exit_code import ExitCode
+from lecfg.target import Target
 from pathlib import Path
 import pytest
 import os
 import io
 import glob
 import subprocess
+import json
 
 TEST_PACKAGE_CONF = """
 # README.lc
@@ -33,15 +35,37 @@ ONE_SYSTEM_CONF = """
 Debian | grep "Debian" /etc/os-release
 """
 
-TWO_SYSTEM_CONF = """
-Debian | grep "Debian" /etc/os-release
+UNDETECTED_SYSTEM_CONF = """
+Debian | false
 Gentoo | -
 """
 
+DETECTED_SYSTEM_CONF = """
+Debian | false
+Gentoo | echo "Gentoo" >> probes.log
+Arch | sleep 10
+"""
+
+TARGET_PACKAGE_CONF = """
+.vimrc | - | - | ~/.vimrc | Vim Configuration
+bashrc | - | - | $CONF_DIR/bash.bashrc | Bash configuration
+"""
+
+COPY_PACKAGE_CONF = """
+.vimrc |  - |  - | %s/.vimrc | Vim Configuration | copy
+.vimrc_work | 8.0 | Debian,Gentoo | %s/.vimrc_work | Vim configuration | link
+"""
+
+FARM_PACKAGE_CONF = """
+nvim | - | - | %s/nvim | Neovim configuration | farm
+"""
+
 DIR_PACKAGE_CONF = """
 dummy | - | - | %s/dummy | Dummy file
 """
 
+JOURNAL_DIR = os.path.join(".lecfg", "journals")
+
 MOCK_READ_CMD = "less"
 MOCK_CMP_CMD = "diff -u"
 
@@ -88,9 +112,9 @@ def test_single_system_conf(setup, capsys):
 
 
 def test_multiple_system_conf(setup, capsys, monkeypatch):
-    work_dir = setup("lecfg.systems", TWO_SYSTEM_CONF)
+    work_dir = setup("lecfg.systems", UNDETECTED_SYSTEM_CONF)
 
-    # select the second system
+    # no system is detected, select the second system
     monkeypatch.setattr('sys.stdin', io.StringIO('2'))
 
     lecfg = Lecfg(work_dir)
@@ -101,6 +125,52 @@ def test_multiple_system_conf(setup, capsys, monkeypatch):
     assert "Current system: [ Gentoo ]" in capture.out
 
 
+def test_system_detection(setup, capsys, monkeypatch):
+    work_dir = setup("lecfg.systems", DETECTED_SYSTEM_CONF)
+
+    monkeypatch.setattr("lecfg.system_detector.PROBE_TIMEOUT", 0.5)
+
+    lecfg = Lecfg(work_dir)
+    lecfg.process()
+
+    capture = capsys.readouterr()
+
+    assert "Probe of system [ Arch ] timed out" in capture.err
+    assert "Current system: [ Gentoo ]" in capture.out
+    assert check_file_contents(work_dir, "probes.log", "Gentoo\n") is True
+
+    # a detection with a probe that timed out is not cached
+    lecfg = Lecfg(work_dir)
+    lecfg.process()
+
+    assert check_file_contents(work_dir, "probes.log",
+                               "Gentoo\nGentoo\n") is True
+
+    setup("lecfg.systems",
+          DETECTED_SYSTEM_CONF.replace("Arch | sleep 10\n", ""))
+
+    # only the NDJSON records are written to the standard output
+    capsys.readouterr()
+
+    lecfg = Lecfg(work_dir)
+    lecfg.status(ndjson=True)
+
+    capture = capsys.readouterr()
+
+    assert "Detected system" not in capture.out
+    assert all(json.loads(line) for line in capture.out.splitlines())
+
+    # the detection is cached, so the probes are not run again
+    lecfg = Lecfg(work_dir)
+    lecfg.process()
+
+    capture = capsys.readouterr()
+
+    assert "Current system: [ Gentoo ]" in capture.out
+    assert check_file_contents(work_dir, "probes.log",
+                               "Gentoo\nGentoo\nGentoo\n") is True
+
+
 def test_package_deploy_replace(setup, create_dir, monkeypatch):
     work_dir = setup("lecfg.systems", ONE_SYSTEM_CONF, parent_dir="work_dir")
     system_dir = create_dir("SYSTEM")
@@ -172,7 +242,9 @@ def test_session(setup, create_dir, monkeypatch):
     assert file_exists(system_dir, ".vimrc_gentoo") is False
     assert file_exists(system_dir, ".vimrc_work") is False
 
-    assert file_exists(work_dir, "*_lecfg.sav") is True
+    journal_dir = os.path.join(work_dir, JOURNAL_DIR)
+
+    assert file_exists(journal_dir, "*.journal") is True
 
     # resume previous session, and deploy the remaining file
     monkeypatch.setattr('sys.stdin', io.StringIO('1\n2'))
@@ -184,20 +256,27 @@ def test_session(setup, create_dir, monkeypatch):
     assert file_exists(system_dir, ".vimrc_gentoo") is False
     assert file_exists(system_dir, ".vimrc_work") is True
 
-    assert file_exists(work_dir, "*_lecfg.sav") is False
+    assert file_exists(journal_dir, "*.journal") is False
 
 
 def test_multiple_sessions(setup, create_dir, monkeypatch):
     work_dir = setup("lecfg.systems", ONE_SYSTEM_CONF, parent_dir="work_dir")
     system_dir = create_dir("SYSTEM")
 
-    first_session = "10-12-2020_20-20_lecfg.sav"
-    second_session = "15-12-2020_21-21_lecfg.sav"
+    first_session = "20201210T202000000000-1.journal"
+    second_session = "20201215T212100000000-1.journal"
 
     package_dir = os.path.join(work_dir, "vim")
+    journal_dir = os.path.join(work_dir, JOURNAL_DIR)
 
-    setup(first_session, "%s,1" % package_dir, parent_dir=work_dir)
-    setup(second_session, "%s,3" % package_dir, parent_dir=work_dir)
+    os.makedirs(journal_dir)
+
+    setup(first_session, json.dumps({"type": "position",
+                                     "package": package_dir, "line": 1}),
+          parent_dir=journal_dir)
+    setup(second_session, json.dumps({"type": "position",
+                                      "package": package_dir, "line": 3}),
+          parent_dir=journal_dir)
 
     setup("README.lc",
           TEST_PACKAGE_CONF % (system_dir, system_dir, system_dir),
@@ -218,8 +297,42 @@ def test_multiple_sessions(setup, create_dir, monkeypatch):
     assert file_exists(system_dir, ".vimrc_gentoo") is False
     assert file_exists(system_dir, ".vimrc_work") is True
 
-    assert file_exists(work_dir, first_session) is True
-    assert file_exists(work_dir, second_session) is False
+    assert file_exists(journal_dir, first_session) is True
+    assert file_exists(journal_dir, second_session) is False
+
+
+def test_migrate_saved_session(setup, create_dir, monkeypatch, capsys):
+    work_dir = setup("lecfg.systems", ONE_SYSTEM_CONF, parent_dir="work_dir")
+    system_dir = create_dir("SYSTEM")
+
+    package_dir = os.path.join(work_dir, "vim")
+
+    # session saved by a previous version of lecfg
+    setup("15-12-2020_21-21_lecfg.sav", "%s,3" % package_dir,
+          parent_dir=work_dir)
+
+    setup("README.lc",
+          TEST_PACKAGE_CONF % (system_dir, system_dir, system_dir),
+          parent_dir=package_dir)
+
+    setup(".vimrc", "", parent_dir=package_dir)
+    setup(".vimrc_gentoo", "", parent_dir=package_dir)
+    setup(".vimrc_work", "", parent_dir=package_dir)
+
+    # resume the migrated session, which skips the first 2 lines
+    monkeypatch.setattr('sys.stdin', io.StringIO('1\n2'))
+
+    lecfg = Lecfg(work_dir)
+    lecfg.process()
+
+    assert "Migrated saved session" in capsys.readouterr().out
+
+    assert file_exists(system_dir, ".vimrc") is False
+    assert file_exists(system_dir, ".vimrc_work") is True
+
+    assert file_exists(work_dir, "*_lecfg.sav") is False
+    assert file_exists(os.path.join(work_dir, JOURNAL_DIR),
+                       "*.journal") is False
 
 
 def test_read_action(setup, create_dir, monkeypatch, mocker):
@@ -450,7 +563,9 @@ def test_error_save_and_exit(setup, create_dir, monkeypatch):
 
     setup(".vimrc", "", parent_dir=package_dir)
 
-    vim_dir = os.path.join(work_dir, "vim")
+    # the packages are processed in sorted order, so this one comes after
+    # the package of the previous session
+    vim_dir = os.path.join(work_dir, "zvim")
 
     setup("README.lc",
           TEST_PACKAGE_CONF % (system_dir, system_dir, system_dir),
@@ -461,8 +576,8 @@ def test_error_save_and_exit(setup, create_dir, monkeypatch):
     setup(".vimrc_work", "", parent_dir=vim_dir)
 
     # load the previous session and deploy the corrected file, and
-    # replace the corrected file with the one from the "vim" package, and
-    # deploy the last file from the "vim" package
+    # replace the corrected file with the one from the "zvim" package, and
+    # deploy the last file from the "zvim" package
     monkeypatch.setattr('sys.stdin', io.StringIO('1\n2\n4\n2'))
 
     lecfg = Lecfg(work_dir)
@@ -495,3 +610,892 @@ def test_compare_file_and_dir(setup, create_dir, monkeypatch, capsys):
     capture = capsys.readouterr()
 
     assert " Compare" not in capture.out
+
+
+def test_replace_all(setup, create_dir, capsys):
+    work_dir = setup("lecfg.systems", ONE_SYSTEM_CONF, parent_dir="work_dir")
+    system_dir = create_dir("SYSTEM")
+
+    package_dir = os.path.join(work_dir, "vim")
+
+    setup("README.lc",
+          TEST_PACKAGE_CONF % (system_dir, system_dir, system_dir),
+          parent_dir=package_dir)
+
+    replace_data = "some sample conf"
+
+    # setup package dir
+    setup(".vimrc", "", parent_dir=package_dir)
+    setup(".vimrc_gentoo", "", parent_dir=package_dir)
+    setup(".vimrc_work", replace_data, parent_dir=package_dir)
+
+    no_parent_dir = os.path.join(work_dir, "dummy")
+
+    setup("README.lc", NO_PARENT_PACKAGE_CONF % system_dir,
+          parent_dir=no_parent_dir)
+    setup("dummy", "", parent_dir=no_parent_dir)
+
+    # setup system dir
+    setup(".vimrc_work", "", parent_dir=system_dir)
+
+    # no question is asked to the user
+    lecfg = Lecfg(work_dir, replace_all=True)
+    lecfg.process()
+
+    parent_dir = os.path.join(system_dir, "some", "dir")
+
+    assert file_exists(system_dir, ".vimrc") is True
+    assert file_exists(system_dir, ".vimrc_gentoo") is False
+    assert file_exists(parent_dir, "dummy") is True
+    assert check_file_contents(system_dir, ".vimrc_work", replace_data) is True
+    assert file_exists(system_dir, ".vimrc_work.lecfg.bak") is True
+
+    capture = capsys.readouterr()
+
+    assert "Planned 3 configurations from 2 packages" in capture.out
+
+    # a second run finds everything already deployed
+    lecfg = Lecfg(work_dir, replace_all=True)
+    lecfg.process()
+
+    capture = capsys.readouterr()
+
+    assert "Already deployed:                  3" in capture.out
+
+
+def test_destination_conflicts(setup, create_dir, capsys):
+    work_dir = setup("lecfg.systems", ONE_SYSTEM_CONF, parent_dir="work_dir")
+    system_dir = create_dir("SYSTEM")
+
+    package_dir = os.path.join(work_dir, "vim")
+
+    setup("README.lc", CORRECTED_PACKAGE_CONF % system_dir,
+          parent_dir=package_dir)
+    setup(".vimrc", "", parent_dir=package_dir)
+
+    # same destination as the vim package
+    other_dir = os.path.join(work_dir, "vim_alt")
+
+    setup("README.lc", CORRECTED_PACKAGE_CONF % system_dir,
+          parent_dir=other_dir)
+    setup(".vimrc", "", parent_dir=other_dir)
+
+    # deploys inside the destination of the nvim package
+    nvim_dir = os.path.join(work_dir, "nvim")
+
+    setup("README.lc", FARM_PACKAGE_CONF % system_dir, parent_dir=nvim_dir)
+    setup("init.vim", "", parent_dir=os.path.join(nvim_dir, "nvim"))
+
+    nested_dir = os.path.join(work_dir, "nested")
+
+    setup("README.lc", NO_PARENT_PACKAGE_CONF % os.path.join(system_dir,
+                                                             "nvim"),
+          parent_dir=nested_dir)
+    setup("dummy", "", parent_dir=nested_dir)
+
+    lecfg = Lecfg(work_dir, replace_all=True)
+    with pytest.raises(SystemExit) as e:
+        lecfg.process()
+
+    assert e.value.code == ExitCode.DESTINATION_CONFLICT.value
+
+    capture = capsys.readouterr()
+
+    assert "Found 2 destination conflicts" in capture.out
+    assert ("have the same destination: %s" %
+            os.path.join(system_dir, ".vimrc") in capture.out)
+    assert ("inside the destination of \"%s\"" %
+            os.path.join(nvim_dir, "README.lc") in capture.out)
+
+    # nothing was deployed
+    assert file_exists(system_dir, ".vimrc") is False
+    assert file_exists(system_dir, "nvim") is False
+
+
+def test_rollback(setup, create_dir, capsys):
+    work_dir = setup("lecfg.systems", ONE_SYSTEM_CONF, parent_dir="work_dir")
+    system_dir = create_dir("SYSTEM")
+
+    package_dir = os.path.join(work_dir, "vim")
+
+    setup("README.lc",
+          TEST_PACKAGE_CONF % (system_dir, system_dir, system_dir),
+          parent_dir=package_dir)
+
+    setup(".vimrc", "", parent_dir=package_dir)
+    setup(".vimrc_gentoo", "", parent_dir=package_dir)
+    setup(".vimrc_work", "new conf", parent_dir=package_dir)
+
+    no_parent_dir = os.path.join(work_dir, "dummy")
+
+    setup("README.lc", NO_PARENT_PACKAGE_CONF % system_dir,
+          parent_dir=no_parent_dir)
+    setup("dummy", "", parent_dir=no_parent_dir)
+
+    existing_data = "existing conf"
+
+    setup(".vimrc_work", existing_data, parent_dir=system_dir)
+
+    lecfg = Lecfg(work_dir)
+    lecfg.rollback()
+
+    capture = capsys.readouterr()
+
+    assert "There is no run to roll back" in capture.out
+
+    lecfg = Lecfg(work_dir, replace_all=True)
+    lecfg.process()
+
+    assert os.path.islink(os.path.join(system_dir, ".vimrc_work")) is True
+
+    lecfg = Lecfg(work_dir)
+    lecfg.rollback()
+
+    capture = capsys.readouterr()
+
+    assert ("Rolled back 3 symbolic links, 0 copies, 1 backups and 2 "
+            "directories" in capture.out)
+
+    assert file_exists(system_dir, ".vimrc") is False
+    assert file_exists(system_dir, ".vimrc_work.lecfg.bak") is False
+    assert file_exists(system_dir, "some") is False
+    assert os.path.islink(os.path.join(system_dir, ".vimrc_work")) is False
+    assert check_file_contents(system_dir, ".vimrc_work",
+                               existing_data) is True
+
+    # the run was already rolled back
+    lecfg = Lecfg(work_dir)
+    lecfg.rollback()
+
+    capture = capsys.readouterr()
+
+    assert "There is no run to roll back" in capture.out
+
+
+def test_dry_run(setup, create_dir, capsys):
+    work_dir = setup("lecfg.systems", ONE_SYSTEM_CONF, parent_dir="work_dir")
+    system_dir = create_dir("SYSTEM")
+
+    package_dir = os.path.join(work_dir, "xpto")
+
+    setup("README.lc", INVALID_PACKAGE_CONF, parent_dir=package_dir)
+
+    vim_dir = os.path.join(work_dir, "vim")
+
+    # the ".vimrc_gentoo" file is missing and the destination of the last
+    # line references an undefined environment variable
+    setup("README.lc",
+          TEST_PACKAGE_CONF % (system_dir, system_dir,
+                               "$LECFG_UNDEFINED_VAR"),
+          parent_dir=vim_dir)
+
+    setup(".vimrc", "", parent_dir=vim_dir)
+    setup(".vimrc_work", "", parent_dir=vim_dir)
+
+    lecfg = Lecfg(work_dir)
+    with pytest.raises(SystemExit) as e:
+        lecfg.dry_run()
+
+    assert e.value.code == ExitCode.INVALID_README_FORMAT.value
+
+    capture = capsys.readouterr()
+
+    assert "Expected 5 or 6 fields but got 1" in capture.out
+    assert "mentions inexistent file" in capture.out
+    assert "Unable to expand the destination path" in capture.out
+    assert "Found 3 errors" in capture.out
+
+    assert file_exists(system_dir, ".vimrc") is False
+    assert file_exists(os.path.join(work_dir, JOURNAL_DIR),
+                       "*.journal") is False
+
+
+def test_dry_run_no_errors(setup, create_dir, capsys):
+    work_dir = setup("lecfg.systems", ONE_SYSTEM_CONF, parent_dir="work_dir")
+    system_dir = create_dir("SYSTEM")
+
+    package_dir = os.path.join(work_dir, "dummy")
+
+    setup("README.lc", NO_PARENT_PACKAGE_CONF % system_dir,
+          parent_dir=package_dir)
+    setup("dummy", "", parent_dir=package_dir)
+
+    lecfg = Lecfg(work_dir)
+    lecfg.dry_run()
+
+    capture = capsys.readouterr()
+
+    assert "No errors found" in capture.out
+
+
+def test_checksum(setup, monkeypatch, capsys):
+    work_dir = setup("lecfg.systems", ONE_SYSTEM_CONF, parent_dir="work_dir")
+
+    package_dir = os.path.join(work_dir, "vim")
+
+    setup("README.lc", CORRECTED_PACKAGE_CONF, parent_dir=package_dir)
+    setup(".vimrc", "some sample conf", parent_dir=package_dir)
+
+    def checksum() -> str:
+        lecfg = Lecfg(work_dir)
+        lecfg.checksum()
+
+        capture = capsys.readouterr()
+
+        return capture.out.split("SHA-512: ")[1].split("\n")[0]
+
+    # confirm the hash twice: the second run reuses the cached digests
+    monkeypatch.setattr('sys.stdin', io.StringIO('1\n1\n1'))
+
+    first_hash = checksum()
+
+    assert file_exists(os.path.join(work_dir, ".lecfg"), "digests.json")
+    assert checksum() == first_hash
+
+    setup(".vimrc", "other sample conf", parent_dir=package_dir)
+
+    assert checksum() != first_hash
+
+    # reject the hash
+    monkeypatch.setattr('sys.stdin', io.StringIO('2'))
+
+    lecfg = Lecfg(work_dir)
+    with pytest.raises(SystemExit) as e:
+        lecfg.checksum()
+
+    assert e.value.code == ExitCode.CHECKSUM_MISMATCH.value
+
+
+def test_compile(setup, create_dir, monkeypatch):
+    work_dir = setup("lecfg.systems", ONE_SYSTEM_CONF, parent_dir="work_dir")
+    system_dir = create_dir("SYSTEM")
+
+    package_dir = os.path.join(work_dir, "vim")
+
+    setup("README.lc",
+          TEST_PACKAGE_CONF % (system_dir, system_dir, system_dir),
+          parent_dir=package_dir)
+
+    setup(".vimrc", "", parent_dir=package_dir)
+    setup(".vimrc_gentoo", "", parent_dir=package_dir)
+    setup(".vimrc_work", "", parent_dir=package_dir)
+
+    lecfg = Lecfg(work_dir)
+    lecfg.compile()
+
+    assert file_exists(os.path.join(work_dir, ".lecfg"), "manifest.json")
+
+    # rewrite the README file, keeping its size and modification time, so
+    # that only the compiled lines are used
+    readme_file = os.path.join(package_dir, "README.lc")
+    readme_stat = os.stat(readme_file)
+
+    setup("README.lc",
+          (TEST_PACKAGE_CONF % (system_dir, system_dir, system_dir)
+           ).replace(".vimrc_work |", ".vimrc_xxxx |"),
+          parent_dir=package_dir)
+    os.utime(readme_file, ns=(readme_stat.st_atime_ns,
+                              readme_stat.st_mtime_ns))
+
+    monkeypatch.setattr('sys.stdin', io.StringIO('2\n2'))
+
+    lecfg = Lecfg(work_dir)
+    lecfg.process()
+
+    assert file_exists(system_dir, ".vimrc") is True
+    assert file_exists(system_dir, ".vimrc_work") is True
+
+    # once the README file changes it is parsed again
+    setup("README.lc", CORRECTED_PACKAGE_CONF % system_dir,
+          parent_dir=package_dir)
+
+    # the only configuration left is already deployed
+    lecfg = Lecfg(work_dir)
+    lecfg.process()
+
+    assert "/.vimrc_work" not in open(
+        os.path.join(work_dir, ".lecfg", "manifest.json")).read()
+
+
+def test_converged(setup, create_dir, monkeypatch, capsys):
+    work_dir = setup("lecfg.systems", ONE_SYSTEM_CONF, parent_dir="work_dir")
+    system_dir = create_dir("SYSTEM")
+
+    package_dir = os.path.join(work_dir, "vim")
+
+    setup("README.lc",
+          TEST_PACKAGE_CONF % (system_dir, system_dir, system_dir),
+          parent_dir=package_dir)
+
+    setup(".vimrc", "", parent_dir=package_dir)
+    setup(".vimrc_gentoo", "", parent_dir=package_dir)
+    setup(".vimrc_work", "", parent_dir=package_dir)
+
+    # deploy the first file and skip the second one
+    monkeypatch.setattr('sys.stdin', io.StringIO('2\n3'))
+
+    lecfg = Lecfg(work_dir)
+    lecfg.process()
+
+    capsys.readouterr()
+
+    # only the skipped file is asked about again
+    monkeypatch.setattr('sys.stdin', io.StringIO('3'))
+
+    lecfg = Lecfg(work_dir)
+    lecfg.process()
+
+    capture = capsys.readouterr()
+
+    assert capture.out.count("Please select an action") == 1
+    assert ("Processed 2 configurations, 1 of which were already deployed"
+            in capture.out)
+
+
+def test_record_and_replay(setup, create_dir, monkeypatch, capsys):
+    work_dir = setup("lecfg.systems", ONE_SYSTEM_CONF, parent_dir="work_dir")
+    system_dir = create_dir("SYSTEM")
+
+    package_dir = os.path.join(work_dir, "vim")
+
+    setup("README.lc",
+          TEST_PACKAGE_CONF % (system_dir, system_dir, system_dir),
+          parent_dir=package_dir)
+
+    setup(".vimrc", "", parent_dir=package_dir)
+    setup(".vimrc_gentoo", "", parent_dir=package_dir)
+    setup(".vimrc_work", "", parent_dir=package_dir)
+
+    answer_file = os.path.join(os.path.dirname(work_dir), "answers.json")
+
+    # deploy the first file and skip the second one
+    monkeypatch.setattr('sys.stdin', io.StringIO('2\n3'))
+
+    lecfg = Lecfg(work_dir, record_file=answer_file)
+    lecfg.process()
+
+    answers = json.load(open(answer_file))["answers"]
+
+    assert [(a["src"], a["decision"]) for a in answers] == [
+        (".vimrc", "deploy"), (".vimrc_work", "skip")]
+
+    # replay the decisions on a clean system, without asking any question
+    os.unlink(os.path.join(system_dir, ".vimrc"))
+    capsys.readouterr()
+    monkeypatch.setattr('sys.stdin', io.StringIO(''))
+
+    lecfg = Lecfg(work_dir, replay_file=answer_file)
+    lecfg.process()
+
+    capture = capsys.readouterr()
+
+    assert "Please select an action" not in capture.out
+    assert os.path.islink(os.path.join(system_dir, ".vimrc")) is True
+    assert file_exists(system_dir, ".vimrc_work") is False
+
+    # an answer file that does not exist cannot be replayed
+    with pytest.raises(SystemExit) as e:
+        lecfg = Lecfg(work_dir, replay_file=answer_file + ".missing")
+        lecfg.process()
+
+    assert e.type == SystemExit
+    assert e.value.code == ExitCode.INVALID_ANSWER_FILE.value
+
+
+def test_replay_system_and_resume(setup, create_dir, monkeypatch, capsys):
+    work_dir = setup("lecfg.systems", UNDETECTED_SYSTEM_CONF,
+                     parent_dir="work_dir")
+    system_dir = create_dir("SYSTEM")
+
+    package_dir = os.path.join(work_dir, "vim")
+
+    setup("README.lc", NO_PARENT_PACKAGE_CONF % system_dir,
+          parent_dir=package_dir)
+    setup("dummy", "", parent_dir=package_dir)
+
+    answer_file = os.path.join(os.path.dirname(work_dir), "answers.json")
+
+    # no system is detected, select the second system and skip the file
+    monkeypatch.setattr('sys.stdin', io.StringIO('2\n3'))
+
+    lecfg = Lecfg(work_dir, record_file=answer_file)
+    lecfg.process()
+
+    assert json.load(open(answer_file))["system"] == "Gentoo"
+
+    # a previous session cannot be resumed without a recorded decision
+    journal_dir = os.path.join(work_dir, JOURNAL_DIR)
+    setup("20201210T202000000000-1.journal",
+          json.dumps({"type": "position", "package": package_dir,
+                      "line": 1}), parent_dir=journal_dir)
+
+    monkeypatch.setattr('sys.stdin', io.StringIO(''))
+    capsys.readouterr()
+
+    with pytest.raises(SystemExit) as e:
+        lecfg = Lecfg(work_dir, replay_file=answer_file)
+        lecfg.process()
+
+    assert e.value.code == ExitCode.INVALID_ANSWER_FILE.value
+    assert "Replaying system: [ Gentoo ]" in capsys.readouterr().out
+
+    answers = json.load(open(answer_file))
+    answers["resume"] = False
+    json.dump(answers, open(answer_file, "w"))
+
+    lecfg = Lecfg(work_dir, replay_file=answer_file)
+    lecfg.process()
+
+    capture = capsys.readouterr()
+
+    assert "Do you want to resume?" not in capture.out
+    assert "Current system: [ Gentoo ]" in capture.out
+    assert file_exists(journal_dir, "*.journal") is True
+
+
+def test_targets(setup, create_dir, capsys):
+    work_dir = setup("lecfg.systems", ONE_SYSTEM_CONF, parent_dir="work_dir")
+    first_root = create_dir("first")
+    second_root = create_dir("second")
+
+    package_dir = os.path.join(work_dir, "vim")
+
+    setup("README.lc", TARGET_PACKAGE_CONF, parent_dir=package_dir)
+    setup(".vimrc", "", parent_dir=package_dir)
+    setup("bashrc", "", parent_dir=package_dir)
+
+    targets = [Target.parse("%s,HOME=/home/alice,CONF_DIR=/etc" % first_root),
+               Target.parse("%s,HOME=/root" % second_root)]
+
+    assert targets[0].expand("~/.vimrc") == os.path.join(
+        first_root, "home", "alice", ".vimrc")
+
+    # the CONF_DIR variable is not defined for the second target
+    with pytest.raises(SystemExit) as e:
+        lecfg = Lecfg(work_dir, targets=targets)
+        lecfg.process()
+
+    assert e.value.code == ExitCode.ACTION_ERROR.value
+
+    assert os.path.islink(os.path.join(first_root, "home", "alice",
+                                       ".vimrc")) is True
+    assert os.path.islink(os.path.join(first_root, "etc",
+                                       "bash.bashrc")) is True
+    assert os.path.islink(os.path.join(second_root, "root",
+                                       ".vimrc")) is True
+
+    capture = capsys.readouterr()
+
+    assert "into 2 targets" in capture.out
+    assert "Unable to expand the destination path" in capture.out
+
+    # the targets are rolled back together, as a single run
+    lecfg = Lecfg(work_dir)
+    lecfg.rollback()
+
+    assert os.path.lexists(os.path.join(first_root, "home", "alice",
+                                        ".vimrc")) is False
+    assert os.path.lexists(os.path.join(first_root, "etc",
+                                        "bash.bashrc")) is False
+    assert os.path.lexists(os.path.join(second_root, "root",
+                                        ".vimrc")) is False
+    assert os.path.isdir(os.path.join(first_root, "home")) is False
+
+
+def test_copy_deploy(setup, create_dir, capsys):
+    work_dir = setup("lecfg.systems", ONE_SYSTEM_CONF, parent_dir="work_dir")
+    system_dir = create_dir("SYSTEM")
+
+    package_dir = os.path.join(work_dir, "vim")
+
+    setup("README.lc", COPY_PACKAGE_CONF % (system_dir, system_dir),
+          parent_dir=package_dir)
+    setup(".vimrc", "set number", parent_dir=package_dir)
+    setup(".vimrc_work", "", parent_dir=package_dir)
+
+    # the deploy mode of the README file overrides the global one
+    lecfg = Lecfg(work_dir, replace_all=True, deploy_mode="copy")
+    lecfg.process()
+
+    assert os.path.islink(os.path.join(system_dir, ".vimrc")) is False
+    assert check_file_contents(system_dir, ".vimrc", "set number") is True
+    assert os.path.islink(os.path.join(system_dir, ".vimrc_work")) is True
+
+    capsys.readouterr()
+
+    # an identical copy is already deployed
+    lecfg = Lecfg(work_dir, replace_all=True)
+    lecfg.process()
+
+    capture = capsys.readouterr()
+
+    assert "Already deployed:                  2" in capture.out
+
+    # a changed copy is replaced
+    setup(".vimrc", "set nonumber", parent_dir=package_dir)
+
+    lecfg = Lecfg(work_dir, replace_all=True)
+    lecfg.process()
+
+    assert check_file_contents(system_dir, ".vimrc", "set nonumber") is True
+    assert check_file_contents(system_dir, ".vimrc.lecfg.bak",
+                               "set number") is True
+
+    # a copy edited since it was deployed is not rolled back
+    setup(".vimrc", "set nonumber\nset ruler", parent_dir=system_dir)
+    capsys.readouterr()
+
+    lecfg = Lecfg(work_dir)
+
+    with pytest.raises(SystemExit) as e:
+        lecfg.rollback()
+
+    assert e.value.code == ExitCode.ACTION_ERROR.value
+    assert ("%s changed since it was copied and was left untouched" %
+            os.path.join(system_dir, ".vimrc") in capsys.readouterr().out)
+    assert check_file_contents(system_dir, ".vimrc",
+                               "set nonumber\nset ruler") is True
+
+
+def test_link_to_copy_deploy(setup, create_dir, capsys):
+    work_dir = setup("lecfg.systems", ONE_SYSTEM_CONF, parent_dir="work_dir")
+    system_dir = create_dir("SYSTEM")
+
+    package_dir = os.path.join(work_dir, "vim")
+
+    setup("README.lc", NO_PARENT_PACKAGE_CONF % system_dir,
+          parent_dir=package_dir)
+    setup("dummy", "set number", parent_dir=package_dir)
+
+    dest_dir = os.path.join(system_dir, "some", "dir")
+
+    lecfg = Lecfg(work_dir, replace_all=True)
+    lecfg.process()
+
+    assert os.path.islink(os.path.join(dest_dir, "dummy")) is True
+
+    # the links to the sources are replaced with copies
+    lecfg = Lecfg(work_dir, replace_all=True, deploy_mode="copy")
+    lecfg.process()
+
+    assert os.path.islink(os.path.join(dest_dir, "dummy")) is False
+    assert check_file_contents(dest_dir, "dummy", "set number") is True
+    assert os.path.islink(os.path.join(dest_dir,
+                                       "dummy.lecfg.bak")) is True
+
+    capsys.readouterr()
+
+    lecfg = Lecfg(work_dir, deploy_mode="copy")
+    lecfg.status(ndjson=True)
+
+    statuses = [json.loads(line)
+                for line in capsys.readouterr().out.splitlines()
+                if line.startswith("{")]
+
+    assert [status["status"] for status in statuses] == ["copied"]
+
+
+def test_link_farm(setup, create_dir, capsys):
+    work_dir = setup("lecfg.systems", ONE_SYSTEM_CONF, parent_dir="work_dir")
+    system_dir = create_dir("SYSTEM")
+
+    package_dir = os.path.join(work_dir, "nvim")
+    src_dir = os.path.join(package_dir, "nvim")
+
+    setup("README.lc", FARM_PACKAGE_CONF % system_dir, parent_dir=package_dir)
+    setup("init.vim", "set number", parent_dir=src_dir)
+    setup("a.vim", "", parent_dir=os.path.join(src_dir, "plugin"))
+    setup("b.vim", "", parent_dir=os.path.join(src_dir, "colors"))
+
+    # the destination directory already has some of the entries
+    dest_dir = os.path.join(system_dir, "nvim")
+
+    setup("init.vim", "set nonumber", parent_dir=dest_dir)
+    setup("local.vim", "", parent_dir=os.path.join(dest_dir, "plugin"))
+    setup("notes", "", parent_dir=dest_dir)
+
+    lecfg = Lecfg(work_dir, replace_all=True)
+    lecfg.process()
+
+    # only the conflicting file is moved aside
+    assert os.path.islink(dest_dir) is False
+    assert os.path.islink(os.path.join(dest_dir, "init.vim")) is True
+    assert check_file_contents(dest_dir, "init.vim.lecfg.bak",
+                               "set nonumber") is True
+    assert file_exists(dest_dir, "notes") is True
+
+    # the missing directory is folded into a single link, while the
+    # existing one gets a link per file
+    assert os.path.islink(os.path.join(dest_dir, "colors")) is True
+    assert os.path.islink(os.path.join(dest_dir, "plugin")) is False
+    assert os.path.islink(os.path.join(dest_dir, "plugin", "a.vim")) is True
+    assert file_exists(os.path.join(dest_dir, "plugin"), "local.vim") is True
+
+    capsys.readouterr()
+
+    lecfg = Lecfg(work_dir, replace_all=True)
+    lecfg.process()
+
+    capture = capsys.readouterr()
+
+    assert "Already deployed:                  1" in capture.out
+
+
+def test_builtin_compare_action(setup, create_dir, monkeypatch, capsys):
+    work_dir = setup("lecfg.systems", ONE_SYSTEM_CONF, parent_dir="work_dir")
+    system_dir = create_dir("SYSTEM")
+
+    package_dir = os.path.join(work_dir, "vim")
+
+    setup("README.lc",
+          TEST_PACKAGE_CONF % (system_dir, system_dir, system_dir),
+          parent_dir=package_dir)
+
+    # setup package dir
+    setup(".vimrc", "set number\n", parent_dir=package_dir)
+    setup(".vimrc_gentoo", "", parent_dir=package_dir)
+    setup(".vimrc_work", "set number\nsyntax on\n", parent_dir=package_dir)
+
+    # setup system dir
+    setup(".vimrc", "set number\n", parent_dir=system_dir)
+    setup(".vimrc_work", "set number\n", parent_dir=system_dir)
+
+    # compare both files and skip them
+    monkeypatch.setattr('sys.stdin', io.StringIO('3\n5\n3\n5'))
+
+    lecfg = Lecfg(work_dir)
+    lecfg.process()
+
+    capture = capsys.readouterr()
+
+    src_path = os.path.join(package_dir, ".vimrc")
+    dest_path = os.path.join(system_dir, ".vimrc")
+
+    assert ("Files %s and %s are identical" % (dest_path, src_path)
+            in capture.out)
+    assert "+syntax on" in capture.out
+
+
+STATUS_PACKAGE_CONF = """
+linked | - | - | %s/linked | Linked conf
+missing | - | - | %s/missing | Missing conf
+missing_parent | - | - | %s/some/dir/missing_parent | Missing parent
+conflict | - | - | %s/conflict | Conflicting conf
+mismatch | - | - | %s/mismatch | Type mismatch
+dangling | - | - | %s/dangling | Dangling link
+"""
+
+
+def test_status(setup, create_dir, capsys):
+    work_dir = setup("lecfg.systems", ONE_SYSTEM_CONF, parent_dir="work_dir")
+    system_dir = create_dir("SYSTEM")
+
+    package_dir = os.path.join(work_dir, "status")
+
+    setup("README.lc", STATUS_PACKAGE_CONF % ((system_dir,) * 6),
+          parent_dir=package_dir)
+
+    for name in ("linked", "missing", "missing_parent", "conflict",
+                 "mismatch", "dangling"):
+        setup(name, "", parent_dir=package_dir)
+
+    (Path(system_dir) / "linked").symlink_to(
+        os.path.join(package_dir, "linked"))
+    setup("conflict", "", parent_dir=system_dir)
+    create_dir(os.path.join(system_dir, "mismatch"))
+    (Path(system_dir) / "dangling").symlink_to(
+        os.path.join(system_dir, "inexistent"))
+
+    lecfg = Lecfg(work_dir)
+    lecfg.status(ndjson=True)
+
+    capture = capsys.readouterr()
+
+    statuses = [json.loads(line)["status"] for line in
+                capture.out.splitlines() if line.startswith("{")]
+
+    assert statuses == ["linked", "missing", "missing-parent", "conflict",
+                        "type-mismatch", "dangling-link"]
+
+    # nothing was changed
+    assert file_exists(system_dir, "missing") is False
+
+
+def test_all_systems_status(setup, create_dir, capsys):
+    work_dir = setup("lecfg.systems", UNDETECTED_SYSTEM_CONF,
+                     parent_dir="work_dir")
+    system_dir = create_dir("SYSTEM")
+
+    package_dir = os.path.join(work_dir, "vim")
+
+    setup("README.lc",
+          TEST_PACKAGE_CONF % (system_dir, system_dir, system_dir),
+          parent_dir=package_dir)
+
+    setup(".vimrc", "", parent_dir=package_dir)
+    setup(".vimrc_gentoo", "", parent_dir=package_dir)
+    setup(".vimrc_work", "", parent_dir=package_dir)
+
+    # no system is asked to the user
+    lecfg = Lecfg(work_dir)
+    lecfg.status(ndjson=True, all_systems=True)
+
+    capture = capsys.readouterr()
+
+    systems = [json.loads(line)["systems"] for line in
+               capture.out.splitlines() if line.startswith("{")]
+
+    assert systems == [["Debian", "Gentoo"], ["Gentoo"],
+                       ["Debian", "Gentoo"]]
+
+    lecfg = Lecfg(work_dir)
+    lecfg.status(all_systems=True)
+
+    capture = capsys.readouterr()
+    summary = capture.out.split("Summary:")[1]
+
+    assert ("Debian:\n        linked:         0\n"
+            "        copied:         0\n        missing:        2" in summary)
+    assert ("Gentoo:\n        linked:         0\n"
+            "        copied:         0\n        missing:        3" in summary)
+
+
+def test_changed_only(setup, create_dir, capsys):
+    work_dir = setup("lecfg.systems", ONE_SYSTEM_CONF, parent_dir="work_dir")
+    system_dir = create_dir("SYSTEM")
+
+    package_dir = os.path.join(work_dir, "vim")
+
+    setup("README.lc",
+          TEST_PACKAGE_CONF % (system_dir, system_dir, system_dir),
+          parent_dir=package_dir)
+
+    setup(".vimrc", "", parent_dir=package_dir)
+    setup(".vimrc_gentoo", "", parent_dir=package_dir)
+    setup(".vimrc_work", "", parent_dir=package_dir)
+
+    dummy_dir = os.path.join(work_dir, "dummy")
+
+    setup("README.lc", NO_PARENT_PACKAGE_CONF % system_dir,
+          parent_dir=dummy_dir)
+    setup("dummy", "", parent_dir=dummy_dir)
+
+    lecfg = Lecfg(work_dir, replace_all=True, changed_only=True)
+    lecfg.process()
+
+    capture = capsys.readouterr()
+
+    assert "2 of 2 packages changed" in capture.out
+    assert file_exists(os.path.join(work_dir, ".lecfg"), "state.db")
+
+    lecfg = Lecfg(work_dir, replace_all=True, changed_only=True)
+    lecfg.process()
+
+    capture = capsys.readouterr()
+
+    assert "0 of 2 packages changed" in capture.out
+
+    # remove a deployed configuration from the system
+    os.remove(os.path.join(system_dir, ".vimrc"))
+
+    lecfg = Lecfg(work_dir, replace_all=True, changed_only=True)
+    lecfg.process()
+
+    capture = capsys.readouterr()
+
+    assert "1 of 2 packages changed" in capture.out
+    assert "Planned 2 configurations from 1 packages" in capture.out
+    assert file_exists(system_dir, ".vimrc") is True
+
+
+def test_resume_after_crash(setup, create_dir, monkeypatch, capsys):
+    work_dir = setup("lecfg.systems", ONE_SYSTEM_CONF, parent_dir="work_dir")
+    system_dir = create_dir("SYSTEM")
+
+    package_dir = os.path.join(work_dir, "vim")
+
+    setup("README.lc",
+          TEST_PACKAGE_CONF % (system_dir, system_dir, system_dir),
+          parent_dir=package_dir)
+
+    setup(".vimrc", "", parent_dir=package_dir)
+    setup(".vimrc_gentoo", "", parent_dir=package_dir)
+    setup(".vimrc_work", "", parent_dir=package_dir)
+
+    # skip the first file and get interrupted on the second one, without
+    # saving the session
+    monkeypatch.setattr('sys.stdin', io.StringIO('3'))
+
+    lecfg = Lecfg(work_dir)
+    with pytest.raises(SystemExit) as e:
+        lecfg.process()
+
+    assert e.value.code == ExitCode.USER_INTERRUPT.value
+
+    capsys.readouterr()
+
+    # resume the journaled session, which continues after the last decision,
+    # and deploy the remaining file
+    monkeypatch.setattr('sys.stdin', io.StringIO('1\n2'))
+
+    lecfg = Lecfg(work_dir)
+    lecfg.process()
+
+    capture = capsys.readouterr()
+
+    assert capture.out.count("Please select an action") == 1
+    assert file_exists(system_dir, ".vimrc") is False
+    assert file_exists(system_dir, ".vimrc_work") is True
+    assert file_exists(os.path.join(work_dir, JOURNAL_DIR),
+                       "*.journal") is False
+
+
+def test_resume_after_torn_record(setup, create_dir, monkeypatch, capsys):
+    work_dir = setup("lecfg.systems", ONE_SYSTEM_CONF, parent_dir="work_dir")
+    system_dir = create_dir("SYSTEM")
+
+    package_dir = os.path.join(work_dir, "conf")
+
+    setup("README.lc", "".join("%s | - | - | %s/%s | Conf\n" %
+                               (name, system_dir, name)
+                               for name in "abcd"),
+          parent_dir=package_dir)
+
+    for name in "abcd":
+        setup(name, "", parent_dir=package_dir)
+
+    journal_dir = os.path.join(work_dir, JOURNAL_DIR)
+
+    # skip the first file and get interrupted
+    monkeypatch.setattr('sys.stdin', io.StringIO('3'))
+
+    with pytest.raises(SystemExit) as e:
+        Lecfg(work_dir).process()
+
+    assert e.value.code == ExitCode.USER_INTERRUPT.value
+
+    # crash while the next record is being written
+    journal_path = glob.glob(os.path.join(journal_dir, "*.journal"))[0]
+
+    with open(journal_path, "a") as journal_file:
+        journal_file.write('{"type": "decis')
+
+    # resume, skip two more files and get interrupted again
+    monkeypatch.setattr('sys.stdin', io.StringIO('1\n3\n3'))
+
+    with pytest.raises(SystemExit) as e:
+        Lecfg(work_dir).process()
+
+    assert e.value.code == ExitCode.USER_INTERRUPT.value
+
+    # the session resumes after the last decision, on the last file
+    capsys.readouterr()
+    monkeypatch.setattr('sys.stdin', io.StringIO('1\n2'))
+
+    Lecfg(work_dir).process()
+
+    capture = capsys.readouterr()
+
+    assert capture.out.count("Please select an action") == 1
+    assert [file_exists(system_dir, name) for name in "abcd"] == [
+        False, False, False, True]
@@ -0,0 +1,46 @@
+from lecfg.package_discovery import PackageDiscovery
+import os
+
+IGNORE_CONF = """
+# ignored everywhere
+node_modules/
+# ignored below the work directory only
+/archive/*
+"""
+
+
+def test_package_discovery(setup, monkeypatch):
+    work_dir = setup(".lecfgignore", IGNORE_CONF, parent_dir="work_dir")
+
+    for package in ("vim", os.path.join("desktop", "i3"),
+                    os.path.join("desktop", "i3", "bar"),
+                    os.path.join("archive", "old"),
+                    os.path.join("vim", "node_modules", "pkg"),
+                    os.path.join(".lecfg", "pkg")):
+        os.makedirs(os.path.join(work_dir, package), exist_ok=True)
+        setup("README.lc", "", parent_dir=os.path.join(work_dir, package))
+
+    expected = [os.path.join(work_dir, "desktop", "i3"),
+                os.path.join(work_dir, "desktop", "i3", "bar"),
+                os.path.join(work_dir, "vim")]
+
+    assert PackageDiscovery(work_dir).package_directories() == expected
+
+    scandir_calls = []
+    real_scandir = os.scandir
+
+    def counting_scandir(path):
+        scandir_calls.append(path)
+        return real_scandir(path)
+
+    monkeypatch.setattr(os, "scandir", counting_scandir)
+
+    # the unchanged directories are not listed again
+    assert PackageDiscovery(work_dir).package_directories() == expected
+    assert scandir_calls == []
+
+    setup("README.lc", "", parent_dir=os.path.join(work_dir, "desktop"))
+
+    assert PackageDiscovery(work_dir).package_directories() == [
+        os.path.join(work_dir, "desktop")] + expected
+    assert scandir_calls == [os.path.join(work_dir, "desktop")]
@@ -0,0 +1,163 @@
+from lecfg.path_cache import PathStatusCache
+from lecfg.action.deploy_action import DeployAction
+from lecfg.conf.conf import Conf, COPY_DEPLOY_MODE
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import os
+
+
+def test_path_status_cache(setup, monkeypatch):
+    work_dir = setup("conf", "some sample conf", parent_dir="work_dir")
+
+    conf_path = os.path.join(work_dir, "conf")
+    link_path = os.path.join(work_dir, "link")
+
+    lstat_calls = []
+    real_lstat = os.lstat
+
+    def counting_lstat(path):
+        lstat_calls.append(path)
+        return real_lstat(path)
+
+    monkeypatch.setattr(os, "lstat", counting_lstat)
+
+    path_cache = PathStatusCache()
+
+    assert path_cache.exists(conf_path) is True
+    assert path_cache.is_file(conf_path) is True
+    assert path_cache.is_dir(conf_path) is False
+    assert path_cache.is_symlink(conf_path) is False
+    assert path_cache.exists(link_path) is False
+
+    assert lstat_calls == [conf_path, link_path]
+
+    Path(link_path).symlink_to(conf_path)
+
+    # the cache is stale until the changed path is invalidated
+    assert path_cache.exists(link_path) is False
+
+    path_cache.invalidate(link_path)
+
+    assert path_cache.is_symlink(link_path) is True
+    assert path_cache.samefile(link_path, conf_path) is True
+    assert len(lstat_calls) == 3
+
+
+def test_dir_fd_operations(setup, monkeypatch):
+    work_dir = setup("conf", "some sample conf", parent_dir="work_dir")
+    home_dir = os.path.join(work_dir, "home", "user", ".config")
+    os.makedirs(home_dir)
+
+    open_calls = []
+    real_open = os.open
+
+    def counting_open(path, *args, **kwargs):
+        open_calls.append(path)
+        return real_open(path, *args, **kwargs)
+
+    monkeypatch.setattr(os, "open", counting_open)
+
+    path_cache = PathStatusCache(use_dir_fd=True)
+    conf_path = os.path.join(work_dir, "conf")
+
+    for i in range(10):
+        link_path = os.path.join(home_dir, "link%d" % i)
+
+        assert path_cache.lstat(link_path) is None
+
+        path_cache.symlink(conf_path, link_path)
+
+        assert path_cache.links_to(link_path, conf_path) is True
+
+    path_cache.rename(os.path.join(home_dir, "link0"),
+                      os.path.join(home_dir, "link0.bak"))
+
+    assert path_cache.is_symlink(os.path.join(home_dir, "link0")) is False
+    assert path_cache.is_symlink(os.path.join(home_dir, "link0.bak")) is True
+
+    # the parent directory is opened once for all the calls
+    assert open_calls == [home_dir]
+
+    # a directory that is moved is opened again
+    path_cache.rename(home_dir, home_dir + ".bak")
+
+    assert path_cache.is_symlink(os.path.join(home_dir, "link1")) is False
+    assert open_calls == [home_dir, os.path.dirname(home_dir), home_dir]
+
+    path_cache.close()
+
+
+def test_concurrent_dir_fds(create_dir, monkeypatch):
+    work_dir = create_dir("work_dir")
+
+    for i in range(100):
+        dir_path = os.path.join(work_dir, "dir%d" % i)
+        os.mkdir(dir_path)
+
+        for j in range(8):
+            with open(os.path.join(dir_path, "f%d" % j), "w") as f:
+                f.write("x" * (i * 8 + j))
+
+    # the directories are closed while other threads still use them
+    monkeypatch.setattr("lecfg.path_cache.MAX_DIR_FDS", 4)
+
+    path_cache = PathStatusCache(use_dir_fd=True)
+
+    def check(j):
+        return all(path_cache.lstat(os.path.join(
+            work_dir, "dir%d" % i, "f%d" % j)).st_size == i * 8 + j
+            for i in range(100))
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        assert all(executor.map(check, range(8)))
+
+    path_cache.close()
+
+
+def test_links_to_other_spelling(setup):
+    work_dir = setup("conf", "some sample conf", parent_dir="work_dir")
+    alias_dir = work_dir + ".alias"
+    link_path = os.path.join(work_dir, "link")
+
+    Path(alias_dir).symlink_to(work_dir)
+    Path(link_path).symlink_to(os.path.join(alias_dir, "conf"))
+
+    path_cache = PathStatusCache()
+
+    assert path_cache.links_to(link_path, os.path.join(work_dir, "conf"))
+    assert not path_cache.links_to(link_path, link_path + ".missing")
+
+
+def test_deploy_invalidation(setup, create_dir, monkeypatch):
+    src_dir = setup("conf", "some sample conf", parent_dir="src")
+    setup("init.vim", "", parent_dir=os.path.join(src_dir, "nvim"))
+    dest_dir = create_dir("dest")
+
+    invalidate_calls = []
+    real_invalidate = PathStatusCache.invalidate
+
+    def recording_invalidate(self, path, recursive=False):
+        invalidate_calls.append((path, recursive))
+        real_invalidate(self, path, recursive)
+
+    monkeypatch.setattr(PathStatusCache, "invalidate", recording_invalidate)
+
+    action = DeployAction("Deploy")
+    path_cache = action.path_cache
+
+    # a deployed link has nothing below it to forget
+    action.run(Conf(os.path.join(src_dir, "conf"),
+                    os.path.join(dest_dir, "conf"), "", "-"))
+
+    assert invalidate_calls == [(os.path.join(dest_dir, "conf"), False)]
+    assert path_cache.is_symlink(os.path.join(dest_dir, "conf")) is True
+
+    # a copied directory only invalidates the entries it changes
+    invalidate_calls.clear()
+    action.run(Conf(os.path.join(src_dir, "nvim"),
+                    os.path.join(dest_dir, "nvim"), "", "-",
+                    deploy_mode=COPY_DEPLOY_MODE))
+
+    assert invalidate_calls == [
+        (os.path.join(dest_dir, "nvim"), False),
+        (os.path.join(dest_dir, "nvim", "init.vim"), False)]
@@ -0,0 +1,68 @@
+from lecfg.conf.conf import Conf
+from lecfg.path_cache import PathStatusCache
+from lecfg.state_db import StateDb
+import os
+
+
+def test_interleaved_packages(setup, create_dir):
+    work_dir = setup("vimrc", "", parent_dir="work_dir")
+    setup("bashrc", "", parent_dir=work_dir)
+    readme_path = os.path.join(setup("README.lc", "", parent_dir=work_dir),
+                               "README.lc")
+    dest_dir = create_dir("dest")
+
+    def conf(name):
+        return Conf(os.path.join(work_dir, name),
+                    os.path.join(dest_dir, name), "", "-")
+
+    path_cache = PathStatusCache()
+    state_db = StateDb(os.path.join(work_dir, "state.db"), path_cache)
+
+    state_db.start_package("vim", True)
+    state_db.record_conf("vim", conf("vimrc"), "Deploy")
+    state_db.record_conf("vim", conf("bashrc"), "Deploy")
+    state_db.record_package("vim", readme_path)
+
+    # the packages are all started before any of them is applied in bulk
+    state_db.start_package("vim", True)
+    state_db.start_package("bash", True)
+    state_db.record_conf("vim", conf("vimrc"), "Deploy")
+    state_db.record_conf("bash", conf("bashrc"), "Deploy")
+    state_db.record_package("vim", readme_path)
+    state_db.record_package("bash", readme_path)
+
+    assert state_db.package_changed("vim", readme_path) is False
+
+    # the configuration that is no longer part of the package is forgotten
+    os.remove(os.path.join(work_dir, "bashrc"))
+    path_cache.invalidate(os.path.join(work_dir, "bashrc"))
+
+    assert state_db.package_changed("vim", readme_path) is False
+    assert state_db.package_changed("bash", readme_path) is True
+
+    state_db.close()
+
+
+def test_directory_fingerprint(setup, create_dir):
+    src_dir = setup("init.vim", "", parent_dir="nvim")
+    setup("a.vim", "", parent_dir=os.path.join(src_dir, "plugin"))
+    readme_path = os.path.join(setup("README.lc", ""), "README.lc")
+    dest_dir = create_dir("dest")
+
+    path_cache = PathStatusCache()
+    state_db = StateDb(os.path.join(dest_dir, "state.db"), path_cache)
+
+    state_db.start_package("nvim", True)
+    state_db.record_conf("nvim", Conf(src_dir, os.path.join(dest_dir, "nvim"),
+                                      "", "-"), "Copy")
+    state_db.record_package("nvim", readme_path)
+
+    assert state_db.package_changed("nvim", readme_path) is False
+
+    # an edit deep below the source directory changes the package
+    with open(os.path.join(src_dir, "plugin", "a.vim"), "a") as f:
+        f.write("syntax on\n")
+
+    assert state_db.package_changed("nvim", readme_path) is True
+
+    state_db.close()